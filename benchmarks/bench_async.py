@@ -0,0 +1,149 @@
+"""
+Compare le mode WSGI (Gunicorn, workers à threads) et le mode ASGI (uvicorn)
+face à un panel Dino lent
+
+Les deux serveurs sont lancés l'un après l'autre, avec le même nombre de
+processus, sur une base SQLite temporaire et un faux panel Dino à latence fixe
+(création synchrone du compte : ASYNC_PROVISIONING=false). Le client envoie
+--requests inscriptions avec --concurrency requêtes simultanées et affiche le
+débit et les percentiles de latence. Avec des workers à threads, le débit plafonne
+vers workers × threads / latence ; en mode ASGI il suit la concurrence du client.
+
+Usage :
+    pip install -r requirements-async.txt
+    python benchmarks/bench_async.py --latency 0.5 --concurrency 100 --requests 500
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import httpx
+
+from mock_dino_server import MockDinoServer
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def server_command(mode, port, workers, threads):
+    if mode == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], {
+            'GUNICORN_BIND': f'127.0.0.1:{port}',
+            'GUNICORN_WORKERS': str(workers),
+            'GUNICORN_THREADS': str(threads)
+        }
+    return [sys.executable, '-m', 'uvicorn', '--factory', 'src.asgi:create_asgi_app',
+            '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+            '--no-access-log', '--log-level', 'warning'], {}
+
+
+async def wait_ready(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get('/api/stats')).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Le serveur n'a pas démarré")
+
+
+async def run_load(base_url, total, concurrency):
+    latencies, statuses = [], {}
+    pending = iter(range(total))
+
+    async def worker(client):
+        for index in pending:
+            body = {
+                'fullName': f'Bench {index}',
+                'email': f'bench{index}@example.com',
+                'phone': '+33600000000',
+                'contactMethod': 'email',
+                'plan': {'id': '1month', 'name': '1 Mois', 'price': '9.99€', 'duration': '1 mois'}
+            }
+            started = time.perf_counter()
+            response = await client.post('/api/subscribe', json=body)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        await wait_ready(client)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return elapsed, sorted(latencies), statuses
+
+
+def bench(mode, args, dino_url, directory):
+    port = free_port()
+    command, server_env = server_command(mode, port, args.workers, args.threads)
+    env = dict(
+        os.environ,
+        **server_env,
+        DATABASE_URL=f"sqlite:///{os.path.join(directory, f'{mode}.db')}",
+        DINO_API_ENABLED='true',
+        DINO_API_URL=dino_url,
+        DINO_POOL_SIZE=str(args.concurrency),
+        ASYNC_PROVISIONING='false',
+        ADMISSION_MAX_CONCURRENT=str(args.concurrency),
+        ADMISSION_QUEUE_SIZE=str(args.concurrency),
+        RATE_LIMIT_BACKEND='none',
+        EMAIL_QUEUE_WORKERS='0',
+        LOG_LEVEL='WARNING',
+        PYTHONPATH=ROOT
+    )
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        elapsed, latencies, statuses = asyncio.run(
+            run_load(f'http://127.0.0.1:{port}', args.requests, args.concurrency)
+        )
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    print(f'{mode:5s} {args.requests / elapsed:8.1f} req/s   '
+          f'p50 {percentile(latencies, 50) * 1000:7.0f} ms   '
+          f'p95 {percentile(latencies, 95) * 1000:7.0f} ms   '
+          f'p99 {percentile(latencies, 99) * 1000:7.0f} ms   statuts {statuses}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.5, help='Latence du faux panel Dino (secondes)')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=1, help='Processus par serveur')
+    parser.add_argument('--threads', type=int, default=4, help='Threads par worker Gunicorn')
+    parser.add_argument('--modes', default='wsgi,asgi')
+    args = parser.parse_args()
+
+    dino = MockDinoServer(latency=args.latency).start()
+    print(f'Panel Dino : latence {args.latency * 1000:.0f} ms, {args.concurrency} requêtes simultanées, '
+          f'{args.workers} processus ({args.threads} threads par worker WSGI)')
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in args.modes.split(','):
+            bench(mode.strip(), args, dino.url, directory)
+    dino.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Micro-benchmark du rendu des emails (messages par seconde)
+
+Mesure séparément le rendu des templates compilés et la construction complète
+du message MIME sérialisé, tel qu'envoyé au serveur SMTP.
+
+Usage :
+    python benchmarks/bench_email_templates.py --count 5000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.email_templates import load_email_templates, render_email
+from src.utils.email_sender import build_subscription_message, build_renewal_reminder_message
+
+
+def _measure(label, count, func):
+    started = time.perf_counter()
+    for index in range(count):
+        func(index)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<45} {count / elapsed:>10.0f} msg/s  ({elapsed * 1e6 / count:.1f} µs/msg)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du rendu des emails')
+    parser.add_argument('--count', type=int, default=5000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    load_email_templates()
+    print(f"Compilation des templates : {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    credentials = {'username': 'user_123', 'password': 'pass_456', 'url': 'http://iptv.example.com:8080'}
+    expires_at = datetime.now() + timedelta(days=7)
+
+    _measure('rendu subscription (sujet+texte+html)', args.count, lambda i: render_email(
+        'subscription', full_name=f'Client {i}', plan_name='12 Mois', iptv_credentials=credentials
+    ))
+    _measure('rendu renewal_reminder (sujet+texte+html)', args.count, lambda i: render_email(
+        'renewal_reminder', full_name=f'Client {i}', plan_name='12 Mois', expires_at=expires_at
+    ))
+    _measure('message MIME subscription sérialisé', args.count, lambda i: build_subscription_message(
+        'noreply@example.com', f'client{i}@example.com', f'Client {i}', '12 Mois', credentials
+    ).as_string())
+    _measure('message MIME renewal_reminder sérialisé', args.count, lambda i: build_renewal_reminder_message(
+        'noreply@example.com', f'client{i}@example.com', f'Client {i}', '12 Mois', expires_at
+    ).as_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Mesure le débit de l'import en masse (flask import-subscriptions) face à un import
+ligne par ligne par l'ORM
+
+Génère --rows abonnements au format NDJSON (un tiers avec un compte IPTV existant),
+puis les importe dans une base temporaire (ou DATABASE_URL) de deux façons :
+    orm  : un objet Subscription par ligne, session.add() + commit par lot
+    bulk : import_subscriptions() (validation par colonne, INSERT multi-lignes hors ORM)
+Affiche les lignes par seconde de chaque méthode.
+
+Usage :
+    python benchmarks/bench_import.py --rows 50000 --chunk-size 2000
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Même instant, avec décalage et en heure locale naïve (fuseau du serveur)
+EXPIRES_AT_OFFSET = '2030-01-01T00:00:00+02:00'
+EXPIRES_AT_LOCAL = datetime.fromisoformat(EXPIRES_AT_OFFSET).astimezone().replace(tzinfo=None)
+
+
+def generate(rows):
+    lines = []
+    for index in range(rows):
+        record = {
+            'full_name': f'Import {index}',
+            'email': f'import{index}@example.com',
+            'phone': '+33600000000',
+            'contact_method': 'email',
+            'plan_id': '3months',
+            'plan_name': '3 Mois',
+            'plan_price': '24.99€',
+            'plan_duration': '3 mois'
+        }
+        if index % 3 == 0:
+            # Une date sur deux avec décalage horaire : stockée en heure locale, comme l'autre
+            expires_at = EXPIRES_AT_OFFSET if index % 2 else EXPIRES_AT_LOCAL.isoformat()
+            record.update(iptv_username=f'user_{index}', iptv_password='secret',
+                          iptv_url='http://iptv.example.com', expires_at=expires_at)
+        lines.append(json.dumps(record))
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def import_orm(data, chunk_size):
+    from src.models.subscription import db, Subscription
+    from src.utils.bulk_import import parse_import_datetime
+    from src.utils.email_queue import enqueue_email
+    from src.utils.provisioning import enqueue_provisioning
+
+    for start, line in enumerate(data.splitlines()):
+        record = json.loads(line)
+        if 'expires_at' in record:
+            record['expires_at'] = parse_import_datetime(record['expires_at'])
+        subscription = Subscription(**record, status='active' if record.get('iptv_username') else 'pending')
+        db.session.add(subscription)
+        if subscription.status == 'pending':
+            db.session.flush()
+            enqueue_provisioning(subscription)
+        else:
+            enqueue_email('subscription', subscription.email, full_name=subscription.full_name,
+                          plan_name=subscription.plan_name,
+                          iptv_credentials={'username': subscription.iptv_username,
+                                            'password': subscription.iptv_password,
+                                            'url': subscription.iptv_url})
+        if (start + 1) % chunk_size == 0:
+            db.session.commit()
+    db.session.commit()
+
+
+def import_bulk(data, chunk_size):
+    from src.utils.bulk_import import import_subscriptions
+    report = import_subscriptions(io.BytesIO(data), 'ndjson', chunk_size=chunk_size)
+    if report.rejected:
+        raise RuntimeError(f'{report.rejected} lignes rejetées : {report.rejects[:3]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--methods', default='orm,bulk')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(directory, 'bench.db')}")
+    os.environ.update(EMAIL_QUEUE_WORKERS='0', PROVISIONING_WORKERS='0', EXPIRY_SWEEP_INTERVAL='0',
+                      LOG_LEVEL='WARNING')
+
+    from src.main import create_app
+    from src.models.subscription import db, Subscription
+    app = create_app(start_workers=False)
+    data = generate(args.rows)
+    methods = {'orm': import_orm, 'bulk': import_bulk}
+
+    with app.app_context():
+        print(f'{args.rows} lignes, lots de {args.chunk_size}, base {db.engine.url.get_backend_name()}')
+        for name in args.methods.split(','):
+            before = db.session.query(Subscription).count()
+            started = time.perf_counter()
+            methods[name.strip()](data, args.chunk_size)
+            elapsed = time.perf_counter() - started
+            inserted = db.session.query(Subscription).count() - before
+            print(f'{name:5s} {inserted / elapsed:10.0f} lignes/s   ({inserted} lignes en {elapsed:.2f} s)')
+
+        # Toutes les dates d'expiration, avec ou sans décalage, désignent le même instant local
+        expiries = {row[0] for row in db.session.query(Subscription.expires_at).filter(
+            Subscription.expires_at.isnot(None)).distinct()}
+        if expiries != {EXPIRES_AT_LOCAL}:
+            raise RuntimeError(f"Dates d'expiration mal converties : {sorted(expiries)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Mesure le coût du limiteur de débit par requête : contrôle d'une limite par IP et
+d'une limite par email sur le backend mémoire (et Redis avec --redis-url)
+
+Usage :
+    python benchmarks/bench_rate_limit.py --checks 200000 --clients 10000
+    python benchmarks/bench_rate_limit.py --redis-url redis://localhost:6379/0
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.rate_limit import MemoryRateLimitBackend, RedisRateLimitBackend, parse_rate
+
+
+def measure(backend, checks, clients):
+    ip_rate = parse_rate('30/minute')
+    email_rate = parse_rate('5/hour')
+    keys = [(f'ip:10.0.{i // 256}.{i % 256}', f'email:user{i}@example.com') for i in range(clients)]
+    started = time.perf_counter()
+    for i in range(checks):
+        ip_key, email_key = keys[i % clients]
+        backend.hit(ip_key, *ip_rate)
+        backend.hit(email_key, *email_rate)
+    return (time.perf_counter() - started) / checks * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checks', type=int, default=200000)
+    parser.add_argument('--clients', type=int, default=10000)
+    parser.add_argument('--redis-url')
+    args = parser.parse_args()
+
+    backends = [('memory', MemoryRateLimitBackend())]
+    if args.redis_url:
+        backends.append(('redis', RedisRateLimitBackend(args.redis_url, prefix='flixstream:bench:')))
+
+    for name, backend in backends:
+        checks = args.checks if name == 'memory' else min(args.checks, 20000)
+        per_request = measure(backend, checks, args.clients)
+        print(f'{name:<8} {per_request:8.2f} µs par requête (IP + email, {args.clients} clients)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Compare la sérialisation d'une liste d'abonnements : objets ORM + to_dict() + jsonify
+(ancien chemin) contre tuples de colonnes + encodeur rapide (orjson ou json)
+
+Le script remplit une base SQLite temporaire puis mesure, pour chaque variante,
+le temps de requête + construction des dictionnaires + encodage JSON.
+
+Usage :
+    python benchmarks/bench_serialization.py --rows 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('EMAIL_QUEUE_WORKERS', '0')
+
+from flask import jsonify
+from check_query_plans import build_app, seed
+from src.models.subscription import db, Subscription
+from src.utils import serialization
+from src.utils.serialization import SUBSCRIPTION_FIELDS, rows_to_dicts, subscription_columns
+
+
+def orm_to_dict(limit, fields):
+    subscriptions = Subscription.query.order_by(Subscription.id).limit(limit).all()
+    return jsonify({'subscriptions': [sub.to_dict() for sub in subscriptions]}).get_data()
+
+
+def column_tuples(encoder):
+    def run(limit, fields):
+        rows = db.session.query(*subscription_columns(fields)).order_by(Subscription.id).limit(limit).all()
+        return serialization.JSON_ENCODERS[encoder]({'subscriptions': rows_to_dicts(rows, fields)})
+    return run
+
+
+def measure(function, limit, fields, repeat):
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        size = len(function(limit, fields))
+        timings.append(time.perf_counter() - started)
+    return min(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la sérialisation des listes d\'abonnements')
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fields', default='id,full_name,email,status,expires_at',
+                        help='Champs de la variante avec projection (fields=)')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_serialization.db')
+    app = build_app(path)
+    seed(path, args.rows)
+
+    variants = [('ORM + to_dict() + jsonify', orm_to_dict, SUBSCRIPTION_FIELDS)]
+    for encoder in serialization.JSON_ENCODERS:
+        variants.append((f'tuples + {encoder}', column_tuples(encoder), SUBSCRIPTION_FIELDS))
+    projected = args.fields.split(',')
+    for encoder in serialization.JSON_ENCODERS:
+        variants.append((f'tuples + {encoder} (fields={args.fields})', column_tuples(encoder), projected))
+
+    with app.app_context():
+        print(f"{args.rows} abonnements, meilleur temps sur {args.repeat} passages\n")
+        print(f"{'Variante':<60} {'Temps':>9} {'Lignes/s':>11} {'Taille':>10} {'Gain':>6}")
+        baseline = None
+        for label, function, fields in variants:
+            elapsed, size = measure(function, args.rows, list(fields), args.repeat)
+            baseline = baseline or elapsed
+            print(
+                f"{label:<60} {elapsed * 1000:>7.0f}ms {args.rows / elapsed:>11,.0f} "
+                f"{size / 1024:>8.0f}KB {baseline / elapsed:>5.1f}x"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Mesure le démarrage à froid d'un worker : imports (python -X importtime) et
+création de l'application (create_app), sur une base neuve puis sur une base
+dont le schéma est déjà à jour
+
+Chaque mesure lance un nouvel interpréteur. Les modules les plus coûteux
+(temps cumulé) sont listés pour repérer un import lourd ajouté au démarrage.
+
+Usage :
+    python benchmarks/bench_startup.py --runs 5 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = (
+    'import time; started = time.perf_counter(); '
+    'from src.main import create_app; imported = time.perf_counter(); '
+    'create_app(start_workers=False); done = time.perf_counter(); '
+    'print(f"{(imported - started) * 1000:.1f} {(done - imported) * 1000:.1f}")'
+)
+
+
+def boot(database_url):
+    env = dict(os.environ, DATABASE_URL=database_url, LOG_LEVEL='WARNING', PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    import_ms, create_ms = (float(value) for value in result.stdout.split()[-2:])
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative) / 1000
+    return import_ms, create_ms, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'startup.db')}"
+        first_import, first_create, _ = boot(database_url)
+        print(f'base neuve        imports {first_import:7.1f} ms   create_app {first_create:7.1f} ms')
+
+        runs = [boot(database_url) for _ in range(args.runs)]
+        import_ms = statistics.median(run[0] for run in runs)
+        create_ms = statistics.median(run[1] for run in runs)
+        print(f'schéma à jour     imports {import_ms:7.1f} ms   create_app {create_ms:7.1f} ms   (médiane de {args.runs})')
+
+    print('\nModules les plus coûteux (temps cumulé, ms) :')
+    modules = runs[-1][2]
+    top_level = {name: ms for name, ms in modules.items() if name.count('.') <= 2}
+    for name, ms in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f'  {ms:8.1f}  {name}')
+
+    heavy = [name for name in ('requests', 'smtplib', 'email.mime.multipart', 'sqlalchemy.dialects.postgresql')
+             if name in modules]
+    print(f"\nImports différés chargés au démarrage : {', '.join(heavy) if heavy else 'aucun'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,368 @@
+"""
+Vérifications d'intégration sur PostgreSQL : plusieurs processus et threads sur la même base
+
+Le script démarre un PostgreSQL jetable (initdb et pg_ctl du PATH ou de --pg-bin,
+sinon un conteneur docker postgres:16-alpine), ou utilise --database-url (base
+vide réservée aux tests : elle est modifiée), puis vérifie :
+
+  schéma      plusieurs processus appliquent le schéma en même temps sans erreur
+  files       des threads concurrents réservent chaque email de la file une seule fois
+  compteurs   inscriptions, renouvellements et expirations concurrents laissent les
+              statistiques égales à un recalcul GROUP BY, sans interblocage
+  débit       inscriptions par seconde via Gunicorn, sur SQLite puis sur PostgreSQL
+
+Code de sortie 1 si une vérification échoue. initdb refuse de tourner en root :
+lancez le script sous un autre utilisateur, avec docker ou avec --database-url.
+
+Usage :
+    python benchmarks/check_postgres.py --workers 4 --requests 2000
+    python benchmarks/check_postgres.py --database-url postgresql://user@localhost/flixstream_test
+"""
+import argparse
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Réglages appliqués avant d'importer l'application (et hérités par Gunicorn)
+CHECK_ENV = {
+    'EMAIL_QUEUE_WORKERS': '0',
+    'PROVISIONING_WORKERS': '0',
+    'EXPIRY_SWEEP_INTERVAL': '0',
+    'ASYNC_PROVISIONING': 'false',
+    'DINO_API_ENABLED': 'false',
+    'RATE_LIMIT_BACKEND': 'none',
+    'ADMISSION_MAX_CONCURRENT': '0',
+    'LOG_LEVEL': 'WARNING'
+}
+
+PLANS = [
+    ('3months', '3 Mois', '24.99€', '3 mois'),
+    ('6months', '6 Mois', '39.99€', '6 mois'),
+    ('12months', '12 Mois', '59.99€', '12 mois'),
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def subscribe_body(index):
+    plan_id, plan_name, plan_price, plan_duration = PLANS[index % len(PLANS)]
+    return {
+        'fullName': f'Client {index}',
+        'email': f'client{index}@example.com',
+        'phone': '+33600000000',
+        'contactMethod': 'whatsapp',
+        'plan': {'id': plan_id, 'name': plan_name, 'price': plan_price, 'duration': plan_duration}
+    }
+
+
+class TemporaryPostgres:
+    """
+    Serveur PostgreSQL jetable : cluster initdb dans un dossier temporaire, ou conteneur docker
+    """
+
+    def __init__(self, pg_bin=None):
+        self.pg_bin = pg_bin
+        self.directory = None
+        self.container = None
+
+    def start(self):
+        port = free_port()
+        initdb = shutil.which('initdb', path=self.pg_bin)
+        pg_ctl = shutil.which('pg_ctl', path=self.pg_bin)
+        if initdb and pg_ctl:
+            self.directory = tempfile.mkdtemp(prefix='flixstream-pg-')
+            data = os.path.join(self.directory, 'data')
+            subprocess.run(
+                [initdb, '-D', data, '-U', 'postgres', '-A', 'trust', '-E', 'UTF8', '--locale=C'],
+                check=True, capture_output=True
+            )
+            subprocess.run(
+                [pg_ctl, '-D', data, '-l', os.path.join(self.directory, 'postgres.log'), '-w', '-o',
+                 f'-p {port} -k {self.directory} -c listen_addresses=127.0.0.1 -c max_connections=300',
+                 'start'],
+                check=True, capture_output=True
+            )
+            print(f'PostgreSQL (pg_ctl) sur le port {port}')
+        elif shutil.which('docker'):
+            self.container = subprocess.run(
+                ['docker', 'run', '-d', '--rm', '-e', 'POSTGRES_HOST_AUTH_METHOD=trust',
+                 '-p', f'127.0.0.1:{port}:5432', 'postgres:16-alpine', '-c', 'max_connections=300'],
+                check=True, capture_output=True, text=True
+            ).stdout.strip()
+            print(f'PostgreSQL (docker {self.container[:12]}) sur le port {port}')
+        else:
+            raise SystemExit('Ni initdb/pg_ctl ni docker trouvés : utilisez --pg-bin ou --database-url')
+        url = f'postgresql://postgres@127.0.0.1:{port}/postgres'
+        wait_for_database(url)
+        return url
+
+    def stop(self):
+        if self.directory:
+            subprocess.run(
+                [shutil.which('pg_ctl', path=self.pg_bin), '-D', os.path.join(self.directory, 'data'),
+                 '-m', 'fast', 'stop'],
+                capture_output=True
+            )
+            shutil.rmtree(self.directory, ignore_errors=True)
+        if self.container:
+            subprocess.run(['docker', 'stop', self.container], capture_output=True)
+
+
+def wait_for_database(url, timeout=60):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+
+    engine = create_engine(url)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text('SELECT 1'))
+                return
+            except OperationalError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+    finally:
+        engine.dispose()
+
+
+def report(name, ok, detail):
+    print(f"{'OK    ' if ok else 'ÉCHEC '} {name:10s} {detail}")
+    return ok
+
+
+def check_schema(url, processes):
+    """
+    Plusieurs processus créent l'application en même temps sur une base vide
+    """
+    env = dict(os.environ, DATABASE_URL=url, PYTHONPATH=ROOT)
+    code = 'from src.main import create_app; create_app(start_workers=False)'
+    children = [
+        subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=env,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        for _ in range(processes)
+    ]
+    errors = [error for child in children for _, error in [child.communicate()] if child.returncode]
+    detail = f'{processes} processus simultanés'
+    if errors:
+        detail += f', {len(errors)} en erreur :\n' + errors[0].strip().splitlines()[-1]
+    return report('schéma', not errors, detail)
+
+
+def check_queue_claims(app, rows, threads):
+    """
+    Des threads concurrents vident la file d'emails : chaque ligne réservée une seule fois
+    """
+    from sqlalchemy import delete, insert
+    from src.models.email_outbox import OutboundEmail
+    from src.models.subscription import db
+    from src.utils.background import claim_due_rows
+
+    now = datetime.utcnow() - timedelta(seconds=1)
+    with app.app_context():
+        db.session.execute(insert(OutboundEmail), [
+            {'kind': 'check', 'recipient_email': f'check{index}@example.com', 'payload': '{}',
+             'status': 'pending', 'attempts': 0, 'next_attempt_at': now}
+            for index in range(rows)
+        ])
+        db.session.commit()
+
+    claimed = []
+    lock = threading.Lock()
+
+    def worker():
+        with app.app_context():
+            while True:
+                batch = claim_due_rows(OutboundEmail, 20, 300, 'pending', 'sending')
+                if not batch:
+                    return
+                with lock:
+                    claimed.extend(email.id for email in batch)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        db.session.execute(delete(OutboundEmail).where(OutboundEmail.kind == 'check'))
+        db.session.commit()
+
+    duplicates = len(claimed) - len(set(claimed))
+    ok = duplicates == 0 and len(set(claimed)) == rows
+    return report('files', ok, f'{len(set(claimed))}/{rows} emails réservés par {threads} threads, '
+                               f'{duplicates} en double, {rows / elapsed:.0f} lignes/s')
+
+
+def check_counters(app, total, threads):
+    """
+    Inscriptions, renouvellements et balayages concurrents : compteurs égaux au GROUP BY
+    """
+    from src.models.subscription import db, Subscription
+    from src.utils.expiry_sweeper import sweep_expired
+    from src.utils.stats_counters import read_stats
+
+    failures = []
+    lock = threading.Lock()
+
+    def post(client, path, body=None):
+        response = client.post(path, json=body)
+        if response.status_code >= 300:
+            with lock:
+                failures.append(f'{path} {response.status_code}')
+        return response
+
+    def subscribe(offset):
+        client = app.test_client()
+        for index in range(offset, total, threads):
+            post(client, '/api/subscribe', subscribe_body(index))
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(subscribe, range(threads)))
+
+    with app.app_context():
+        ids = [row.id for row in db.session.query(Subscription.id)]
+
+    def renew(seed):
+        client = app.test_client()
+        rng = random.Random(seed)
+        for _ in range(total // threads):
+            post(client, f'/api/subscriptions/{rng.choice(ids)}/renew')
+
+    sweeps = []
+
+    def sweep():
+        # Date future : chaque balayage expire tout ce qui n'est pas verrouillé à cet instant
+        with app.app_context():
+            for _ in range(5):
+                sweeps.append(sweep_expired(batch_size=200, now=datetime.now() + timedelta(days=400)).status)
+
+    with ThreadPoolExecutor(max_workers=threads + 1) as pool:
+        futures = [pool.submit(renew, seed) for seed in range(threads)] + [pool.submit(sweep)]
+        for future in futures:
+            future.result()
+
+    with app.app_context():
+        stats = read_stats()
+        expected = {
+            status or 'pending': count for status, count in
+            db.session.query(Subscription.status, db.func.count(Subscription.id)).group_by(Subscription.status)
+        }
+    mismatches = {
+        status: (stats.get(status, 0), count) for status, count in expected.items()
+        if stats.get(status, 0) != count
+    }
+    failed_sweeps = [status for status in sweeps if status != 'completed']
+    ok = not mismatches and not failures and not failed_sweeps and stats['total'] == total
+    detail = f'{total} inscriptions, {total // threads * threads} renouvellements, {len(sweeps)} balayages'
+    if mismatches:
+        detail += f', écarts (compteur, réel) : {mismatches}'
+    if failures or failed_sweeps:
+        detail += f', erreurs : {(failures + failed_sweeps)[:5]}'
+    return report('compteurs', ok, detail)
+
+
+def measure_throughput(database_url, workers, threads, total, concurrency):
+    """
+    Inscriptions par seconde via Gunicorn (workers processus × threads)
+    """
+    import requests
+
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, PYTHONPATH=ROOT,
+               GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKERS=str(workers), GUNICORN_THREADS=str(threads))
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    local = threading.local()
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if requests.get(f'{base_url}/api/stats', timeout=1).status_code == 200:
+                    break
+            except requests.ConnectionError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("Gunicorn n'a pas démarré")
+            time.sleep(0.2)
+
+        def send(index):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            return local.session.post(f'{base_url}/api/subscribe', json=subscribe_body(10_000_000 + index)).status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            statuses = list(pool.map(send, range(total)))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return total / elapsed, {status: statuses.count(status) for status in set(statuses)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Base PostgreSQL vide à utiliser au lieu d\'un serveur jetable')
+    parser.add_argument('--pg-bin', help='Dossier contenant initdb et pg_ctl')
+    parser.add_argument('--threads', type=int, default=8, help='Threads des vérifications de concurrence')
+    parser.add_argument('--rows', type=int, default=2000, help="Emails dans la file pour la vérification 'files'")
+    parser.add_argument('--subscriptions', type=int, default=400, help="Inscriptions pour la vérification 'compteurs'")
+    parser.add_argument('--workers', type=int, default=4, help='Processus Gunicorn pour la mesure de débit')
+    parser.add_argument('--requests', type=int, default=2000, help='Inscriptions pour la mesure de débit (0 = pas de mesure)')
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    os.environ.update(CHECK_ENV)
+    server = None if args.database_url else TemporaryPostgres(args.pg_bin)
+    url = args.database_url or server.start()
+    os.environ['DATABASE_URL'] = url
+    results = []
+    try:
+        results.append(check_schema(url, processes=4))
+
+        from src.main import create_app
+        app = create_app(start_workers=False)
+        results.append(check_queue_claims(app, args.rows, args.threads))
+        results.append(check_counters(app, args.subscriptions, args.threads))
+
+        if args.requests:
+            with tempfile.TemporaryDirectory() as directory:
+                for name, database_url in (
+                    ('sqlite', f"sqlite:///{os.path.join(directory, 'throughput.db')}"),
+                    ('postgresql', url)
+                ):
+                    rate, statuses = measure_throughput(database_url, args.workers, 4, args.requests, args.concurrency)
+                    print(f'       débit      {name:10s} {rate:7.0f} inscriptions/s '
+                          f'({args.workers} processus Gunicorn, statuts {statuses})')
+    finally:
+        if server is not None:
+            server.stop()
+
+    if not all(results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
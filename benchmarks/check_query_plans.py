@@ -0,0 +1,169 @@
+"""
+Vérifie les plans d'exécution SQLite des requêtes émises par chaque endpoint
+
+Le script crée une base SQLite temporaire, la remplit (1 000 000 d'abonnements par
+défaut), appelle chaque endpoint de l'API via le client de test Flask en capturant
+le SQL émis, puis exécute EXPLAIN QUERY PLAN sur chaque requête. Il échoue (code
+de sortie 1) si une requête parcourt entièrement une table surveillée sans index.
+
+Usage :
+    python benchmarks/check_query_plans.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('EMAIL_QUEUE_WORKERS', '0')
+
+from flask import Flask
+from sqlalchemy import event
+from src.models.subscription import db
+from src.routes.subscription import subscription_bp
+from src.routes.email_queue import email_queue_bp
+from src.routes.provisioning import provisioning_bp
+
+# Tables de taille non bornée : un parcours complet sans index y est interdit
+WATCHED_TABLES = {'subscriptions', 'email_outbox', 'provisioning_jobs'}
+
+PLANS = [
+    ('3months', '3 Mois', '24.99€', '3 mois'),
+    ('6months', '6 Mois', '39.99€', '6 mois'),
+    ('12months', '12 Mois', '59.99€', '12 mois'),
+]
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def seed(path, rows):
+    """
+    Insère rows abonnements avec des dates et statuts variés
+    """
+    connection = sqlite3.connect(path)
+    now = datetime.now()
+    statuses = ['active'] * 7 + ['expired'] * 2 + ['pending']
+
+    def generate():
+        for index in range(rows):
+            plan_id, plan_name, plan_price, plan_duration = PLANS[index % 3]
+            created_at = now - timedelta(minutes=rows - index)
+            yield (
+                f'Client {index}', f'client{index}@example.com', f'+3360000{index:07d}',
+                'whatsapp' if index % 2 else 'telegram',
+                plan_id, plan_name, plan_price, plan_duration,
+                random.choice(statuses), created_at, created_at + timedelta(days=random.randint(-200, 365)),
+                f'user_{index}', f'pass_{index}', 'http://iptv.example.com:8080'
+            )
+
+    connection.executemany(
+        'INSERT INTO subscriptions (full_name, email, phone, contact_method, plan_id, plan_name, '
+        'plan_price, plan_duration, status, created_at, expires_at, iptv_username, iptv_password, iptv_url) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        generate()
+    )
+    connection.commit()
+    connection.execute('ANALYZE')
+    connection.close()
+
+
+def build_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.register_blueprint(subscription_bp, url_prefix='/api')
+    app.register_blueprint(email_queue_bp, url_prefix='/api')
+    app.register_blueprint(provisioning_bp, url_prefix='/api')
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def endpoint_calls(client):
+    """
+    Appels couvrant chaque endpoint et ses variantes (filtres, curseur, export incrémental)
+    """
+    first_page = client.get('/api/subscriptions?limit=50').get_json()
+    cursor = first_page['next_cursor']
+    subscribe_body = {
+        'fullName': 'Plan Check', 'email': 'plan@example.com', 'phone': '+33600000000',
+        'contactMethod': 'whatsapp',
+        'plan': {'id': '3months', 'name': '3 Mois', 'price': '24.99€', 'duration': '3 mois'}
+    }
+    since = (datetime.now() - timedelta(days=1)).isoformat()
+    job_id = client.post('/api/subscribe', json=subscribe_body).get_json().get('job_id')
+    return [
+        ('GET /api/subscriptions', lambda: client.get('/api/subscriptions?limit=50')),
+        ('GET /api/subscriptions (curseur)', lambda: client.get(f'/api/subscriptions?limit=50&cursor={cursor}')),
+        ('GET /api/subscriptions?status=', lambda: client.get('/api/subscriptions?status=active')),
+        ('GET /api/subscriptions?status=&cursor=', lambda: client.get(f'/api/subscriptions?status=active&cursor={cursor}')),
+        ('GET /api/subscriptions?plan_id=', lambda: client.get('/api/subscriptions?plan_id=6months')),
+        ('GET /api/subscriptions/<id>', lambda: client.get('/api/subscriptions/12345')),
+        ('GET /api/subscriptions/expiring', lambda: client.get('/api/subscriptions/expiring')),
+        ('GET /api/subscriptions/export?since=', lambda: client.get(f'/api/subscriptions/export?since={since}').get_data()),
+        ('GET /api/stats', lambda: client.get('/api/stats')),
+        ('GET /api/email-queue/stats', lambda: client.get('/api/email-queue/stats')),
+        ('POST /api/subscribe', lambda: client.post('/api/subscribe', json=subscribe_body)),
+        ('GET /api/jobs/<job_id>', lambda: client.get(f'/api/jobs/{job_id}')),
+        ('POST /api/subscriptions/<id>/renew', lambda: client.post('/api/subscriptions/12345/renew')),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérifie les plans d'exécution des requêtes de l'API")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--database', help='Base SQLite déjà remplie à réutiliser')
+    args = parser.parse_args()
+
+    path = args.database or os.path.join(tempfile.mkdtemp(), 'query_plans.db')
+    app = build_app(path)
+    if not args.database:
+        started = time.perf_counter()
+        seed(path, args.rows)
+        print(f"{args.rows} abonnements insérés en {time.perf_counter() - started:.1f} s")
+
+    with app.app_context():
+        from src.utils.stats_counters import rebuild_counters
+        rebuild_counters()
+
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                captured.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        client = app.test_client()
+        calls = endpoint_calls(client)
+
+        failures = 0
+        connection = sqlite3.connect(path)
+        for label, call in calls:
+            captured.clear()
+            call()
+            print(f"\n{label}")
+            for statement, parameters in list(captured):
+                plan = [row[3] for row in connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                scans = [step for step in plan if (m := FULL_SCAN.match(step)) and m.group(1) in WATCHED_TABLES]
+                status = 'ÉCHEC' if scans else 'ok'
+                failures += bool(scans)
+                print(f"  [{status}] {' '.join(statement.split())[:110]}")
+                for step in plan:
+                    print(f"          {step}")
+        connection.close()
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    if failures:
+        print(f"\n{failures} requête(s) font un parcours complet de table")
+        sys.exit(1)
+    print("\nAucun parcours complet de table")
+
+
+if __name__ == '__main__':
+    main()
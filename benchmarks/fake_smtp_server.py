@@ -0,0 +1,124 @@
+"""
+Serveur SMTP local minimal pour tester l'envoi d'emails sans fournisseur réel
+
+Accepte EHLO/HELO, AUTH (PLAIN/LOGIN), MAIL, RCPT, DATA, RSET, NOOP et QUIT,
+sans STARTTLS : configurez SMTP_USE_TLS=false pour l'utiliser.
+
+Usage :
+    python benchmarks/fake_smtp_server.py --port 1025 --latency 0.05
+
+    SMTP_SERVER=127.0.0.1 SMTP_PORT=1025 SMTP_USE_TLS=false \\
+    SMTP_USERNAME=test SMTP_PASSWORD=test python src/main.py
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def _reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        messages_on_connection = 0
+        mail_from, recipients = None, []
+
+        self._reply('220 localhost fake SMTP ready')
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode(errors='replace').rstrip('\r\n')
+            command = line[:4].upper()
+
+            if command in ('EHLO', 'HELO'):
+                self.wfile.write(b'250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n')
+            elif command == 'AUTH':
+                if line.upper().startswith('AUTH LOGIN'):
+                    self._reply('334 VXNlcm5hbWU6')
+                    self.rfile.readline()
+                    self._reply('334 UGFzc3dvcmQ6')
+                    self.rfile.readline()
+                self._reply('235 Authentication successful')
+            elif command == 'MAIL':
+                mail_from, recipients = line[10:].strip(), []
+                self._reply('250 OK')
+            elif command == 'RCPT':
+                recipients.append(line[8:].strip())
+                self._reply('250 OK')
+            elif command == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                body = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b'.\r\n', b'.\n'):
+                        break
+                    body.append(data_line)
+                if server.latency:
+                    time.sleep(server.latency)
+                with server.lock:
+                    server.messages.append((mail_from, recipients, b''.join(body)))
+                messages_on_connection += 1
+                self._reply('250 OK queued')
+                if server.drop_after and messages_on_connection >= server.drop_after:
+                    # Simule un serveur qui coupe les sessions trop longues
+                    return
+            elif command == 'RSET':
+                mail_from, recipients = None, []
+                self._reply('250 OK')
+            elif command == 'NOOP':
+                self._reply('250 OK')
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Serveur SMTP de test : les messages reçus sont conservés dans self.messages
+
+    latency : délai (secondes) ajouté à chaque DATA pour simuler un fournisseur lent
+    drop_after : coupe la session après N messages (teste la reconnexion du pool)
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, drop_after=0):
+        super().__init__((host, port), _SMTPHandler)
+        self.latency = latency
+        self.drop_after = drop_after
+        self.lock = threading.Lock()
+        self.messages = []
+        self.connections = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1025)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--drop-after', type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeSMTPServer(args.host, args.port, args.latency, args.drop_after)
+    print(f"Serveur SMTP de test à l'écoute sur {args.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,216 @@
+"""
+Test de charge concurrent de l'API des abonnements
+
+Le script remplit une base SQLite temporaire (--rows), remplace l'appel au panel
+Dino par un faux à latence réglable, démarre un serveur SMTP local à latence
+réglable, sert l'application Flask dans un serveur WSGI multi-thread puis envoie
+des requêtes concurrentes sur chaque endpoint. Il affiche p50/p95/p99 et le
+débit par endpoint et enregistre les résultats en JSON pour comparer les runs.
+
+Usage :
+    python benchmarks/load_test.py --rows 100000 --concurrency 16 --requests 500 \\
+        --output bench_output.json
+    python benchmarks/load_test.py --rows 100000 --compare bench_output.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import requests
+
+from check_query_plans import seed
+from fake_smtp_server import FakeSMTPServer
+
+SUBSCRIBE_BODY = {
+    'fullName': 'Load Test',
+    'email': 'load@example.com',
+    'phone': '+33600000000',
+    'contactMethod': 'whatsapp',
+    'plan': {'id': '12months', 'name': '12 Mois', 'price': '59.99€', 'duration': '12 mois'}
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def build_endpoints(rows):
+    """
+    (nom, méthode, fonction -> chemin, corps JSON) pour chaque endpoint mesuré
+    """
+    return [
+        ('POST /api/subscribe', 'POST', lambda: '/api/subscribe', SUBSCRIBE_BODY),
+        ('GET /api/subscriptions', 'GET', lambda: '/api/subscriptions?limit=50', None),
+        ('GET /api/subscriptions/expiring', 'GET', lambda: '/api/subscriptions/expiring', None),
+        ('POST /api/subscriptions/<id>/renew', 'POST',
+         lambda: f'/api/subscriptions/{random.randint(1, rows)}/renew', None),
+        ('GET /api/stats', 'GET', lambda: '/api/stats', None),
+    ]
+
+
+def run_endpoint(base_url, method, path_factory, body, total, concurrency):
+    local = threading.local()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path_factory(), json=body, timeout=60)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': total,
+        'errors': errors,
+        'requests_per_second': round(total / wall, 1),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 2),
+            'p50': round(percentile(latencies, 50) * 1000, 2),
+            'p95': round(percentile(latencies, 95) * 1000, 2),
+            'p99': round(percentile(latencies, 99) * 1000, 2),
+        }
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Liste les endpoints dont le p95 ou le débit se dégradent au-delà de tolerance
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        if current['latency_ms']['p95'] > previous['latency_ms']['p95'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['latency_ms']['p95']} -> {current['latency_ms']['p95']} ms")
+        if current['requests_per_second'] < previous['requests_per_second'] * (1 - tolerance):
+            regressions.append(f"{name}: débit {previous['requests_per_second']} -> {current['requests_per_second']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API des abonnements")
+    parser.add_argument('--rows', type=int, default=10_000, help='abonnements insérés avant le test (10000, 100000, 1000000...)')
+    parser.add_argument('--requests', type=int, default=300, help='requêtes par endpoint')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--dino-latency', type=float, default=0.05, help='latence simulée du panel Dino (s)')
+    parser.add_argument('--smtp-latency', type=float, default=0.05, help='latence simulée du serveur SMTP (s)')
+    parser.add_argument('--endpoint', action='append', help="limiter à certains endpoints (ex. 'GET /api/stats')")
+    parser.add_argument('--output', help='fichier JSON où enregistrer les résultats')
+    parser.add_argument('--compare', help='fichier JSON de référence : code de sortie 1 en cas de régression')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='dégradation tolérée avant régression (0.2 = 20 %%)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='flixstream-bench-')
+    smtp_server = FakeSMTPServer(latency=args.smtp_latency).start()
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'SMTP_SERVER': '127.0.0.1',
+        'SMTP_PORT': str(smtp_server.port),
+        'SMTP_USE_TLS': 'false',
+        'SMTP_USERNAME': 'bench',
+        'SMTP_PASSWORD': 'bench',
+    })
+
+    from werkzeug.serving import make_server
+    import src.routes.subscription as subscription_routes
+    from src.main import app
+    from src.utils.stats_counters import rebuild_counters
+
+    simulated_create_iptv_account = subscription_routes.create_iptv_account
+
+    def fake_create_iptv_account(plan_id, full_name, email):
+        time.sleep(args.dino_latency)
+        return simulated_create_iptv_account(plan_id, full_name, email)
+
+    subscription_routes.create_iptv_account = fake_create_iptv_account
+
+    started = time.perf_counter()
+    seed(os.path.join(workdir, 'bench.db'), args.rows)
+    with app.app_context():
+        rebuild_counters()
+    print(f"{args.rows} abonnements insérés en {time.perf_counter() - started:.1f} s ({workdir})")
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    results = {}
+    for name, method, path_factory, body in build_endpoints(args.rows):
+        if args.endpoint and name not in args.endpoint:
+            continue
+        results[name] = run_endpoint(base_url, method, path_factory, body, args.requests, args.concurrency)
+        result = results[name]
+        print(
+            f"{name:<38} {result['requests_per_second']:>8.1f} req/s  "
+            f"p50 {result['latency_ms']['p50']:>8.2f} ms  p95 {result['latency_ms']['p95']:>8.2f} ms  "
+            f"p99 {result['latency_ms']['p99']:>8.2f} ms  erreurs {result['errors']}"
+        )
+    server.shutdown()
+
+    report = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'rows': args.rows,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'dino_latency': args.dino_latency,
+            'smtp_latency': args.smtp_latency,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Résultats enregistrés dans {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('Régressions détectées :')
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print('Aucune régression par rapport à la référence')
+
+
+if __name__ == '__main__':
+    main()
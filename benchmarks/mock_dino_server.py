@@ -0,0 +1,140 @@
+"""
+Faux panel Dino local pour tester le provisioning sous latence et pannes
+
+POST /create_user répond comme le panel réel ({username, password, server_url}).
+La latence et les pannes se règlent au lancement ou à chaud via POST /__control :
+
+    curl -X POST localhost:8090/__control -d '{"error_rate": 0.5, "latency": 2}'
+
+Usage :
+    python benchmarks/mock_dino_server.py --port 8090 --latency 0.2 --error-rate 0.1
+
+    DINO_API_ENABLED=true DINO_API_URL=http://127.0.0.1:8090 python src/main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _DinoHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_POST(self):
+        server = self.server
+        payload = self._read_json()
+
+        if self.path == '/__control':
+            with server.lock:
+                for name in ('latency', 'jitter', 'error_rate', 'rate_limit_rate', 'hang_rate'):
+                    if name in payload:
+                        setattr(server, name, float(payload[name]))
+            return self._send_json(200, server.settings())
+
+        if self.path.rstrip('/').endswith('/create_user'):
+            with server.lock:
+                server.requests += 1
+            delay = server.latency + random.uniform(0, server.jitter)
+            roll = random.random()
+            if roll < server.hang_rate:
+                # Panel bloqué : dépasse n'importe quel timeout de lecture raisonnable
+                time.sleep(max(delay, 60))
+            elif delay:
+                time.sleep(delay)
+
+            if roll < server.rate_limit_rate:
+                return self._send_json(429, {'error': 'rate limited'}, {'Retry-After': '1'})
+            if roll < server.rate_limit_rate + server.error_rate:
+                return self._send_json(500, {'error': 'internal error'})
+
+            with server.lock:
+                server.created += 1
+            return self._send_json(200, {
+                'username': payload.get('username'),
+                'password': payload.get('password'),
+                'server_url': 'http://mock-dino.local:8080'
+            })
+
+        self._send_json(404, {'error': 'not found'})
+
+
+class MockDinoServer(ThreadingHTTPServer):
+    """
+    Faux panel Dino
+
+    latency/jitter : délai de réponse (secondes) ; error_rate : proportion de 500 ;
+    rate_limit_rate : proportion de 429 ; hang_rate : proportion de requêtes bloquées
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, hang_rate=0.0):
+        super().__init__((host, port), _DinoHandler)
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.hang_rate = hang_rate
+        self.requests = 0
+        self.created = 0
+
+    @property
+    def url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def settings(self):
+        return {
+            'latency': self.latency,
+            'jitter': self.jitter,
+            'error_rate': self.error_rate,
+            'rate_limit_rate': self.rate_limit_rate,
+            'hang_rate': self.hang_rate,
+            'requests': self.requests,
+            'created': self.created
+        }
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--hang-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockDinoServer(args.host, args.port, args.latency, args.jitter,
+                            args.error_rate, args.rate_limit_rate, args.hang_rate)
+    print(f"Faux panel Dino à l'écoute sur {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
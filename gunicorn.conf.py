@@ -0,0 +1,46 @@
+"""
+Configuration Gunicorn : gunicorn -c gunicorn.conf.py
+
+L'application est chargée une seule fois par le maître (preload_app) puis partagée
+par les workers forkés (copy-on-write) : un redémarrage ou l'ajout d'un worker ne
+réimporte rien. GUNICORN_PRELOAD=false pour charger l'application dans chaque worker.
+
+Nombre de processus par défaut : 2 avec SQLite (un seul écrivain à la fois, d'autres
+processus ne feraient qu'attendre le verrou), nombre de CPU + 1 avec PostgreSQL.
+Chaque processus a son pool de connexions (DB_POOL_SIZE + DB_MAX_OVERFLOW) : prévoir
+max_connections ≥ nœuds × GUNICORN_WORKERS × (DB_POOL_SIZE + DB_MAX_OVERFLOW), ou
+placer PgBouncer devant la base (DB_PGBOUNCER=true).
+"""
+import multiprocessing
+import os
+from sqlalchemy.engine import make_url
+from src.config import get_database_url
+
+wsgi_app = 'src.main:create_app(start_workers=False)'
+
+_sqlite = make_url(get_database_url()).get_backend_name() == 'sqlite'
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS') or (2 if _sqlite else multiprocessing.cpu_count() + 1))
+# Threads par processus : les requêtes attendent surtout le panel Dino et la base
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+# Derrière Nginx (keepalive vers l'amont) : garder les connexions ouvertes entre deux requêtes
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+# Recyclage des workers après N requêtes (0 = jamais), décalé pour ne pas tous les redémarrer ensemble
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+# Fichier de battement de cœur en mémoire : un disque lent ne fait pas tuer les workers
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Les logs de l'application passent par src/utils/logging_config.py
+accesslog = None
+
+
+def post_fork(server, worker):
+    # Threads de logs et workers de fond, pool de connexions propre au processus
+    from src.main import post_fork as init_worker
+    init_worker(worker.app.wsgi())
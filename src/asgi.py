@@ -0,0 +1,364 @@
+"""
+Mode de service asynchrone (ASGI), optionnel : pip install -r requirements-async.txt
+
+    uvicorn --factory src.asgi:create_asgi_app --host 0.0.0.0 --port 5000
+
+POST /api/subscribe et POST /api/subscriptions/<id>/renew sont traités sur la
+boucle d'événements : l'attente du panel Dino (httpx) et de la base (SQLAlchemy
+asyncio) n'occupe aucun thread, si bien qu'un processus tient des centaines
+d'inscriptions en attente du panel. Les campagnes de relance envoient leurs
+emails via aiosmtplib sur cette même boucle. Toutes les autres routes sont
+servies par l'application Flask (WSGI) dans un pool de threads.
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+from werkzeug.datastructures import Headers
+from src.main import create_app
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncConcurrencyLimiter:
+    """
+    Contrôle d'admission sur la boucle d'événements : mêmes réglages que
+    ConcurrencyLimiter (ADMISSION_*), l'attente d'une place ne bloque aucun thread
+    """
+
+    def __init__(self, limit=8, queue_size=16, queue_timeout=2.0):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self.shed = 0
+        self._slots = asyncio.Semaphore(max(limit, 1))
+
+    async def acquire(self):
+        if self.limit <= 0:
+            return True
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return True
+        if self.waiting >= self.queue_size:
+            self.shed += 1
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        if self.limit > 0:
+            self._slots.release()
+
+
+class ASGIRequest:
+    """
+    Requête HTTP lue depuis le scope ASGI, avec l'interface attendue par les
+    règles de src/utils/rate_limit.py (headers, remote_addr, get_json)
+    """
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']])
+        self.remote_addr = scope['client'][0] if scope.get('client') else None
+        self.body = body
+
+    def get_json(self, silent=False):
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            if silent:
+                return None
+            raise
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _send_json(send, status, payload, headers=None):
+    from src.utils.serialization import dumps
+
+    body = dumps(payload)
+    raw_headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    raw_headers.extend((name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in (headers or {}).items())
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class FlixStreamASGI:
+    """
+    Application ASGI : routes asynchrones du provisioning, le reste délégué à Flask
+    """
+
+    def __init__(self, flask_app):
+        from asgiref.wsgi import WsgiToAsgi
+        from src.utils.rate_limit import IP_RATE_LIMIT, provisioning_limiter
+
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.limiter = AsyncConcurrencyLimiter(
+            provisioning_limiter.limit, provisioning_limiter.queue_size, provisioning_limiter.queue_timeout
+        )
+        # (méthode, motif, gestionnaire, règles de débit, étiquette de route pour /metrics)
+        self.routes = [
+            # EMAIL_RATE_LIMIT : appliqué par subscribe après validation du corps
+            ('POST', re.compile(r'^/api/subscribe$'), self.subscribe,
+             (IP_RATE_LIMIT,), '/api/subscribe'),
+            ('POST', re.compile(r'^/api/subscriptions/(?P<subscription_id>\d+)/renew$'), self.renew_subscription,
+             (IP_RATE_LIMIT,), '/api/subscriptions/<int:subscription_id>/renew'),
+        ]
+        self.engine = self.sessions = self.dino = self.smtp = self.loop = None
+        self._started = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http':
+            route = self._match(scope)
+            # Idempotency-Key : traitée par le décorateur @idempotent de la route Flask
+            if route is not None and not any(name == b'idempotency-key' for name, _ in scope['headers']):
+                await self._ensure_started()
+                return await self._handle(route, scope, receive, send)
+        await self.wsgi(scope, receive, send)
+
+    def _match(self, scope):
+        for method, pattern, handler, rules, label in self.routes:
+            if scope['method'] == method:
+                match = pattern.match(scope['path'])
+                if match:
+                    return handler, {name: int(value) for name, value in match.groupdict().items()}, rules, label
+        return None
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self._ensure_started()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self._shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _ensure_started(self):
+        if self._started is None:
+            self._started = asyncio.ensure_future(self._startup())
+        await asyncio.shield(self._started)
+
+    async def _startup(self):
+        from src.utils.async_db import create_async_session_factory
+        from src.utils.dino_client import AsyncDinoClient
+        from src.utils.reminders import reminder_engine
+        from src.utils.smtp_pool import AsyncSMTPConnectionPool
+
+        self.loop = asyncio.get_running_loop()
+        self.engine, self.sessions = create_async_session_factory()
+        self.dino = AsyncDinoClient.from_env()
+        self.smtp = AsyncSMTPConnectionPool.from_env()
+        # Les campagnes tournent dans un thread : leurs envois passent par aiosmtplib sur cette boucle
+        reminder_engine.send_batch = self._send_reminders
+        logger.info('Mode ASGI démarré (routes asynchrones : %s)', ', '.join(route[4] for route in self.routes))
+
+    async def _shutdown(self):
+        from src.utils.reminders import _send_reminders, reminder_engine
+
+        if self._started is None:
+            return
+        reminder_engine.send_batch = _send_reminders
+        await self.dino.close()
+        await self.smtp.close()
+        await self.engine.dispose()
+
+    def _send_reminders(self, reminders, connections):
+        from src.utils.email_sender import send_renewal_reminder_emails_async
+
+        future = asyncio.run_coroutine_threadsafe(
+            send_renewal_reminder_emails_async(self.smtp, reminders, connections), self.loop
+        )
+        return future.result()
+
+    async def _handle(self, route, scope, receive, send):
+        from src.utils.logging_config import bind_request_context, log_access, request_id_from, unbind_request_context
+        from src.utils.metrics import begin_request_timings, end_request_timings, record_request
+        from src.utils.rate_limit import rate_limiter, too_many_requests
+
+        handler, params, rules, label = route
+        started = time.perf_counter()
+        request = ASGIRequest(scope, await _read_body(receive))
+        request_id = request_id_from(request.headers.get('X-Request-ID'))
+        log_token = bind_request_context(request_id, request.method, label)
+        timings_token = begin_request_timings()
+        try:
+            wait = rate_limiter.check(request, rules) if rate_limiter.enabled else 0
+            if wait:
+                status, (payload, headers) = 429, too_many_requests(wait)
+            elif not await self.limiter.acquire():
+                status, payload, headers = 503, {
+                    'error': 'Service surchargé, réessayez dans quelques instants'
+                }, {'Retry-After': '1'}
+            else:
+                try:
+                    status, payload, headers = await handler(request, **params)
+                except Exception as e:
+                    logger.exception('Erreur: %s', e)
+                    status, payload, headers = 500, {'error': 'Une erreur est survenue'}, {}
+                finally:
+                    self.limiter.release()
+
+            duration = time.perf_counter() - started
+            headers = {
+                **headers,
+                'X-Request-ID': request_id,
+                'Server-Timing': record_request(request.method, label, status, duration, end_request_timings(timings_token))
+            }
+            timings_token = None
+            await _send_json(send, status, payload, headers)
+            log_access(request.method, request.path, status, duration)
+        finally:
+            if timings_token is not None:
+                end_request_timings(timings_token)
+            unbind_request_context(log_token)
+
+    async def subscribe(self, request):
+        """
+        POST /api/subscribe, comme la route Flask (202 + job, ou 201 avec ASYNC_PROVISIONING=false)
+        """
+        from src.models.subscription import Subscription
+        from src.routes.subscription import ASYNC_PROVISIONING, create_iptv_account_async
+        from src.utils.email_queue import email_queue, enqueue_email
+        from src.utils.provisioning import apply_iptv_account, enqueue_provisioning, provisioning_queue
+        from src.utils.rate_limit import EMAIL_RATE_LIMIT, rate_limiter, too_many_requests
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return 400, {'error': 'Corps JSON invalide'}, {}
+
+        # Validation des données
+        for field in ['fullName', 'email', 'phone', 'contactMethod', 'plan']:
+            if field not in data:
+                return 400, {'error': f'Le champ {field} est requis'}, {}
+
+        plan = data['plan']
+        subscription = Subscription(
+            full_name=data['fullName'],
+            email=data['email'],
+            phone=data['phone'],
+            contact_method=data['contactMethod'],
+            plan_id=plan['id'],
+            plan_name=plan['name'],
+            plan_price=plan['price'],
+            plan_duration=plan['duration'],
+            status='pending'
+        )
+
+        # Quota par email décompté seulement pour une demande valide (comme la route Flask)
+        wait = rate_limiter.check(request, (EMAIL_RATE_LIMIT,)) if rate_limiter.enabled else 0
+        if wait:
+            return (429, *too_many_requests(wait))
+
+        if ASYNC_PROVISIONING:
+            async with self.sessions() as session:
+                session.add(subscription)
+                await session.flush()
+                job = enqueue_provisioning(subscription, session=session)
+                subscription_id, job_id = subscription.id, job.id
+                await session.commit()
+            provisioning_queue.notify()
+
+            status_url = f'/api/jobs/{job_id}'
+            return 202, {
+                'success': True,
+                'message': 'Abonnement enregistré, création du compte en cours',
+                'subscription_id': subscription_id,
+                'job_id': job_id,
+                'status_url': status_url
+            }, {'Location': status_url}
+
+        # Appel au panel avant d'ouvrir la session : aucune connexion SQL n'est retenue pendant l'attente
+        iptv_account = await create_iptv_account_async(self.dino, plan['id'], data['fullName'], data['email'])
+        if not iptv_account:
+            return 500, {'error': 'Erreur lors de la création du compte IPTV'}, {}
+
+        apply_iptv_account(subscription, iptv_account)
+        async with self.sessions() as session:
+            session.add(subscription)
+            enqueue_email(
+                'subscription',
+                data['email'],
+                session=session,
+                full_name=data['fullName'],
+                plan_name=plan['name'],
+                iptv_credentials={
+                    'username': iptv_account['username'],
+                    'password': iptv_account['password'],
+                    'url': iptv_account['url']
+                }
+            )
+            await session.commit()
+        email_queue.notify()
+
+        return 201, {
+            'success': True,
+            'message': 'Abonnement créé avec succès',
+            'subscription_id': subscription.id,
+            'credentials': {
+                'username': iptv_account['username'],
+                'password': iptv_account['password'],
+                'url': iptv_account['url']
+            }
+        }, {}
+
+    async def renew_subscription(self, request, subscription_id):
+        """
+        POST /api/subscriptions/<id>/renew, comme la route Flask
+        """
+        from src.models.subscription import Subscription
+        from src.routes.subscription import create_iptv_account_async
+        from src.utils.provisioning import apply_iptv_account
+
+        async with self.sessions() as session:
+            subscription = await session.get(Subscription, subscription_id)
+            if not subscription:
+                return 404, {'error': 'Abonnement non trouvé'}, {}
+            plan_id, full_name, email = subscription.plan_id, subscription.full_name, subscription.email
+
+        # Session fermée pendant l'appel au panel : la connexion retourne au pool
+        iptv_account = await create_iptv_account_async(self.dino, plan_id, full_name, email)
+        if not iptv_account:
+            return 500, {'error': 'Erreur lors du renouvellement'}, {}
+
+        async with self.sessions() as session:
+            subscription = await session.get(Subscription, subscription_id, with_for_update=True)
+            if not subscription:
+                return 404, {'error': 'Abonnement non trouvé'}, {}
+            apply_iptv_account(subscription, iptv_account)
+            await session.commit()
+            subscription_data = subscription.to_dict()
+
+        return 200, {
+            'success': True,
+            'message': 'Abonnement renouvelé avec succès',
+            'subscription': subscription_data
+        }, {}
+
+
+def create_asgi_app():
+    """
+    Application ASGI (uvicorn --factory src.asgi:create_asgi_app)
+    """
+    return FlixStreamASGI(create_app())
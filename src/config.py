@@ -0,0 +1,102 @@
+import os
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import NullPool
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'database', 'app.db')}"
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def uses_pgbouncer():
+    """
+    DB_PGBOUNCER=true : la base est derrière PgBouncer en mode transaction, qui tient
+    le pool de connexions côté serveur pour tous les processus et tous les nœuds
+    """
+    return os.environ.get('DB_PGBOUNCER', 'false').lower() in ('1', 'true', 'yes')
+
+
+def get_database_url():
+    """
+    URL de la base : DATABASE_URL si définie, sinon SQLite dans src/database/app.db
+    """
+    url = os.environ.get('DATABASE_URL') or DEFAULT_DATABASE_URL
+    # Certains hébergeurs fournissent encore l'ancien schéma postgres://
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def get_sqlite_pragmas():
+    """
+    PRAGMA appliqués à chaque nouvelle connexion SQLite
+
+    WAL permet aux lectures de ne pas bloquer l'écriture en cours (et inversement),
+    synchronous=NORMAL évite un fsync par commit (sûr en mode WAL), busy_timeout fait
+    attendre un écrivain concurrent au lieu d'échouer avec "database is locked".
+    """
+    return {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', '5000'),
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)),
+        # Valeur négative : taille en Kio (64 Mio par défaut)
+        'cache_size': _env_int('SQLITE_CACHE_SIZE', '-65536'),
+        'temp_store': 'MEMORY'
+    }
+
+
+def get_engine_options(url):
+    """
+    Options du moteur SQLAlchemy (taille du pool de connexions, etc.)
+    """
+    options = {
+        'pool_size': _env_int('DB_POOL_SIZE', '5'),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', '10'),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', '30')
+    }
+    backend = make_url(url).get_backend_name()
+    if backend == 'sqlite':
+        if make_url(url).database in (None, '', ':memory:'):
+            # Base en mémoire : une seule connexion partagée, pas de pool configurable
+            return {}
+        # Le timeout du pilote sqlite3 double busy_timeout pour l'ouverture de connexion
+        options['connect_args'] = {'timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', '5000') / 1000}
+    elif uses_pgbouncer():
+        # Pas de pool dans le processus : chaque transaction ouvre une connexion vers
+        # PgBouncer (locale, peu coûteuse), qui la multiplexe sur ses connexions serveur
+        return {'poolclass': NullPool}
+    else:
+        options['pool_recycle'] = _env_int('DB_POOL_RECYCLE', '1800')
+        options['pool_pre_ping'] = True
+    return options
+
+
+def configure_database(app):
+    """
+    Configure Flask-SQLAlchemy depuis l'environnement
+    """
+    url = get_database_url()
+    parsed = make_url(url)
+    if parsed.get_backend_name() == 'sqlite' and parsed.database not in (None, '', ':memory:'):
+        directory = os.path.dirname(parsed.database)
+        if directory and os.path.isabs(parsed.database):
+            os.makedirs(directory, exist_ok=True)
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_engine_options(url)
+
+
+@event.listens_for(Engine, 'connect')
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in get_sqlite_pragmas().items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
@@ -3,44 +3,150 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, current_app
 from flask_cors import CORS
-from src.models.subscription import db
-from src.routes.subscription import subscription_bp
+from src.utils.logging_config import configure_logging
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'flixstream_secret_key_2025'
+# Logs JSON écrits par un thread dédié (LOG_LEVEL, LOG_FORMAT)
+configure_logging()
 
-# Enable CORS for development
-CORS(app)
 
-# Register blueprints
-app.register_blueprint(subscription_bp, url_prefix='/api')
+def create_app(start_workers=True):
+    """
+    Crée l'application : blueprints, base de données, commandes CLI et workers de fond
+
+    Les routes, les modèles et leurs dépendances ne sont importés qu'ici ; les
+    modules lourds et rarement utilisés (requests, smtplib, MIME, Jinja2, dialecte
+    PostgreSQL) le sont à leur première utilisation. Avec start_workers=False
+    (gunicorn --preload), les threads de fond sont démarrés dans chaque worker
+    après le fork par start_background_workers() (voir gunicorn.conf.py).
+    """
+    from src.config import configure_database
+    from src.models.subscription import db
+    from src.models.schema_version import ensure_schema
+    from src.routes.subscription import subscription_bp
+    from src.routes.email_queue import email_queue_bp
+    from src.routes.provisioning import provisioning_bp
+    from src.routes.expiry import expiry_bp
+    from src.routes.reminders import reminders_bp
+    from src.routes.metrics import metrics_bp
+    from src.utils.bulk_import import import_subscriptions_command
+    from src.utils.expiry_sweeper import sweep_expired_command
+    from src.utils.logging_config import init_request_logging
+    from src.utils.metrics import init_metrics
+    from src.utils.reminders import send_reminders_command
+    from src.utils.static_files import StaticFiles, compress_static_command
+    from src.utils.stats_counters import ensure_counters
+
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'flixstream_secret_key_2025')
+
+    # Enable CORS for development
+    CORS(app)
+
+    # Identifiant de requête (X-Request-ID) et journal des requêtes
+    init_request_logging(app)
+
+    # Mesure des requêtes (temps SQL, panel Dino, SMTP), exposée sur /metrics
+    init_metrics(app)
+
+    # Register blueprints
+    app.register_blueprint(subscription_bp, url_prefix='/api')
+    app.register_blueprint(email_queue_bp, url_prefix='/api')
+    app.register_blueprint(provisioning_bp, url_prefix='/api')
+    app.register_blueprint(expiry_bp, url_prefix='/api')
+    app.register_blueprint(reminders_bp, url_prefix='/api')
+    app.register_blueprint(metrics_bp)
+
+    # Commandes CLI (flask --app src.main <commande>)
+    app.cli.add_command(sweep_expired_command)
+    app.cli.add_command(send_reminders_command)
+    app.cli.add_command(compress_static_command)
+    app.cli.add_command(import_subscriptions_command)
+
+    # Database configuration (DATABASE_URL, pool et PRAGMA SQLite : voir src/config.py)
+    configure_database(app)
+    db.init_app(app)
+    with app.app_context():
+        # Tables et index créés seulement si les modèles ont changé (SCHEMA_CHECK)
+        ensure_schema()
+        ensure_counters()
+
+    # Frontend : manifeste des fichiers construit une fois, variantes gzip/br, cache long des fichiers hachés
+    app.extensions['static_files'] = StaticFiles(app.static_folder).build()
+    app.add_url_rule('/', 'serve', serve, defaults={'path': ''})
+    app.add_url_rule('/<path:path>', 'serve', serve)
+
+    if start_workers:
+        start_background_workers(app)
+    return app
+
+
+def start_background_workers(app):
+    """
+    Démarre les threads de fond du processus (à rappeler dans un worker forké)
+    """
+    from src.utils.email_queue import email_queue
+    from src.utils.expiry_sweeper import expiry_sweeper
+    from src.utils.metrics import profiler
+    from src.utils.provisioning import provisioning_queue
+    from src.utils.reminders import reminder_scheduler
+
+    # Workers d'envoi des emails (EMAIL_QUEUE_WORKERS=0 pour les désactiver)
+    if email_queue.workers > 0:
+        email_queue.start(app)
+
+    # Workers de création des comptes IPTV (PROVISIONING_WORKERS=0 pour les désactiver)
+    if provisioning_queue.workers > 0:
+        provisioning_queue.start(app)
+
+    # Expiration périodique des abonnements (EXPIRY_SWEEP_INTERVAL=0 pour la désactiver)
+    if expiry_sweeper.workers > 0:
+        expiry_sweeper.start(app)
+
+    # Campagnes de relance périodiques (REMINDER_CAMPAIGN_INTERVAL=0 par défaut : désactivées)
+    if reminder_scheduler.workers > 0:
+        reminder_scheduler.start(app)
+
+    # Profileur des requêtes lentes (PROFILER_ENABLED)
+    if profiler.enabled:
+        profiler.start()
+
+
+def post_fork(app):
+    """
+    À appeler dans un worker forké depuis un maître qui a chargé l'application
+
+    Les threads (logs, workers de fond) ne survivent pas au fork et les connexions
+    du pool ne doivent pas être partagées entre processus.
+    """
+    from src.models.subscription import db
+
+    configure_logging()
+    with app.app_context():
+        # close=False : les connexions héritées restent ouvertes pour le maître
+        db.engine.dispose(close=False)
+    start_background_workers(app)
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
+    from src.utils.static_files import serve_static
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+    return serve_static(current_app.extensions['static_files'], path)
 
 
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+_app = None
+
 
+def __getattr__(name):
+    # src.main:app (flask --app src.main, gunicorn src.main:app) : application créée au premier accès
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+if __name__ == '__main__':
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,29 @@
+from datetime import datetime
+from src.models.subscription import db
+
+class ExpirySweep(db.Model):
+    __tablename__ = 'expiry_sweeps'
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, completed, failed
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration_ms = db.Column(db.Float, nullable=True)
+    expired_count = db.Column(db.Integer, nullable=False, default=0)
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return f'<ExpirySweep {self.id} ({self.status}, {self.expired_count} expirés)>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_ms': self.duration_ms,
+            'expired_count': self.expired_count,
+            'batches': self.batches,
+            'error': self.error
+        }
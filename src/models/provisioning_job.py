@@ -0,0 +1,39 @@
+from datetime import datetime
+from src.models.subscription import db
+
+class ProvisioningJob(db.Model):
+    __tablename__ = 'provisioning_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)  # identifiant uuid4 hexadécimal
+    subscription_id = db.Column(db.Integer, db.ForeignKey('subscriptions.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    claim_token = db.Column(db.String(32), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_provisioning_jobs_status_next_attempt', 'status', 'next_attempt_at'),
+        db.Index('ix_provisioning_jobs_claim_token', 'claim_token'),
+    )
+
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def __repr__(self):
+        return f'<ProvisioningJob {self.id} ({self.status})>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'subscription_id': self.subscription_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,70 @@
+from datetime import datetime
+from src.models.subscription import db
+
+class ReminderCampaign(db.Model):
+    __tablename__ = 'reminder_campaigns'
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, completed, failed
+    window_start = db.Column(db.DateTime, nullable=False)
+    window_end = db.Column(db.DateTime, nullable=False)
+    checkpoint_id = db.Column(db.Integer, nullable=False, default=0)  # dernier abonnement traité
+    backlog = db.Column(db.Integer, nullable=False, default=0)  # relances dues au démarrage
+    sent = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Au plus une campagne en cours, quelle que soit la base (pas de verrou consultatif sur SQLite)
+        db.Index(
+            'uq_reminder_campaigns_running', 'status', unique=True,
+            sqlite_where=db.text("status = 'running'"),
+            postgresql_where=db.text("status = 'running'")
+        ),
+    )
+
+    def __repr__(self):
+        return f'<ReminderCampaign {self.id} ({self.status})>'
+
+    def to_dict(self):
+        end = self.finished_at or datetime.utcnow()
+        elapsed = (end - self.started_at).total_seconds() if self.started_at else 0
+        processed = self.sent + self.failed + self.skipped
+        return {
+            'id': self.id,
+            'status': self.status,
+            'window_start': self.window_start.isoformat(),
+            'window_end': self.window_end.isoformat(),
+            'checkpoint_id': self.checkpoint_id,
+            'backlog': self.backlog,
+            'remaining': max(self.backlog - processed, 0),
+            'sent': self.sent,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'emails_per_second': round(self.sent / elapsed, 2) if elapsed > 0 else None,
+            'error': self.error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class ReminderLedger(db.Model):
+    __tablename__ = 'reminder_ledger'
+
+    id = db.Column(db.Integer, primary_key=True)
+    subscription_id = db.Column(db.Integer, db.ForeignKey('subscriptions.id'), nullable=False)
+    # Période relancée : date d'expiration de l'abonnement (une relance par période)
+    window_key = db.Column(db.String(20), nullable=False)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('reminder_campaigns.id'), nullable=True)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('subscription_id', 'window_key', name='uq_reminder_ledger_subscription_window'),
+    )
+
+    def __repr__(self):
+        return f'<ReminderLedger {self.subscription_id} {self.window_key}>'
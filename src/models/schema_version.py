@@ -0,0 +1,102 @@
+import hashlib
+import logging
+import os
+from datetime import datetime
+from sqlalchemy import inspect, insert, select, update
+from sqlalchemy.exc import DBAPIError
+from src.models.subscription import db
+from src.utils.background import advisory_xact_lock
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaVersion(db.Model):
+    """
+    Empreinte du schéma appliqué à la base (une seule ligne)
+    """
+    __tablename__ = 'schema_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def schema_fingerprint(metadata):
+    """
+    Empreinte des tables, colonnes, index et contraintes déclarés par les modèles
+
+    Calculée sans accès à la base : elle change dès qu'un modèle est modifié.
+    """
+    hasher = hashlib.sha256()
+    for table in sorted(metadata.tables.values(), key=lambda table: table.name):
+        hasher.update(f'table {table.name}\n'.encode())
+        for column in table.columns:
+            hasher.update(
+                f'column {column.name} {column.type} {column.nullable} {column.primary_key}\n'.encode()
+            )
+        # Index et contraintes sont des ensembles (souvent sans nom) : lignes triées
+        lines = [
+            f"index {index.name} {','.join(column.name for column in index.columns)} {index.unique}\n"
+            for index in table.indexes
+        ] + [
+            f"constraint {type(constraint).__name__} {constraint.name} {','.join(column.name for column in constraint.columns)}\n"
+            for constraint in table.constraints
+        ]
+        for line in sorted(lines):
+            hasher.update(line.encode())
+    return hasher.hexdigest()
+
+
+def _applied_fingerprint(connection=None):
+    if connection is not None:
+        return connection.execute(select(SchemaVersion.fingerprint).where(SchemaVersion.id == 1)).scalar()
+    try:
+        with db.engine.connect() as connection:
+            return _applied_fingerprint(connection)
+    except DBAPIError:
+        # Base neuve : la table schema_version n'existe pas encore
+        return None
+
+
+def ensure_schema():
+    """
+    Crée les tables et index manquants, seulement si les modèles ont changé
+
+    db.create_all() inspecte chaque table à chaque démarrage de worker ; ici une
+    seule requête compare l'empreinte des modèles à celle enregistrée en base.
+    SCHEMA_CHECK=always force la vérification complète, SCHEMA_CHECK=skip la
+    désactive (schéma géré par un outil de migration). Retourne True si le schéma
+    a été (re)appliqué.
+
+    Sur PostgreSQL, le schéma est appliqué dans une transaction sous verrou
+    consultatif : les nœuds qui démarrent ensemble l'appliquent l'un après l'autre,
+    et ceux qui arrivent après le premier n'ont plus rien à faire.
+    """
+    mode = os.environ.get('SCHEMA_CHECK', 'auto').lower()
+    if mode == 'skip':
+        return False
+
+    fingerprint = schema_fingerprint(db.metadata)
+    if mode != 'always' and _applied_fingerprint() == fingerprint:
+        return False
+
+    with db.engine.begin() as connection:
+        advisory_xact_lock(connection, 'schema')
+        if (mode != 'always' and connection.dialect.name == 'postgresql'
+                and inspect(connection).has_table(SchemaVersion.__tablename__)
+                and _applied_fingerprint(connection) == fingerprint):
+            # Appliqué par un autre nœud pendant l'attente du verrou
+            return False
+
+        db.metadata.create_all(connection)
+        # create_all() ne crée les index qu'avec leur table : ajoute ceux des tables existantes
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+
+        table = SchemaVersion.__table__
+        values = {'fingerprint': fingerprint, 'applied_at': datetime.utcnow()}
+        if not connection.execute(update(table).where(table.c.id == 1).values(**values)).rowcount:
+            connection.execute(insert(table).values(id=1, **values))
+    logger.info('Schéma de la base appliqué (empreinte %s)', fingerprint[:12])
+    return True
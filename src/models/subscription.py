@@ -3,6 +3,7 @@ from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+
 class Subscription(db.Model):
     __tablename__ = 'subscriptions'
     
@@ -22,6 +23,20 @@ class Subscription(db.Model):
     iptv_password = db.Column(db.String(100), nullable=True)
     iptv_url = db.Column(db.String(200), nullable=True)
     
+    __table_args__ = (
+        # /subscriptions/expiring, expirations et relances : status = ? AND expires_at <= ?
+        db.Index('ix_subscriptions_status_expires_at', 'status', 'expires_at'),
+        # Pagination et exports triés par (created_at, id)
+        db.Index('ix_subscriptions_created_at_id', 'created_at', 'id'),
+        # Pagination filtrée par statut
+        db.Index('ix_subscriptions_status_created_at_id', 'status', 'created_at', 'id'),
+        # Recalcul des statistiques : GROUP BY status, plan_name (index couvrant)
+        db.Index('ix_subscriptions_status_plan_name', 'status', 'plan_name'),
+        # Recherche d'un client par le support
+        db.Index('ix_subscriptions_email', 'email'),
+        db.Index('ix_subscriptions_phone', 'phone'),
+    )
+    
     def __repr__(self):
         return f'<Subscription {self.full_name} - {self.plan_name}>'
     
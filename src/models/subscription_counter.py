@@ -0,0 +1,15 @@
+from src.models.subscription import db
+
+class SubscriptionCounter(db.Model):
+    # Chaque compteur (statut, plan) est réparti sur plusieurs lignes (shard) : les
+    # transactions concurrentes incrémentent des lignes différentes au lieu de
+    # s'attendre sur la même. La valeur d'un compteur est la somme de ses lignes.
+    __tablename__ = 'subscription_counter_shards'
+
+    status = db.Column(db.String(20), primary_key=True)
+    plan_name = db.Column(db.String(50), primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True, default=0, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<SubscriptionCounter {self.status}/{self.plan_name}#{self.shard}: {self.count}>'
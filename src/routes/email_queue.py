@@ -0,0 +1,20 @@
+import logging
+from flask import Blueprint, jsonify
+from src.utils.email_queue import email_queue
+
+email_queue_bp = Blueprint('email_queue', __name__)
+logger = logging.getLogger(__name__)
+
+@email_queue_bp.route('/email-queue/stats', methods=['GET'])
+def get_email_queue_stats():
+    """
+    Endpoint pour suivre la file d'envoi des emails (profondeur, latence d'envoi)
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'stats': email_queue.stats()
+        }), 200
+    except Exception as e:
+        logger.exception('Erreur: %s', e)
+        return jsonify({'error': 'Une erreur est survenue'}), 500
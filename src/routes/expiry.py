@@ -0,0 +1,45 @@
+import logging
+from flask import Blueprint, request, jsonify
+from src.models.subscription import db
+from src.models.expiry_sweep import ExpirySweep
+from src.utils.expiry_sweeper import expiry_sweeper, sweep_expired
+
+expiry_bp = Blueprint('expiry', __name__)
+logger = logging.getLogger(__name__)
+
+@expiry_bp.route('/expiry-sweeps', methods=['GET'])
+def get_expiry_sweeps():
+    """
+    Endpoint pour consulter les derniers passages d'expiration (durée, nombre d'abonnements expirés)
+    """
+    try:
+        try:
+            limit = int(request.args.get('limit') or 20)
+        except ValueError:
+            return jsonify({'error': 'Le paramètre limit doit être un entier'}), 400
+        # Borné des deux côtés : LIMIT -1 signifie « sans limite » sur SQLite
+        limit = max(1, min(limit, 100))
+        sweeps = ExpirySweep.query.order_by(ExpirySweep.id.desc()).limit(limit).all()
+        return jsonify({
+            'success': True,
+            'sweeps': [sweep.to_dict() for sweep in sweeps]
+        }), 200
+    except Exception as e:
+        logger.exception('Erreur: %s', e)
+        return jsonify({'error': 'Une erreur est survenue'}), 500
+
+@expiry_bp.route('/expiry-sweeps', methods=['POST'])
+def run_expiry_sweep():
+    """
+    Endpoint pour lancer immédiatement un passage d'expiration
+    """
+    try:
+        sweep = sweep_expired(batch_size=expiry_sweeper.batch_size)
+        return jsonify({
+            'success': sweep.status == 'completed',
+            'sweep': sweep.to_dict()
+        }), 200 if sweep.status == 'completed' else 500
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Erreur: %s', e)
+        return jsonify({'error': 'Une erreur est survenue'}), 500
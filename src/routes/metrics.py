@@ -0,0 +1,35 @@
+from flask import Blueprint, Response
+from src.utils.cache import response_cache
+from src.utils.metrics import render_metrics
+from src.utils.rate_limit import provisioning_limiter, rate_limiter
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Endpoint Prometheus : latences des requêtes, temps SQL et appels sortants de ce processus
+    """
+    lines = [render_metrics()]
+    cache = response_cache.stats()
+    if cache.get('backend'):
+        lines.append('# HELP flixstream_cache_requests_total Lectures du cache de réponses\n')
+        lines.append('# TYPE flixstream_cache_requests_total counter\n')
+        lines.append(f'flixstream_cache_requests_total{{result="hit"}} {cache["hits"]}\n')
+        lines.append(f'flixstream_cache_requests_total{{result="miss"}} {cache["misses"]}\n')
+    limits = rate_limiter.stats()
+    if limits.get('backend'):
+        lines.append('# HELP flixstream_rate_limited_total Requêtes refusées par le limiteur de débit (429)\n')
+        lines.append('# TYPE flixstream_rate_limited_total counter\n')
+        lines.append(f'flixstream_rate_limited_total {limits["rejected"]}\n')
+    admission = provisioning_limiter.stats()
+    lines.append('# HELP flixstream_admission_active Requêtes de provisioning en cours\n')
+    lines.append('# TYPE flixstream_admission_active gauge\n')
+    lines.append(f'flixstream_admission_active {admission["active"]}\n')
+    lines.append('# HELP flixstream_admission_waiting Requêtes de provisioning en attente d\'une place\n')
+    lines.append('# TYPE flixstream_admission_waiting gauge\n')
+    lines.append(f'flixstream_admission_waiting {admission["waiting"]}\n')
+    lines.append('# HELP flixstream_admission_shed_total Requêtes de provisioning refusées (503)\n')
+    lines.append('# TYPE flixstream_admission_shed_total counter\n')
+    lines.append(f'flixstream_admission_shed_total {admission["shed"]}\n')
+    return Response(''.join(lines), mimetype='text/plain; version=0.0.4')
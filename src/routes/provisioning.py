@@ -0,0 +1,51 @@
+import logging
+import math
+from flask import Blueprint, request, jsonify
+from src.models.subscription import db, Subscription
+from src.utils.provisioning import provisioning_queue
+
+provisioning_bp = Blueprint('provisioning', __name__)
+logger = logging.getLogger(__name__)
+
+# Durée maximale d'attente d'une requête en long-polling (secondes)
+MAX_WAIT_SECONDS = 30
+
+@provisioning_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Endpoint pour suivre la création d'un compte IPTV
+    
+    Paramètre optionnel wait (secondes, 30 maximum) : la réponse est retardée jusqu'à
+    la fin du job ou l'expiration du délai (long-polling).
+    """
+    try:
+        try:
+            wait = float(request.args.get('wait', 0))
+        except ValueError:
+            wait = math.nan
+        # nan ou inf : une échéance non finie ne serait jamais atteinte
+        if not math.isfinite(wait):
+            return jsonify({'error': 'Le paramètre wait doit être un nombre'}), 400
+        
+        job = provisioning_queue.wait_for(job_id, min(max(wait, 0), MAX_WAIT_SECONDS))
+        if not job:
+            return jsonify({'error': 'Job non trouvé'}), 404
+        
+        response = {
+            'success': True,
+            'job': job.to_dict()
+        }
+        subscription = None
+        if job.status == 'succeeded':
+            subscription = db.session.get(Subscription, job.subscription_id)
+        # Abonnement supprimé depuis : statut du job seul, sans identifiants
+        if subscription is not None:
+            response['credentials'] = {
+                'username': subscription.iptv_username,
+                'password': subscription.iptv_password,
+                'url': subscription.iptv_url
+            }
+        return jsonify(response), 200
+    except Exception as e:
+        logger.exception('Erreur: %s', e)
+        return jsonify({'error': 'Une erreur est survenue'}), 500
@@ -0,0 +1,65 @@
+import logging
+import threading
+from flask import Blueprint, request, jsonify, current_app
+from src.models.subscription import db
+from src.models.reminder import ReminderCampaign
+from src.utils.reminders import reminder_engine, CampaignAlreadyRunning
+
+reminders_bp = Blueprint('reminders', __name__)
+logger = logging.getLogger(__name__)
+
+def _execute_campaign(app, campaign_id):
+    with app.app_context():
+        try:
+            reminder_engine.execute(db.session.get(ReminderCampaign, campaign_id))
+        finally:
+            db.session.remove()
+
+@reminders_bp.route('/reminders/campaigns', methods=['GET'])
+def get_reminder_campaigns():
+    """
+    Endpoint pour suivre les campagnes de relance (reste à envoyer, envoyés, débit)
+    """
+    try:
+        try:
+            limit = int(request.args.get('limit') or 20)
+        except ValueError:
+            return jsonify({'error': 'Le paramètre limit doit être un entier'}), 400
+        # Borné des deux côtés : LIMIT -1 signifie « sans limite » sur SQLite
+        limit = max(1, min(limit, 100))
+        campaigns = ReminderCampaign.query.order_by(ReminderCampaign.id.desc()).limit(limit).all()
+        return jsonify({
+            'success': True,
+            'campaigns': [campaign.to_dict() for campaign in campaigns]
+        }), 200
+    except Exception as e:
+        logger.exception('Erreur: %s', e)
+        return jsonify({'error': 'Une erreur est survenue'}), 500
+
+@reminders_bp.route('/reminders/campaigns', methods=['POST'])
+def start_reminder_campaign():
+    """
+    Endpoint pour lancer (ou reprendre) une campagne de relance en arrière-plan
+    """
+    try:
+        campaign = reminder_engine.start_campaign()
+        campaign_data = campaign.to_dict()
+        threading.Thread(
+            target=_execute_campaign,
+            args=(current_app._get_current_object(), campaign.id),
+            name=f'reminder-campaign-{campaign.id}',
+            daemon=True
+        ).start()
+        return jsonify({
+            'success': True,
+            'campaign': campaign_data
+        }), 202
+    except CampaignAlreadyRunning as e:
+        return jsonify({
+            'error': str(e),
+            'campaign': e.campaign.to_dict()
+        }), 409
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Erreur: %s', e)
+        return jsonify({'error': 'Une erreur est survenue'}), 500
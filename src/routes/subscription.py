@@ -1,80 +1,126 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context, url_for
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from src.models.subscription import db, Subscription
-from src.utils.email_sender import send_subscription_email, send_renewal_reminder_email
-import requests
+from src.utils.cache import cached_response, invalidate_cache, subscription_tags
+from src.utils.dino_client import get_dino_client
+from src.utils.email_queue import email_queue, enqueue_email
+from src.utils.idempotency import idempotent
+from src.utils.bulk_import import IMPORT_FORMATS, InvalidImportParameter, detect_format, import_subscriptions
+from src.utils.export import EXPORT_FIELDS, EXPORT_FORMATS, InvalidExportParameter, iter_csv, iter_ndjson, parse_datetime
+from src.utils.provisioning import apply_iptv_account, enqueue_provisioning, lock_subscription, provisioning_queue
+from src.utils.rate_limit import EMAIL_RATE_LIMIT, IP_RATE_LIMIT, check_rate_limits, limit_concurrency, provisioning_limiter, rate_limited
+from src.utils.stats_counters import read_stats, rebuild_counters
+from src.utils.pagination import InvalidPaginationParameter, decode_cursor, encode_cursor, parse_limit
+from src.utils.serialization import InvalidFieldsParameter, json_response, parse_fields, rows_to_dicts, subscription_columns
+from sqlalchemy import tuple_
+import io
+import logging
 import os
 
 subscription_bp = Blueprint('subscription', __name__)
+logger = logging.getLogger(__name__)
 
-# Configuration de l'API Dino (à personnaliser avec vos vraies informations)
-DINO_API_URL = os.environ.get('DINO_API_URL', 'https://your-dino-panel.com/api')
-DINO_API_KEY = os.environ.get('DINO_API_KEY', 'your_api_key_here')
+# Appels réels au panel Dino (DINO_API_URL, DINO_API_KEY) ; sinon comptes de test simulés
+DINO_API_ENABLED = os.environ.get('DINO_API_ENABLED', 'false').lower() in ('1', 'true', 'yes')
 
-def create_iptv_account(plan_id, full_name, email):
+# Création des comptes IPTV hors requête (202 + job) ; false pour l'ancien mode synchrone (201)
+ASYNC_PROVISIONING = os.environ.get('ASYNC_PROVISIONING', 'true').lower() in ('1', 'true', 'yes')
+
+# Renouvellement en masse : taille maximale, appels simultanés au panel, lignes par transaction
+BULK_RENEW_MAX_IDS = int(os.environ.get('BULK_RENEW_MAX_IDS', '5000'))
+BULK_RENEW_WORKERS = int(os.environ.get('BULK_RENEW_WORKERS', '8'))
+BULK_RENEW_CHUNK_SIZE = int(os.environ.get('BULK_RENEW_CHUNK_SIZE', '500'))
+
+# Nombre de lignes lues par lot lors des exports
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+
+# Durée en jours selon le plan
+PLAN_DURATION_DAYS = {
+    '3months': 90,
+    '6months': 180,
+    '12months': 365
+}
+
+def _iptv_account_payload(plan_id, full_name, email):
+    # Exemple de requête à l'API Dino (à adapter selon votre API)
+    # Format de données typique pour une API IPTV
+    return {
+        'username': f"user_{datetime.now().timestamp()}",
+        'password': f"pass_{datetime.now().timestamp()}",
+        'email': email,
+        'full_name': full_name,
+        'duration': PLAN_DURATION_DAYS.get(plan_id, 90),
+        'max_connections': 1,
+        'is_trial': False
+    }
+
+def _iptv_account(payload, data=None):
     """
-    Crée un compte IPTV via l'API Dino
-    Cette fonction doit être adaptée selon la documentation de votre API Dino
+    Compte IPTV à partir de la réponse du panel (ou compte de test sans panel)
     """
-    # Déterminer la durée en jours selon le plan
-    duration_days = {
-        '3months': 90,
-        '6months': 180,
-        '12months': 365
-    }
-    
-    days = duration_days.get(plan_id, 90)
-    
-    # Exemple de requête à l'API Dino (à adapter selon votre API)
-    # Ceci est un exemple générique, vous devrez l'adapter
-    try:
-        # Format de données typique pour une API IPTV
-        payload = {
-            'username': f"user_{datetime.now().timestamp()}",
-            'password': f"pass_{datetime.now().timestamp()}",
-            'email': email,
-            'full_name': full_name,
-            'duration': days,
-            'max_connections': 1,
-            'is_trial': False
-        }
-        
-        headers = {
-            'Authorization': f'Bearer {DINO_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
-        # Décommentez et adaptez cette section quand vous aurez les vraies infos API
-        # response = requests.post(f'{DINO_API_URL}/create_user', json=payload, headers=headers)
-        # if response.status_code == 200:
-        #     data = response.json()
-        #     return {
-        #         'username': data.get('username'),
-        #         'password': data.get('password'),
-        #         'url': data.get('server_url'),
-        #         'expires_at': datetime.now() + timedelta(days=days)
-        #     }
-        
-        # Pour le moment, retourne des données de test
-        # REMPLACEZ CECI par l'appel API réel
+    expires_at = datetime.now() + timedelta(days=payload['duration'])
+    if data is None:
+        # Pas de panel configuré : retourne des données de test
         return {
             'username': payload['username'],
             'password': payload['password'],
             'url': 'http://your-server.com:8080',
-            'expires_at': datetime.now() + timedelta(days=days)
+            'expires_at': expires_at
         }
+    return {
+        'username': data.get('username'),
+        'password': data.get('password'),
+        'url': data.get('server_url'),
+        'expires_at': expires_at
+    }
+
+def create_iptv_account(plan_id, full_name, email):
+    """
+    Crée un compte IPTV via l'API Dino
+    Cette fonction doit être adaptée selon la documentation de votre API Dino
+    """
+    try:
+        payload = _iptv_account_payload(plan_id, full_name, email)
+        if DINO_API_ENABLED:
+            return _iptv_account(payload, get_dino_client().create_user(payload))
+        return _iptv_account(payload)
         
     except Exception as e:
-        print(f"Erreur lors de la création du compte IPTV: {str(e)}")
+        logger.exception('Erreur lors de la création du compte IPTV: %s', e)
+        return None
+
+async def create_iptv_account_async(client, plan_id, full_name, email):
+    """
+    Variante asynchrone de create_iptv_account (mode ASGI, client AsyncDinoClient)
+    """
+    try:
+        payload = _iptv_account_payload(plan_id, full_name, email)
+        if DINO_API_ENABLED:
+            return _iptv_account(payload, await client.create_user(payload))
+        return _iptv_account(payload)
+        
+    except Exception as e:
+        logger.exception('Erreur lors de la création du compte IPTV: %s', e)
         return None
 
 @subscription_bp.route('/subscribe', methods=['POST'])
+@rate_limited(IP_RATE_LIMIT)
+@idempotent
+@limit_concurrency(provisioning_limiter)
 def subscribe():
     """
     Endpoint pour créer un nouvel abonnement
+    
+    Par défaut l'abonnement est enregistré 'pending' et la réponse 202 contient un
+    job_id : le compte IPTV est créé en arrière-plan, suivez-le via status_url
+    (GET /api/jobs/<job_id>?wait=30). Avec ASYNC_PROVISIONING=false, le compte est
+    créé pendant la requête (réponse 201 avec les identifiants).
     """
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Corps JSON invalide'}), 400
         
         # Validation des données
         required_fields = ['fullName', 'email', 'phone', 'contactMethod', 'plan']
@@ -84,17 +130,6 @@ def subscribe():
         
         plan = data['plan']
         
-        # Créer le compte IPTV via l'API Dino
-        iptv_account = create_iptv_account(
-            plan['id'],
-            data['fullName'],
-            data['email']
-        )
-        
-        if not iptv_account:
-            return jsonify({'error': 'Erreur lors de la création du compte IPTV'}), 500
-        
-        # Créer l'abonnement dans la base de données
         subscription = Subscription(
             full_name=data['fullName'],
             email=data['email'],
@@ -104,19 +139,52 @@ def subscribe():
             plan_name=plan['name'],
             plan_price=plan['price'],
             plan_duration=plan['duration'],
-            status='active',
-            iptv_username=iptv_account['username'],
-            iptv_password=iptv_account['password'],
-            iptv_url=iptv_account['url'],
-            expires_at=iptv_account['expires_at']
+            status='pending'
+        )
+        
+        # Quota par email décompté seulement pour une demande valide
+        limited = check_rate_limits(EMAIL_RATE_LIMIT)
+        if limited is not None:
+            return limited
+        
+        if ASYNC_PROVISIONING:
+            # Enregistrer l'abonnement en attente et confier la création du compte
+            # IPTV (puis l'email) aux workers de provisioning
+            db.session.add(subscription)
+            db.session.flush()
+            job = enqueue_provisioning(subscription)
+            subscription_id, job_id = subscription.id, job.id
+            db.session.commit()
+            provisioning_queue.notify()
+            
+            status_url = url_for('provisioning.get_job', job_id=job_id)
+            return jsonify({
+                'success': True,
+                'message': 'Abonnement enregistré, création du compte en cours',
+                'subscription_id': subscription_id,
+                'job_id': job_id,
+                'status_url': status_url
+            }), 202, {'Location': status_url}
+        
+        # Créer le compte IPTV via l'API Dino
+        iptv_account = create_iptv_account(
+            plan['id'],
+            data['fullName'],
+            data['email']
         )
         
+        if not iptv_account:
+            return jsonify({'error': 'Erreur lors de la création du compte IPTV'}), 500
+        
+        # Créer l'abonnement dans la base de données
+        apply_iptv_account(subscription, iptv_account)
         db.session.add(subscription)
-        db.session.commit()
         
-        # Envoyer l'email avec les informations de connexion
-        send_subscription_email(
-            recipient_email=data['email'],
+        # Mettre en file l'email avec les informations de connexion : il est
+        # enregistré dans la même transaction et envoyé par les workers de fond
+        enqueue_email(
+            'subscription',
+            data['email'],
             full_name=data['fullName'],
             plan_name=plan['name'],
             iptv_credentials={
@@ -126,6 +194,9 @@ def subscribe():
             }
         )
         
+        db.session.commit()
+        email_queue.notify()
+        
         return jsonify({
             'success': True,
             'message': 'Abonnement créé avec succès',
@@ -139,65 +210,220 @@ def subscribe():
         
     except Exception as e:
         db.session.rollback()
-        print(f"Erreur: {str(e)}")
+        logger.exception('Erreur: %s', e)
         return jsonify({'error': 'Une erreur est survenue'}), 500
 
 @subscription_bp.route('/subscriptions', methods=['GET'])
 def get_subscriptions():
     """
-    Endpoint pour récupérer tous les abonnements
+    Endpoint pour récupérer les abonnements, du plus récent au plus ancien, page par page
+    
+    Paramètres (query string) :
+        limit: taille de la page (50 par défaut, 500 maximum)
+        cursor: valeur next_cursor de la page précédente
+        status, plan_id, contact_method: filtres optionnels
+        fields: champs à retourner, séparés par des virgules (tous par défaut)
+    
+    La pagination se fait par curseur sur (created_at, id) : chaque page est une
+    lecture d'index à partir de la position du curseur, quelle que soit sa profondeur.
+    Seules les colonnes demandées sont lues (tuples, sans objets ORM).
     """
     try:
-        subscriptions = Subscription.query.order_by(Subscription.created_at.desc()).all()
-        return jsonify({
+        limit = parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        fields = parse_fields(request.args.get('fields'))
+        
+        # created_at et id servent au curseur : lus en fin de tuple s'ils ne sont pas demandés
+        columns = fields + [field for field in ('created_at', 'id') if field not in fields]
+        created_at_index, id_index = columns.index('created_at'), columns.index('id')
+        
+        query = db.session.query(*subscription_columns(columns))
+        for field in ('status', 'plan_id', 'contact_method'):
+            value = request.args.get(field)
+            if value:
+                query = query.filter(getattr(Subscription, field) == value)
+        
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            query = query.filter(
+                tuple_(Subscription.created_at, Subscription.id) < tuple_(created_at, last_id)
+            )
+        
+        rows = query.order_by(
+            Subscription.created_at.desc(),
+            Subscription.id.desc()
+        ).limit(limit + 1).all()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor(last[created_at_index], last[id_index])
+        
+        return json_response({
             'success': True,
-            'subscriptions': [sub.to_dict() for sub in subscriptions]
-        }), 200
+            'count': len(rows),
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'subscriptions': rows_to_dicts(rows, fields)
+        })
+    except (InvalidPaginationParameter, InvalidFieldsParameter) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Erreur: {str(e)}")
+        logger.exception('Erreur: %s', e)
+        return jsonify({'error': 'Une erreur est survenue'}), 500
+
+@subscription_bp.route('/subscriptions/export', methods=['GET'])
+def export_subscriptions():
+    """
+    Endpoint pour exporter tous les abonnements en flux (NDJSON ou CSV)
+    
+    Paramètres (query string) :
+        format: ndjson (par défaut) ou csv
+        fields: colonnes à exporter, séparées par des virgules (toutes par défaut)
+        since: export incrémental, seulement les abonnements créés après cette date ISO 8601
+        since_id: avec since, id du dernier abonnement déjà exporté à cette date
+    
+    Les lignes sont triées par (created_at, id) croissants : le created_at et l'id de
+    la dernière ligne reçue servent de since/since_id pour l'export suivant. Les
+    lignes sont lues par lots côté serveur et écrites au fil de l'eau, la mémoire
+    utilisée ne dépend pas de la taille de la table.
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise InvalidExportParameter('Le paramètre format doit valoir ndjson ou csv')
+        fields = parse_fields(request.args.get('fields'), EXPORT_FIELDS)
+        
+        query = db.session.query(*subscription_columns(fields))
+        since = request.args.get('since')
+        if since:
+            since = parse_datetime(since, 'since')
+            since_id = request.args.get('since_id')
+            if since_id:
+                if not since_id.isdigit():
+                    raise InvalidExportParameter('Le paramètre since_id doit être un entier')
+                query = query.filter(
+                    tuple_(Subscription.created_at, Subscription.id) > tuple_(since, int(since_id))
+                )
+            else:
+                query = query.filter(Subscription.created_at > since)
+        
+        rows = query.order_by(
+            Subscription.created_at.asc(),
+            Subscription.id.asc()
+        ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        
+        generate = iter_csv if export_format == 'csv' else iter_ndjson
+        return Response(
+            stream_with_context(generate(rows, fields)),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename=subscriptions.{export_format}'}
+        )
+    except (InvalidExportParameter, InvalidFieldsParameter) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception('Erreur: %s', e)
+        return jsonify({'error': 'Une erreur est survenue'}), 500
+
+@subscription_bp.route('/subscriptions/import', methods=['POST'])
+def import_subscriptions_endpoint():
+    """
+    Endpoint pour importer des abonnements en masse (corps CSV ou NDJSON, colonnes de l'export)
+    
+    Paramètres (query string) :
+        format: ndjson ou csv (déduit du Content-Type par défaut)
+        provisioning: false pour ne pas créer de job pour les lignes sans compte IPTV
+        email: false pour ne pas envoyer l'email d'abonnement aux comptes existants
+    
+    Le corps est lu en flux et inséré par lots (IMPORT_CHUNK_SIZE lignes par
+    transaction). Retourne le bilan : lignes importées, rejets ligne par ligne, débit.
+    Pour les très gros fichiers, préférer la commande flask import-subscriptions.
+    """
+    try:
+        import_format = request.args.get('format')
+        if import_format is None:
+            import_format = detect_format(content_type=request.content_type)
+        elif import_format not in IMPORT_FORMATS:
+            raise InvalidImportParameter('Le paramètre format doit valoir ndjson ou csv')
+        
+        report = import_subscriptions(
+            io.BufferedReader(request.stream),
+            import_format,
+            provision=request.args.get('provisioning', 'true').lower() not in ('0', 'false', 'no'),
+            send_email=request.args.get('email', 'true').lower() not in ('0', 'false', 'no')
+        )
+        return jsonify({'success': True, **report.to_dict()}), 200
+    except InvalidImportParameter as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception('Erreur: %s', e)
         return jsonify({'error': 'Une erreur est survenue'}), 500
 
 @subscription_bp.route('/subscriptions/<int:subscription_id>', methods=['GET'])
+@cached_response('subscription', lambda subscription_id: subscription_tags(subscription_id))
 def get_subscription(subscription_id):
     """
     Endpoint pour récupérer un abonnement spécifique
+    
+    Paramètre fields (optionnel) : champs à retourner, séparés par des virgules
     """
     try:
-        subscription = Subscription.query.get(subscription_id)
-        if not subscription:
+        fields = parse_fields(request.args.get('fields'))
+        row = db.session.query(*subscription_columns(fields)).filter(
+            Subscription.id == subscription_id
+        ).first()
+        if not row:
             return jsonify({'error': 'Abonnement non trouvé'}), 404
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'subscription': subscription.to_dict()
-        }), 200
+            'subscription': dict(zip(fields, row))
+        })
+    except InvalidFieldsParameter as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Erreur: {str(e)}")
+        logger.exception('Erreur: %s', e)
         return jsonify({'error': 'Une erreur est survenue'}), 500
 
 @subscription_bp.route('/subscriptions/expiring', methods=['GET'])
+@cached_response('expiring', lambda: ['expiring'])
 def get_expiring_subscriptions():
     """
     Endpoint pour récupérer les abonnements qui expirent bientôt (dans les 30 jours)
     Utile pour les relances automatiques
+    
+    Les abonnements déjà échus sont exclus : ils passent en 'expired' au prochain
+    passage d'expiration (voir src/utils/expiry_sweeper.py).
+    
+    Paramètre fields (optionnel) : champs à retourner, séparés par des virgules
     """
     try:
-        thirty_days_from_now = datetime.now() + timedelta(days=30)
-        subscriptions = Subscription.query.filter(
-            Subscription.expires_at <= thirty_days_from_now,
-            Subscription.status == 'active'
-        ).all()
+        fields = parse_fields(request.args.get('fields'))
+        now = datetime.now()
+        thirty_days_from_now = now + timedelta(days=30)
+        rows = db.session.query(*subscription_columns(fields)).filter(
+            Subscription.status == 'active',
+            Subscription.expires_at >= now,
+            Subscription.expires_at <= thirty_days_from_now
+        ).order_by(Subscription.expires_at).all()
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'count': len(subscriptions),
-            'subscriptions': [sub.to_dict() for sub in subscriptions]
-        }), 200
+            'count': len(rows),
+            'subscriptions': rows_to_dicts(rows, fields)
+        })
+    except InvalidFieldsParameter as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Erreur: {str(e)}")
+        logger.exception('Erreur: %s', e)
         return jsonify({'error': 'Une erreur est survenue'}), 500
 
 @subscription_bp.route('/subscriptions/<int:subscription_id>/renew', methods=['POST'])
+@rate_limited(IP_RATE_LIMIT)
+@idempotent
+@limit_concurrency(provisioning_limiter)
 def renew_subscription(subscription_id):
     """
     Endpoint pour renouveler un abonnement
@@ -206,23 +432,21 @@ def renew_subscription(subscription_id):
         subscription = Subscription.query.get(subscription_id)
         if not subscription:
             return jsonify({'error': 'Abonnement non trouvé'}), 404
+        plan_id, full_name, email = subscription.plan_id, subscription.full_name, subscription.email
+        # Libère la connexion pendant l'appel au panel
+        db.session.rollback()
         
         # Créer un nouveau compte IPTV
-        iptv_account = create_iptv_account(
-            subscription.plan_id,
-            subscription.full_name,
-            subscription.email
-        )
+        iptv_account = create_iptv_account(plan_id, full_name, email)
         
         if not iptv_account:
             return jsonify({'error': 'Erreur lors du renouvellement'}), 500
         
-        # Mettre à jour l'abonnement
-        subscription.iptv_username = iptv_account['username']
-        subscription.iptv_password = iptv_account['password']
-        subscription.iptv_url = iptv_account['url']
-        subscription.expires_at = iptv_account['expires_at']
-        subscription.status = 'active'
+        # Mettre à jour l'abonnement, relu et verrouillé jusqu'au commit
+        subscription = lock_subscription(subscription_id)
+        if not subscription:
+            return jsonify({'error': 'Abonnement non trouvé'}), 404
+        apply_iptv_account(subscription, iptv_account)
         
         db.session.commit()
         
@@ -234,37 +458,146 @@ def renew_subscription(subscription_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"Erreur: {str(e)}")
+        logger.exception('Erreur: %s', e)
+        return jsonify({'error': 'Une erreur est survenue'}), 500
+
+@subscription_bp.route('/subscriptions/renew', methods=['POST'])
+@rate_limited(IP_RATE_LIMIT)
+@idempotent
+@limit_concurrency(provisioning_limiter)
+def renew_subscriptions():
+    """
+    Endpoint pour renouveler plusieurs abonnements en une requête
+    
+    Corps JSON : {"ids": [1, 2, 3]}
+    
+    Les abonnements sont chargés par requêtes IN, les comptes IPTV sont créés en
+    parallèle (BULK_RENEW_WORKERS appels simultanés au panel) et les mises à jour
+    sont écrites par lots de BULK_RENEW_CHUNK_SIZE dans une transaction chacun.
+    La réponse détaille le résultat de chaque id (succès partiel possible).
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        ids = data.get('ids')
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return jsonify({'error': 'Le champ ids doit être une liste non vide d\'entiers'}), 400
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > BULK_RENEW_MAX_IDS:
+            return jsonify({'error': f'{BULK_RENEW_MAX_IDS} abonnements maximum par requête'}), 400
+        
+        # Chargement par requêtes IN (bornées pour rester sous la limite de paramètres SQL)
+        subscriptions = {}
+        for start in range(0, len(ids), BULK_RENEW_CHUNK_SIZE):
+            chunk = ids[start:start + BULK_RENEW_CHUNK_SIZE]
+            for subscription in Subscription.query.filter(Subscription.id.in_(chunk)):
+                subscriptions[subscription.id] = subscription
+        
+        results = {
+            subscription_id: {'id': subscription_id, 'success': False, 'error': 'Abonnement non trouvé'}
+            for subscription_id in ids if subscription_id not in subscriptions
+        }
+        
+        # Création des comptes IPTV en parallèle (hors session : uniquement des valeurs simples)
+        to_provision = [
+            (sub.id, sub.plan_id, sub.full_name, sub.email)
+            for sub in subscriptions.values()
+        ]
+        # Libère la connexion pendant les appels au panel
+        db.session.rollback()
+        
+        def provision(item):
+            subscription_id, plan_id, full_name, email = item
+            return subscription_id, create_iptv_account(plan_id, full_name, email)
+        
+        accounts = {}
+        if to_provision:
+            workers = min(BULK_RENEW_WORKERS, len(to_provision))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-renew') as executor:
+                for subscription_id, iptv_account in executor.map(provision, to_provision):
+                    if iptv_account:
+                        accounts[subscription_id] = iptv_account
+                    else:
+                        results[subscription_id] = {
+                            'id': subscription_id, 'success': False, 'error': 'Erreur lors du renouvellement'
+                        }
+        
+        # Écriture par lots : une transaction (un fsync) par lot
+        renewed_ids = list(accounts)
+        for start in range(0, len(renewed_ids), BULK_RENEW_CHUNK_SIZE):
+            chunk = renewed_ids[start:start + BULK_RENEW_CHUNK_SIZE]
+            try:
+                # Une requête IN relit et verrouille le lot jusqu'au commit (ordre des id :
+                # deux renouvellements groupés concurrents ne peuvent pas s'interbloquer)
+                for subscription in (
+                    Subscription.query.filter(Subscription.id.in_(chunk))
+                    .order_by(Subscription.id)
+                    .populate_existing()
+                    .with_for_update()
+                ):
+                    apply_iptv_account(subscription, accounts[subscription.id])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.exception("Erreur lors de l'enregistrement d'un lot de renouvellements: %s", e)
+                for subscription_id in chunk:
+                    results[subscription_id] = {
+                        'id': subscription_id, 'success': False, 'error': "Erreur lors de l'enregistrement"
+                    }
+                continue
+            for subscription_id in chunk:
+                results[subscription_id] = {
+                    'id': subscription_id,
+                    'success': True,
+                    'expires_at': accounts[subscription_id]['expires_at'].isoformat()
+                }
+        
+        ordered = [results[subscription_id] for subscription_id in ids]
+        renewed = sum(1 for result in ordered if result['success'])
+        return jsonify({
+            'success': renewed == len(ids),
+            'requested': len(ids),
+            'renewed': renewed,
+            'failed': len(ids) - renewed,
+            'results': ordered
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Erreur: %s', e)
         return jsonify({'error': 'Une erreur est survenue'}), 500
 
 @subscription_bp.route('/stats', methods=['GET'])
+@cached_response('stats', lambda: ['stats'])
 def get_stats():
     """
     Endpoint pour obtenir des statistiques sur les abonnements
+    
+    Les chiffres viennent de la table subscription_counter_shards, tenue à jour dans la
+    transaction de chaque écriture : la requête ne parcourt pas la table des abonnements.
     """
     try:
-        total_subscriptions = Subscription.query.count()
-        active_subscriptions = Subscription.query.filter_by(status='active').count()
-        pending_subscriptions = Subscription.query.filter_by(status='pending').count()
-        expired_subscriptions = Subscription.query.filter_by(status='expired').count()
-        
-        # Statistiques par plan
-        plans_stats = db.session.query(
-            Subscription.plan_name,
-            db.func.count(Subscription.id)
-        ).group_by(Subscription.plan_name).all()
-        
         return jsonify({
             'success': True,
-            'stats': {
-                'total': total_subscriptions,
-                'active': active_subscriptions,
-                'pending': pending_subscriptions,
-                'expired': expired_subscriptions,
-                'by_plan': {plan: count for plan, count in plans_stats}
-            }
+            'stats': read_stats()
         }), 200
     except Exception as e:
-        print(f"Erreur: {str(e)}")
+        logger.exception('Erreur: %s', e)
         return jsonify({'error': 'Une erreur est survenue'}), 500
 
+@subscription_bp.route('/stats/rebuild', methods=['POST'])
+def rebuild_stats():
+    """
+    Endpoint pour recalculer les compteurs de statistiques depuis la table des abonnements
+    (une seule passe GROUP BY status, plan_name)
+    """
+    try:
+        rebuild_counters()
+        invalidate_cache('stats')
+        return jsonify({
+            'success': True,
+            'stats': read_stats()
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Erreur: %s', e)
+        return jsonify({'error': 'Une erreur est survenue'}), 500
@@ -0,0 +1,58 @@
+import sqlite3
+import uuid
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from src.config import get_database_url, get_engine_options, get_sqlite_pragmas, uses_pgbouncer
+
+# Pilote asynchrone utilisé pour chaque base (requirements-async.txt)
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg'
+}
+
+
+def get_async_database_url(url=None):
+    """
+    DATABASE_URL avec le pilote asynchrone correspondant (sqlite+aiosqlite, postgresql+asyncpg)
+    """
+    parsed = make_url(url or get_database_url())
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f'Pas de pilote asynchrone pour la base {backend}')
+    return parsed.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    # aiosqlite expose une connexion adaptée : le listener global de src/config.py
+    # (sqlite3.Connection) ne la reconnaît pas
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in get_sqlite_pragmas().items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+def create_async_session_factory(url=None):
+    """
+    Moteur et fabrique de sessions asynchrones sur la même base et les mêmes
+    modèles que l'application Flask (mêmes options de pool, mêmes PRAGMA SQLite)
+
+    Les listeners de session (compteurs de statistiques, invalidation du cache)
+    s'appliquent aussi : une AsyncSession délègue à une Session classique.
+    """
+    async_url = get_async_database_url(url)
+    options = get_engine_options(url or get_database_url())
+    if async_url.get_backend_name() == 'postgresql' and uses_pgbouncer():
+        # En mode transaction, deux transactions successives peuvent passer par deux
+        # connexions serveur différentes : pas de cache de requêtes préparées, noms uniques
+        options['connect_args'] = {
+            'statement_cache_size': 0,
+            'prepared_statement_cache_size': 0,
+            'prepared_statement_name_func': lambda: f'__asyncpg_{uuid.uuid4().hex}__'
+        }
+    engine = create_async_engine(async_url, **options)
+    if async_url.get_backend_name() == 'sqlite':
+        event.listen(engine.sync_engine, 'connect', _apply_sqlite_pragmas)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
@@ -0,0 +1,140 @@
+import hashlib
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, text, update
+from src.models.subscription import db
+
+logger = logging.getLogger(__name__)
+
+
+def claim_due_rows(model, batch_size, lease_seconds, pending_status, running_status):
+    """
+    Réserve jusqu'à batch_size lignes dues d'une table de file d'attente et les retourne
+
+    Le modèle doit avoir les colonnes status, next_attempt_at, locked_at et claim_token.
+    Une ligne est due si elle est en pending_status avec next_attempt_at passé, ou
+    restée en running_status plus de lease_seconds (processus tué pendant le
+    traitement). La réservation est un UPDATE conditionnel : plusieurs workers ou
+    processus peuvent se partager la même table sans traiter deux fois une ligne.
+    Sur PostgreSQL, les candidates sont lues avec FOR UPDATE SKIP LOCKED : deux
+    workers qui réservent en même temps se répartissent les lignes au lieu de
+    s'attendre sur les mêmes.
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=lease_seconds)
+    claimable = or_(
+        and_(model.status == pending_status, model.next_attempt_at <= now),
+        and_(model.status == running_status, model.locked_at < stale_before)
+    )
+
+    candidate_ids = [
+        row[0] for row in db.session.query(model.id)
+        .filter(claimable)
+        .order_by(model.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    ]
+    if not candidate_ids:
+        db.session.rollback()
+        return []
+
+    token = uuid.uuid4().hex
+    db.session.execute(
+        update(model)
+        .where(model.id.in_(candidate_ids), claimable)
+        .values(status=running_status, locked_at=now, claim_token=token)
+    )
+    db.session.commit()
+
+    return model.query.filter_by(claim_token=token).all()
+
+
+def advisory_xact_lock(connection, name):
+    """
+    Sur PostgreSQL, prend un verrou exclusif nommé (pg_advisory_xact_lock) tenu
+    jusqu'à la fin de la transaction de connection ; sans effet sur les autres bases
+
+    Sert aux sections qu'un seul processus de l'ensemble des nœuds doit exécuter à
+    la fois (application du schéma, démarrage d'une campagne). Avec SQLite, les
+    écritures sont déjà sérialisées par le verrou de la base.
+    """
+    if connection.dialect.name != 'postgresql':
+        return
+    key = int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], 'big', signed=True)
+    connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': key})
+
+
+class BackgroundWorkerPool:
+    """
+    Pool de threads de fond qui appellent run_once() en boucle dans un contexte d'application Flask
+
+    Les sous-classes implémentent run_once() et retournent True lorsqu'elles ont traité
+    du travail (la boucle enchaîne alors immédiatement), False sinon (le thread attend
+    poll_interval secondes ou un appel à notify()).
+    """
+
+    def __init__(self, name, workers=1, poll_interval=1.0):
+        self.name = name
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._app = None
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self, app):
+        """
+        Démarre les threads de fond (sans effet s'ils tournent déjà)
+        """
+        if self.running:
+            return
+        self._app = app
+        self._stopping.clear()
+        self._threads = []
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run,
+                name=f'{self.name}-{index}',
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        """
+        Demande l'arrêt des threads et attend leur fin
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """
+        Réveille les threads en attente (à appeler après avoir ajouté du travail)
+        """
+        self._wakeup.set()
+
+    def run_once(self):
+        raise NotImplementedError
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                with self._app.app_context():
+                    did_work = self.run_once()
+            except Exception as e:
+                logger.exception('Erreur dans le worker %s: %s', self.name, e)
+                did_work = False
+
+            if not did_work:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
@@ -0,0 +1,407 @@
+import codecs
+import csv
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+import click
+from sqlalchemy import String, insert
+from src.models.subscription import db, Subscription
+from src.models.email_outbox import OutboundEmail
+from src.models.provisioning_job import ProvisioningJob
+from src.utils.cache import ALL_SUBSCRIPTION_TAGS, invalidate_cache
+from src.utils.email_queue import email_queue, email_values
+from src.utils.export import EXPORT_FORMATS
+from src.utils.provisioning import provisioning_job_values, provisioning_queue
+from src.utils.stats_counters import adjust_counters
+
+logger = logging.getLogger(__name__)
+
+# Lignes insérées par transaction (une requête INSERT multi-lignes par lot)
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', '2000'))
+
+# Nombre maximal de rejets détaillés dans le rapport (les suivants sont seulement comptés)
+IMPORT_MAX_REJECTS = int(os.environ.get('IMPORT_MAX_REJECTS', '1000'))
+
+IMPORT_FORMATS = EXPORT_FORMATS
+
+# Mêmes colonnes que l'export, sans l'id (attribué par la base)
+IMPORT_FIELDS = (
+    'full_name', 'email', 'phone', 'contact_method',
+    'plan_id', 'plan_name', 'plan_price', 'plan_duration', 'status',
+    'created_at', 'expires_at', 'iptv_username', 'iptv_password', 'iptv_url'
+)
+REQUIRED_FIELDS = (
+    'full_name', 'email', 'phone', 'contact_method',
+    'plan_id', 'plan_name', 'plan_price', 'plan_duration'
+)
+DATE_FIELDS = ('created_at', 'expires_at')
+# Dates stockées en UTC naïf (datetime.utcnow) ; les autres sont en heure locale
+UTC_DATE_FIELDS = ('created_at',)
+IMPORT_STATUSES = ('pending', 'active', 'expired')
+
+# Longueur maximale de chaque colonne texte, d'après le modèle
+MAX_LENGTHS = {
+    column.name: column.type.length
+    for column in Subscription.__table__.columns
+    if column.name in IMPORT_FIELDS and isinstance(column.type, String) and column.type.length
+}
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class InvalidImportParameter(ValueError):
+    pass
+
+
+def detect_format(filename=None, content_type=None):
+    """
+    Format d'import (csv ou ndjson) d'après l'extension du fichier ou le Content-Type
+    """
+    if content_type:
+        mimetype = content_type.split(';')[0].strip().lower()
+        for import_format, format_mimetype in IMPORT_FORMATS.items():
+            if mimetype == format_mimetype:
+                return import_format
+    if filename:
+        extension = os.path.splitext(filename)[1].lstrip('.').lower()
+        if extension in IMPORT_FORMATS:
+            return extension
+        if extension in ('jsonl', 'json'):
+            return 'ndjson'
+    raise InvalidImportParameter('Format inconnu : utilisez ndjson ou csv')
+
+
+def _decoded_lines(stream, invalid_lines):
+    # Décodage ligne par ligne : un octet invalide ne rejette que sa ligne
+    for line_number, raw in enumerate(stream, start=1):
+        if line_number == 1:
+            raw = raw.removeprefix(codecs.BOM_UTF8)
+        try:
+            yield raw.decode('utf-8')
+        except UnicodeDecodeError:
+            invalid_lines.add(line_number)
+            yield raw.decode('utf-8', errors='replace')
+
+
+def iter_records(stream, import_format):
+    """
+    Lit un flux binaire ligne par ligne ; génère (numéro de ligne, dict ou None si illisible)
+    """
+    invalid_lines = set()
+    lines = _decoded_lines(stream, invalid_lines)
+    if import_format == 'csv':
+        reader = csv.DictReader(lines)
+        first_line = reader.line_num + 1
+        for record in reader:
+            # Un enregistrement peut s'étendre sur plusieurs lignes (champ entre guillemets)
+            if invalid_lines.intersection(range(first_line, reader.line_num + 1)):
+                record = None
+            yield reader.line_num, record
+            first_line = reader.line_num + 1
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = None if line_number in invalid_lines else json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else None
+
+
+class ImportReport:
+    """
+    Bilan d'un import : lignes lues, insérées, rejetées (avec leurs erreurs) et débit
+    """
+
+    def __init__(self, max_rejects=IMPORT_MAX_REJECTS):
+        self.max_rejects = max_rejects
+        self.rows = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.rejects = []
+        self.provisioning_jobs = 0
+        self.emails = 0
+        self.chunks = 0
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        if self.max_rejects is None or len(self.rejects) < self.max_rejects:
+            self.rejects.append({'line': line, 'errors': errors})
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.duration, 1) if self.duration else None
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'rejected': self.rejected,
+            'provisioning_jobs': self.provisioning_jobs,
+            'emails': self.emails,
+            'chunks': self.chunks,
+            'duration_ms': round(self.duration * 1000, 2),
+            'rows_per_second': self.rows_per_second,
+            'rejects': self.rejects,
+            'rejects_truncated': self.rejected > len(self.rejects)
+        }
+
+
+def parse_import_datetime(value, utc=False):
+    """
+    Date ISO 8601 naïve, comme les colonnes DateTime (lève ValueError si invalide)
+
+    Une date avec décalage (2025-01-01T10:00:00+02:00) est convertie en heure locale,
+    comme expires_at comparé à datetime.now(), ou en UTC si utc=True (created_at) :
+    sans cela, le décalage serait ignoré à l'écriture et la date décalée d'autant.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc if utc else None).replace(tzinfo=None)
+    return parsed
+
+
+def _clean(value):
+    if value is None or isinstance(value, (dict, list)):
+        return value
+    value = str(value).strip()
+    return value or None
+
+
+def validate_chunk(records, now=None):
+    """
+    Valide un lot de (numéro de ligne, dict) colonne par colonne
+
+    Chaque contrôle parcourt une colonne entière du lot ; retourne les lignes
+    valides (colonnes du modèle) et les rejets [(numéro de ligne, erreurs)].
+    """
+    now = now or datetime.utcnow()
+    errors = [[] if record is not None else ['Ligne illisible'] for _, record in records]
+    columns = {
+        field: [_clean(record.get(field)) if record is not None else None for _, record in records]
+        for field in IMPORT_FIELDS
+    }
+
+    for field, values in columns.items():
+        for index, value in enumerate(values):
+            if isinstance(value, (dict, list)):
+                errors[index].append(f'{field} doit être une valeur simple')
+                values[index] = None
+
+    for field in REQUIRED_FIELDS:
+        for index, value in enumerate(columns[field]):
+            if value is None and records[index][1] is not None:
+                errors[index].append(f'{field} manquant')
+
+    for field, length in MAX_LENGTHS.items():
+        for index, value in enumerate(columns[field]):
+            if value is not None and len(value) > length:
+                errors[index].append(f'{field} dépasse {length} caractères')
+
+    for index, value in enumerate(columns['email']):
+        if value is not None and not EMAIL_PATTERN.match(value):
+            errors[index].append('email invalide')
+
+    for field in DATE_FIELDS:
+        values = columns[field]
+        for index, value in enumerate(values):
+            if value is None:
+                continue
+            try:
+                values[index] = parse_import_datetime(value, utc=field in UTC_DATE_FIELDS)
+            except ValueError:
+                errors[index].append(f'{field} doit être une date ISO 8601')
+                values[index] = None
+
+    # Sans compte IPTV, l'abonnement attend son provisionnement
+    statuses = columns['status']
+    for index, username in enumerate(columns['iptv_username']):
+        if username is None:
+            if statuses[index] not in (None, 'pending'):
+                errors[index].append(f"status {statuses[index]} impossible sans iptv_username")
+            statuses[index] = 'pending'
+        elif statuses[index] is None:
+            statuses[index] = 'active'
+        elif statuses[index] not in IMPORT_STATUSES:
+            errors[index].append(f"status doit valoir {', '.join(IMPORT_STATUSES)}")
+
+    created = columns['created_at']
+    for index, value in enumerate(created):
+        if value is None:
+            created[index] = now
+
+    valid, rejects = [], []
+    for index, (line, _) in enumerate(records):
+        if errors[index]:
+            rejects.append((line, errors[index]))
+        else:
+            valid.append({field: columns[field][index] for field in IMPORT_FIELDS})
+    return valid, rejects
+
+
+def _insert_chunk(rows, provision, send_email):
+    """
+    Insère un lot validé dans une seule transaction : abonnements, compteurs,
+    jobs de provisionnement et emails ; retourne (jobs, emails)
+    """
+    table = Subscription.__table__
+    to_provision = provision and any(row['status'] == 'pending' for row in rows)
+    if to_provision:
+        ids = db.session.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+    else:
+        db.session.execute(insert(table), rows)
+
+    adjust_counters(db.session, Counter((row['status'], row['plan_name']) for row in rows))
+
+    jobs = []
+    if to_provision:
+        jobs = [
+            provisioning_job_values(subscription_id)
+            for subscription_id, row in zip(ids, rows) if row['status'] == 'pending'
+        ]
+        db.session.execute(insert(ProvisioningJob.__table__), jobs)
+
+    emails = []
+    if send_email:
+        emails = [
+            email_values(
+                'subscription', row['email'],
+                full_name=row['full_name'],
+                plan_name=row['plan_name'],
+                iptv_credentials={
+                    'username': row['iptv_username'],
+                    'password': row['iptv_password'],
+                    'url': row['iptv_url']
+                }
+            )
+            for row in rows if row['status'] == 'active'
+        ]
+        if emails:
+            db.session.execute(insert(OutboundEmail.__table__), emails)
+
+    db.session.commit()
+    return len(jobs), len(emails)
+
+
+def import_subscriptions(stream, import_format, chunk_size=None, provision=True, send_email=True,
+                         max_rejects=IMPORT_MAX_REJECTS):
+    """
+    Importe des abonnements depuis un flux CSV ou NDJSON (colonnes de l'export)
+
+    Le flux est lu ligne par ligne et traité par lots de chunk_size : validation
+    colonne par colonne, puis INSERT multi-lignes hors ORM (pas d'objets Subscription,
+    pas d'unité de travail) dans une transaction par lot. La mémoire utilisée dépend
+    de la taille des lots, pas de celle du fichier.
+
+    Les lignes sans iptv_username sont importées en 'pending' avec un job de
+    provisionnement (sauf provision=False) ; les comptes existants gardent leur statut
+    ('active' par défaut) et reçoivent l'email d'abonnement s'ils sont actifs (sauf
+    send_email=False). Un lot refusé par la base est annulé en entier et ses lignes
+    comptées comme rejetées ; les lots suivants sont tout de même importés.
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise InvalidImportParameter('Le format doit valoir ndjson ou csv')
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    report = ImportReport(max_rejects=max_rejects)
+
+    def flush(records):
+        valid, rejects = validate_chunk(records)
+        for line, errors in rejects:
+            report.reject(line, errors)
+        if not valid:
+            return
+        try:
+            jobs, emails = _insert_chunk(valid, provision, send_email)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Échec de l'import d'un lot: %s", e)
+            valid_lines = sorted(set(line for line, _ in records) - set(line for line, _ in rejects))
+            for line in valid_lines:
+                report.reject(line, ['Lot refusé par la base de données'])
+            return
+        report.chunks += 1
+        report.inserted += len(valid)
+        report.provisioning_jobs += jobs
+        report.emails += emails
+        # INSERT hors ORM : invisible pour le suivi automatique des écritures
+        invalidate_cache(*ALL_SUBSCRIPTION_TAGS)
+        if jobs:
+            provisioning_queue.notify()
+        if emails:
+            email_queue.notify()
+
+    records, last_line = [], 0
+    try:
+        for last_line, record in iter_records(stream, import_format):
+            records.append((last_line, record))
+            report.rows += 1
+            if len(records) >= chunk_size:
+                flush(records)
+                records = []
+    except csv.Error as e:
+        # La lecture s'arrête là : les lignes déjà lues sont tout de même importées
+        report.reject(last_line + 1, [f'Fichier illisible: {e}'])
+    if records:
+        flush(records)
+    return report.finish()
+
+
+@click.command('import-subscriptions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'import_format', type=click.Choice(sorted(IMPORT_FORMATS)),
+              help="Format du fichier (déduit de l'extension par défaut)")
+@click.option('--chunk-size', default=IMPORT_CHUNK_SIZE, show_default=True,
+              help='Lignes insérées par transaction')
+@click.option('--no-provisioning', is_flag=True,
+              help='Ne crée pas de job de provisionnement pour les lignes sans compte IPTV')
+@click.option('--no-email', is_flag=True,
+              help="N'envoie pas l'email d'abonnement aux comptes existants")
+@click.option('--rejects', 'rejects_path', type=click.Path(dir_okay=False, writable=True),
+              help='Écrit le détail des lignes rejetées dans ce fichier (NDJSON)')
+def import_subscriptions_command(path, import_format, chunk_size, no_provisioning, no_email, rejects_path):
+    """
+    Importe des abonnements depuis un fichier CSV ou NDJSON (colonnes de l'export)
+    """
+    try:
+        import_format = import_format or detect_format(filename=path)
+    except InvalidImportParameter as e:
+        raise click.BadParameter(str(e), param_hint='--format')
+
+    with open(path, 'rb') as stream:
+        report = import_subscriptions(
+            stream, import_format, chunk_size=chunk_size,
+            provision=not no_provisioning, send_email=not no_email,
+            max_rejects=None if rejects_path else IMPORT_MAX_REJECTS
+        )
+
+    click.echo(
+        f"{report.inserted}/{report.rows} lignes importées en {report.duration:.2f} s "
+        f"({report.rows_per_second or 0:.0f} lignes/s, {report.chunks} lots), "
+        f"{report.rejected} rejetées, {report.provisioning_jobs} jobs de provisionnement, "
+        f"{report.emails} emails"
+    )
+    if rejects_path:
+        with open(rejects_path, 'w', encoding='utf-8') as output:
+            for reject in report.rejects:
+                output.write(json.dumps(reject, ensure_ascii=False) + '\n')
+    else:
+        for reject in report.rejects[:20]:
+            click.echo(f"  ligne {reject['line']}: {', '.join(reject['errors'])}", err=True)
+        if report.rejected > 20:
+            click.echo(f'  ... {report.rejected - 20} autres rejets (--rejects pour le détail)', err=True)
+    if report.rejected:
+        raise SystemExit(1)
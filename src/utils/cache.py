@@ -0,0 +1,296 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, make_response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.models.subscription import Subscription
+
+try:
+    import redis
+except ImportError:  # dépendance optionnelle (CACHE_BACKEND=redis)
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Durée de vie (secondes) des réponses mises en cache, par endpoint
+CACHE_TTLS = {
+    'stats': float(os.environ.get('CACHE_TTL_STATS', '10')),
+    'subscription': float(os.environ.get('CACHE_TTL_SUBSCRIPTION', '60')),
+    'expiring': float(os.environ.get('CACHE_TTL_EXPIRING', '30'))
+}
+
+
+class CachedResponse:
+    """
+    Corps JSON d'une réponse 200 et son ETag
+    """
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+
+    def dumps(self):
+        return self.etag.encode() + b'\n' + self.body
+
+    @classmethod
+    def loads(cls, data):
+        etag, body = data.split(b'\n', 1)
+        return cls(body, etag.decode())
+
+
+class MemoryCacheBackend:
+    """
+    Cache en mémoire du processus, borné à max_entries entrées (LRU)
+
+    Chaque worker Gunicorn a son propre cache : une écriture n'invalide que le cache
+    du processus qui l'a faite (les autres se rafraîchissent au bout du TTL).
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generations(self, tags):
+        with self._lock:
+            return [self._generations.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            # Une génération par abonnement modifié : on repart de zéro, entrées comprises,
+            # plutôt que de laisser grossir la table indéfiniment
+            if len(self._generations) > self.max_entries * 16:
+                self._entries.clear()
+                self._generations.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'entries': len(self._entries), 'max_entries': self.max_entries}
+
+
+class RedisCacheBackend:
+    """
+    Cache partagé par tous les workers dans un Redis local (éviction LRU gérée par
+    Redis via maxmemory-policy allkeys-lru)
+    """
+
+    def __init__(self, url, prefix='flixstream:cache:'):
+        if redis is None:
+            raise RuntimeError('CACHE_BACKEND=redis nécessite le paquet redis (pip install redis)')
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.prefix = prefix
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        return CachedResponse.loads(data) if data is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value.dumps(), px=max(1, int(ttl * 1000)))
+
+    def generations(self, tags):
+        values = self.client.mget([f'{self.prefix}gen:{tag}' for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, tags):
+        pipeline = self.client.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.incr(f'{self.prefix}gen:{tag}')
+        pipeline.execute()
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*', count=1000))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        return {'backend': 'redis'}
+
+
+class ResponseCache:
+    """
+    Cache de réponses avec invalidation par étiquettes
+
+    Une entrée est rangée sous une clé qui contient la génération courante de
+    chacune de ses étiquettes (ex. 'stats', 'subscription:42'). Invalider une
+    étiquette incrémente sa génération : les entrées concernées ne sont plus jamais
+    lues et disparaissent par TTL ou LRU. Les générations sont lues avant d'exécuter
+    la vue, si bien qu'une réponse calculée pendant une écriture concurrente est
+    rangée sous l'ancienne génération et ne peut pas être servie après le commit.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls):
+        name = os.environ.get('CACHE_BACKEND', 'memory').lower()
+        if name in ('none', 'off', 'false', '0'):
+            return cls(None)
+        if name == 'redis':
+            return cls(RedisCacheBackend(os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')))
+        return cls(MemoryCacheBackend(max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', '1024'))))
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def key(self, name, path, tags):
+        generations = self.backend.generations(tags)
+        return f"{name}:{path}:{'.'.join(str(generation) for generation in generations)}"
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key, entry, ttl):
+        self.backend.set(key, entry, ttl)
+
+    def invalidate(self, *tags):
+        if not self.enabled or not tags:
+            return
+        try:
+            self.backend.bump(tags)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Erreur lors de l'invalidation du cache: %s", e)
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self):
+        if not self.enabled:
+            return {'backend': None}
+        return {**self.backend.stats(), 'hits': self.hits, 'misses': self.misses, 'errors': self.errors}
+
+
+response_cache = ResponseCache.from_env()
+
+
+def invalidate_cache(*tags):
+    """
+    Invalide les réponses en cache portant ces étiquettes
+
+    À appeler après les écritures en masse qui ne passent pas par l'ORM (UPDATE
+    ensemblistes) : les écritures ORM sont suivies automatiquement.
+    """
+    response_cache.invalidate(*tags)
+
+
+def subscription_tags(subscription_id):
+    # 'subscriptions' couvre tous les abonnements (invalidation après une écriture en masse)
+    return ['subscriptions', f'subscription:{subscription_id}']
+
+
+# Étiquettes à invalider après une écriture en masse d'abonnements
+ALL_SUBSCRIPTION_TAGS = ('stats', 'expiring', 'subscriptions')
+
+
+def cached_response(name, tags):
+    """
+    Décorateur de vue GET : sert la réponse depuis le cache pendant CACHE_TTLS[name]
+    secondes et répond 304 si l'ETag envoyé (If-None-Match) est toujours valable
+
+    tags reçoit les arguments de la vue et retourne les étiquettes de la réponse.
+    Seules les réponses 200 sont mises en cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not response_cache.enabled:
+                return view(*args, **kwargs)
+
+            entry = key = None
+            try:
+                key = response_cache.key(name, request.full_path, tags(**kwargs))
+                entry = response_cache.get(key)
+            except Exception as e:
+                response_cache.errors += 1
+                logger.warning('Erreur de lecture du cache: %s', e)
+
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or key is None:
+                    return response
+                body = response.get_data()
+                entry = CachedResponse(body, hashlib.sha1(body).hexdigest())
+                try:
+                    response_cache.set(key, entry, CACHE_TTLS[name])
+                except Exception as e:
+                    response_cache.errors += 1
+                    logger.warning("Erreur d'écriture dans le cache: %s", e)
+                status = 'MISS'
+            else:
+                response = make_response(entry.body, 200, {'Content-Type': 'application/json'})
+                status = 'HIT'
+
+            response.set_etag(entry.etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Cache'] = status
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_subscription_writes(session, flush_context):
+    """
+    Note les abonnements créés, modifiés ou supprimés par ce flush (ids attribués)
+    """
+    tags = session.info.setdefault('cache_invalidations', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Subscription):
+            tags.update(('stats', 'expiring'))
+            if obj.id is not None:
+                tags.add(f'subscription:{obj.id}')
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    tags = session.info.pop('cache_invalidations', None)
+    if tags:
+        invalidate_cache(*tags)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('cache_invalidations', None)
@@ -0,0 +1,343 @@
+import os
+import random
+import threading
+import time
+from src.utils.metrics import record_upstream
+
+# Codes HTTP pour lesquels une nouvelle tentative a du sens
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Requête refusée sans être traitée : seuls codes retentés pour une méthode non idempotente
+UNPROCESSED_STATUS_CODES = {429, 503}
+# Méthodes sans effet supplémentaire si le panel reçoit la requête deux fois
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+# Réponse à retenter (voir _DinoClientBase._check_response)
+_RETRY = object()
+
+
+class DinoAPIError(Exception):
+    pass
+
+
+class CircuitOpenError(DinoAPIError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur : après failure_threshold échecs consécutifs, les appels sont refusés
+    immédiatement pendant reset_timeout secondes, puis un seul appel d'essai est
+    autorisé (demi-ouvert) ; son succès referme le circuit, son échec le rouvre.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """
+        Libère l'appel d'essai sans conclure (appel annulé avant toute réponse)
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class _DinoClientBase:
+    """
+    Réglages communs aux clients synchrone et asynchrone : timeouts, nouvelles
+    tentatives, backoff et disjoncteur
+    """
+
+    def __init__(self, base_url, api_key, connect_timeout=3.05, read_timeout=10.0,
+                 max_retries=3, backoff_base=0.5, backoff_max=8.0, pool_size=10, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            base_url=os.environ.get('DINO_API_URL', 'https://your-dino-panel.com/api'),
+            api_key=os.environ.get('DINO_API_KEY', 'your_api_key_here'),
+            connect_timeout=float(os.environ.get('DINO_CONNECT_TIMEOUT', '3.05')),
+            read_timeout=float(os.environ.get('DINO_READ_TIMEOUT', '10')),
+            max_retries=int(os.environ.get('DINO_MAX_RETRIES', '3')),
+            backoff_base=float(os.environ.get('DINO_BACKOFF_BASE', '0.5')),
+            backoff_max=float(os.environ.get('DINO_BACKOFF_MAX', '8')),
+            pool_size=int(os.environ.get('DINO_POOL_SIZE', '10')),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.environ.get('DINO_BREAKER_THRESHOLD', '5')),
+                reset_timeout=float(os.environ.get('DINO_BREAKER_RESET_SECONDS', '30'))
+            )
+        )
+
+    @property
+    def headers(self):
+        return {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+
+    def _url(self, path):
+        return f'{self.base_url}/{path.lstrip("/")}'
+
+    def _backoff(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        # "Full jitter" : étale les nouvelles tentatives de tous les workers
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_errors(self, method):
+        # Après un timeout de lecture, le panel a peut-être déjà créé le compte : une
+        # requête non idempotente (POST /create_user) n'est retentée que si elle n'a pas
+        # pu être envoyée
+        return self._network_errors if method.upper() in IDEMPOTENT_METHODS else self._connect_errors
+
+    def _check_response(self, response, path, method):
+        """
+        Retourne le corps JSON, _RETRY pour une erreur à retenter (5xx, 429), lève sinon
+
+        Une méthode non idempotente n'est retentée que sur 429 et 503 : un autre 5xx
+        peut survenir après la création du compte.
+        """
+        retryable = RETRYABLE_STATUS_CODES if method.upper() in IDEMPOTENT_METHODS else UNPROCESSED_STATUS_CODES
+        if response.status_code in retryable:
+            return _RETRY
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            self.breaker.record_failure()
+            raise DinoAPIError(f'HTTP {response.status_code} sur {path} (non retentée): {response.text[:200]}')
+        # Le panel répond : une requête refusée (4xx) ne sera pas retentée
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            raise DinoAPIError(f'HTTP {response.status_code} sur {path}: {response.text[:200]}')
+        return response.json()
+
+
+class DinoClient(_DinoClientBase):
+    """
+    Client HTTP de l'API du panel Dino
+
+    Une seule requests.Session (connexions keep-alive réutilisées, pool de
+    pool_size connexions) est partagée par tous les threads. Chaque appel a un
+    timeout de connexion et de lecture ; les erreurs réseau, 5xx et 429 sont
+    retentées avec un backoff exponentiel à jitter (Retry-After respecté), et un
+    disjoncteur coupe les appels quand le panel est durablement indisponible.
+    Un POST n'est retenté que s'il n'a pas atteint le panel (erreur de connexion,
+    429, 503), pour ne pas créer deux fois le même compte.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timeout = (self.connect_timeout, self.read_timeout)
+
+        # Importé au premier client créé (requests pèse ~50 ms au démarrage)
+        import requests
+        from requests.adapters import HTTPAdapter
+        self._network_errors = (requests.ConnectionError, requests.Timeout)
+        # Requête non envoyée (ConnectTimeout est une ConnectionError ; ReadTimeout non)
+        self._connect_errors = (requests.ConnectionError,)
+        # Autres erreurs (réponse tronquée, trop de redirections, JSON invalide...)
+        self._response_errors = (requests.RequestException,)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(self.headers)
+
+    def request(self, method, path, **kwargs):
+        """
+        Appelle l'API et retourne le corps JSON de la réponse
+        """
+        started = time.perf_counter()
+        try:
+            return self._request(method, path, **kwargs)
+        finally:
+            # Nouvelles tentatives et attentes comprises
+            record_upstream('dino', time.perf_counter() - started)
+
+    def _request(self, method, path, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError('Panel Dino indisponible (disjoncteur ouvert)')
+
+        url = self._url(path)
+        retry_errors = self._retry_errors(method)
+        error = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                response = None
+                try:
+                    response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                except retry_errors as e:
+                    error = e
+                else:
+                    data = self._check_response(response, path, method)
+                    if data is not _RETRY:
+                        return data
+                    error = DinoAPIError(f'HTTP {response.status_code} sur {path}')
+
+                if attempt < self.max_retries:
+                    time.sleep(self._backoff(attempt, response))
+        except self._network_errors as e:
+            # Requête peut-être reçue par le panel : pas de nouvelle tentative
+            self.breaker.record_failure()
+            raise DinoAPIError(f'Erreur réseau sur {path} (non retentée): {e}') from e
+        except self._response_errors as e:
+            # Toujours solder l'appel : un appel d'essai sans résultat bloquerait le disjoncteur
+            self.breaker.record_failure()
+            raise DinoAPIError(f'Réponse invalide sur {path}: {e}') from e
+
+        self.breaker.record_failure()
+        raise DinoAPIError(f'Échec après {self.max_retries + 1} tentatives: {error}')
+
+    def create_user(self, payload):
+        return self.request('POST', '/create_user', json=payload)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncDinoClient(_DinoClientBase):
+    """
+    Client asynchrone (httpx) pour le mode ASGI : mêmes réglages, nouvelles
+    tentatives et disjoncteur que DinoClient, sans bloquer de thread pendant
+    l'attente du panel
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Dépendance du mode asynchrone uniquement (requirements-async.txt)
+        import httpx
+        self._network_errors = (httpx.TransportError,)
+        self._connect_errors = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+        self._response_errors = (httpx.HTTPError, ValueError)
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        )
+
+    async def request(self, method, path, **kwargs):
+        """
+        Appelle l'API et retourne le corps JSON de la réponse
+        """
+        started = time.perf_counter()
+        try:
+            return await self._request(method, path, **kwargs)
+        finally:
+            record_upstream('dino', time.perf_counter() - started)
+
+    async def _request(self, method, path, **kwargs):
+        import asyncio
+
+        if not self.breaker.allow():
+            raise CircuitOpenError('Panel Dino indisponible (disjoncteur ouvert)')
+
+        url = self._url(path)
+        retry_errors = self._retry_errors(method)
+        error = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                response = None
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except retry_errors as e:
+                    error = e
+                else:
+                    data = self._check_response(response, path, method)
+                    if data is not _RETRY:
+                        return data
+                    error = DinoAPIError(f'HTTP {response.status_code} sur {path}')
+
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self._backoff(attempt, response))
+        except self._network_errors as e:
+            self.breaker.record_failure()
+            raise DinoAPIError(f'Erreur réseau sur {path} (non retentée): {e}') from e
+        except self._response_errors as e:
+            self.breaker.record_failure()
+            raise DinoAPIError(f'Réponse invalide sur {path}: {e}') from e
+        except asyncio.CancelledError:
+            # Client déconnecté : ni succès ni échec du panel
+            self.breaker.release()
+            raise
+
+        self.breaker.record_failure()
+        raise DinoAPIError(f'Échec après {self.max_retries + 1} tentatives: {error}')
+
+    async def create_user(self, payload):
+        return await self.request('POST', '/create_user', json=payload)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_dino_client():
+    """
+    Client Dino partagé par le processus, créé au premier appel
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = DinoClient.from_env()
+    return _client
+
+
+def reset_dino_client(client=None):
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = client
@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from src.models.subscription import db
+from src.models.email_outbox import OutboundEmail
+from src.utils.background import BackgroundWorkerPool, claim_due_rows
+
+logger = logging.getLogger(__name__)
+
+
+def _send_subscription(recipient_email, params):
+    # MIME, smtplib et Jinja2 ne sont chargés qu'au premier envoi (démarrage plus rapide)
+    from src.utils.email_sender import send_subscription_email
+    return send_subscription_email(
+        recipient_email=recipient_email,
+        full_name=params['full_name'],
+        plan_name=params['plan_name'],
+        iptv_credentials=params['iptv_credentials']
+    )
+
+
+def _send_renewal_reminder(recipient_email, params):
+    from src.utils.email_sender import send_renewal_reminder_email
+    return send_renewal_reminder_email(
+        recipient_email=recipient_email,
+        full_name=params['full_name'],
+        plan_name=params['plan_name'],
+        expires_at=datetime.fromisoformat(params['expires_at'])
+    )
+
+
+# Type d'email -> fonction d'envoi
+EMAIL_SENDERS = {
+    'subscription': _send_subscription,
+    'renewal_reminder': _send_renewal_reminder
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Type non sérialisable: {type(value).__name__}')
+
+
+def email_values(kind, recipient_email, **params):
+    """
+    Colonnes d'un nouvel email en attente (insertions en masse hors ORM)
+    """
+    if kind not in EMAIL_SENDERS:
+        raise ValueError(f"Type d'email inconnu: {kind}")
+    return {
+        'kind': kind,
+        'recipient_email': recipient_email,
+        'payload': json.dumps(params, default=_json_default),
+        'status': 'pending',
+        'attempts': 0,
+        'next_attempt_at': datetime.utcnow()
+    }
+
+
+def enqueue_email(kind, recipient_email, session=None, **params):
+    """
+    Ajoute un email à la file d'envoi dans la session courante (ou session)
+
+    L'email est persisté lors du prochain commit, dans la même transaction que
+    les données métier : il n'est jamais perdu ni envoyé pour une écriture annulée.
+    Appelez email_queue.notify() après le commit pour un envoi immédiat.
+    """
+    email = OutboundEmail(**email_values(kind, recipient_email, **params))
+    (session or db.session).add(email)
+    return email
+
+
+class EmailQueueMetrics:
+    """
+    Compteurs et latences d'envoi en mémoire (par processus)
+    """
+
+    def __init__(self, max_samples=1000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=max_samples)
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def record(self, outcome, latency):
+        with self._lock:
+            self._latencies.append(latency)
+            if outcome == 'sent':
+                self.sent += 1
+            elif outcome == 'retried':
+                self.retried += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counters = {'sent': self.sent, 'retried': self.retried, 'failed': self.failed}
+
+        def percentile(p):
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))
+            return round(latencies[index] * 1000, 2)
+
+        return {
+            **counters,
+            'latency_ms': {
+                'samples': len(latencies),
+                'avg': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+                'p50': percentile(50),
+                'p95': percentile(95),
+                'max': round(latencies[-1] * 1000, 2) if latencies else None
+            }
+        }
+
+
+class EmailQueue(BackgroundWorkerPool):
+    """
+    Workers qui vident la table email_outbox
+
+    Chaque worker réserve un lot d'emails dus par un UPDATE conditionnel (plusieurs
+    workers ou processus peuvent tourner en parallèle), les envoie puis les marque
+    'sent'. Les échecs sont replanifiés avec un backoff exponentiel jusqu'à
+    max_attempts, puis marqués 'failed'. Un email resté en 'sending' plus de
+    lease_seconds (processus tué pendant l'envoi) est de nouveau réservable.
+    """
+
+    def __init__(self, workers=2, poll_interval=2.0, batch_size=10, max_attempts=5,
+                 retry_base_seconds=30, retry_max_seconds=3600, lease_seconds=300):
+        super().__init__('email-queue', workers=workers, poll_interval=poll_interval)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.lease_seconds = lease_seconds
+        self.metrics = EmailQueueMetrics()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            workers=int(os.environ.get('EMAIL_QUEUE_WORKERS', '2')),
+            poll_interval=float(os.environ.get('EMAIL_QUEUE_POLL_INTERVAL', '2')),
+            batch_size=int(os.environ.get('EMAIL_QUEUE_BATCH_SIZE', '10')),
+            max_attempts=int(os.environ.get('EMAIL_QUEUE_MAX_ATTEMPTS', '5')),
+            retry_base_seconds=float(os.environ.get('EMAIL_QUEUE_RETRY_BASE_SECONDS', '30')),
+            retry_max_seconds=float(os.environ.get('EMAIL_QUEUE_RETRY_MAX_SECONDS', '3600'))
+        )
+
+    def retry_delay(self, attempts):
+        """
+        Délai avant la tentative suivante : base * 2^(n-1), plafonné, avec jitter
+        """
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def claim_batch(self):
+        """
+        Réserve un lot d'emails dus pour ce worker et le retourne
+        """
+        return claim_due_rows(OutboundEmail, self.batch_size, self.lease_seconds, 'pending', 'sending')
+
+    def deliver(self, email):
+        """
+        Envoie un email réservé et enregistre le résultat
+        """
+        started = time.perf_counter()
+        error = None
+        try:
+            sender = EMAIL_SENDERS[email.kind]
+            sent = sender(email.recipient_email, json.loads(email.payload))
+            if not sent:
+                error = "L'envoi a échoué"
+        except Exception as e:
+            sent = False
+            error = str(e)
+        latency = time.perf_counter() - started
+
+        email.attempts += 1
+        email.locked_at = None
+        email.claim_token = None
+        if sent:
+            email.status = 'sent'
+            email.sent_at = datetime.utcnow()
+            email.last_error = None
+            outcome = 'sent'
+        elif email.attempts >= self.max_attempts:
+            email.status = 'failed'
+            email.last_error = error
+            outcome = 'failed'
+        else:
+            email.status = 'pending'
+            email.last_error = error
+            email.next_attempt_at = datetime.utcnow() + timedelta(seconds=self.retry_delay(email.attempts))
+            outcome = 'retried'
+        db.session.commit()
+
+        self.metrics.record(outcome, latency)
+        if outcome != 'sent':
+            logger.warning('Email %s non envoyé (%s, tentative %s): %s', email.id, outcome, email.attempts, error)
+        return sent
+
+    def run_once(self):
+        emails = self.claim_batch()
+        for email in emails:
+            self.deliver(email)
+        return bool(emails)
+
+    def stats(self):
+        """
+        Profondeur de la file (par statut) et métriques d'envoi de ce processus
+        """
+        depth = dict(
+            db.session.query(OutboundEmail.status, db.func.count(OutboundEmail.id))
+            .filter(OutboundEmail.status != 'sent')
+            .group_by(OutboundEmail.status)
+            .all()
+        )
+        oldest_pending = db.session.query(db.func.min(OutboundEmail.created_at)).filter(
+            OutboundEmail.status == 'pending'
+        ).scalar()
+
+        return {
+            'depth': {
+                'pending': depth.get('pending', 0),
+                'sending': depth.get('sending', 0),
+                'failed': depth.get('failed', 0)
+            },
+            'oldest_pending_age_seconds': (
+                round((datetime.utcnow() - oldest_pending).total_seconds(), 1) if oldest_pending else None
+            ),
+            'workers': self.workers,
+            'running': self.running,
+            **self.metrics.snapshot()
+        }
+
+
+email_queue = EmailQueue.from_env()
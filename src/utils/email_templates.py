@@ -0,0 +1,75 @@
+import os
+import threading
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'emails')
+
+# Sujet de chaque email ; le corps texte et HTML sont dans templates/emails/<nom>.txt|.html
+EMAIL_SUBJECTS = {
+    'subscription': '🎬 Votre abonnement FlixStream - {{ plan_name }}',
+    'renewal_reminder': '⏰ Votre abonnement FlixStream expire bientôt'
+}
+
+
+def _date_fr(value):
+    return value.strftime('%d/%m/%Y')
+
+
+class CompiledEmailTemplate:
+    """
+    Sujet, corps texte et corps HTML d'un email, compilés une seule fois
+
+    Jinja2 compile les parties statiques (squelette HTML, CSS) en constantes Python :
+    un rendu ne fait que substituer les champs propres au client.
+    """
+
+    def __init__(self, environment, name, subject):
+        self.name = name
+        self.subject = environment.from_string(subject)
+        self.text = environment.get_template(f'{name}.txt')
+        self.html = environment.get_template(f'{name}.html')
+
+    def render(self, **context):
+        return (
+            self.subject.render(context),
+            self.text.render(context),
+            self.html.render(context)
+        )
+
+
+def _build_environment():
+    environment = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=select_autoescape(enabled_extensions=('html',), default_for_string=False),
+        undefined=StrictUndefined,
+        auto_reload=False
+    )
+    environment.filters['date_fr'] = _date_fr
+    return environment
+
+
+_templates = None
+_templates_lock = threading.Lock()
+
+
+def load_email_templates():
+    """
+    Compile tous les templates d'email (à appeler au démarrage ; idempotent)
+    """
+    global _templates
+    if _templates is None:
+        with _templates_lock:
+            if _templates is None:
+                environment = _build_environment()
+                _templates = {
+                    name: CompiledEmailTemplate(environment, name, subject)
+                    for name, subject in EMAIL_SUBJECTS.items()
+                }
+    return _templates
+
+
+def render_email(name, **context):
+    """
+    Retourne (sujet, texte, html) pour le template name
+    """
+    return load_email_templates()[name].render(**context)
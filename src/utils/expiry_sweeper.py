@@ -0,0 +1,142 @@
+import os
+import time
+from collections import Counter
+from datetime import datetime
+import click
+import logging
+from sqlalchemy import inspect, update
+from src.models.subscription import db, Subscription
+from src.models.expiry_sweep import ExpirySweep
+from src.utils.background import BackgroundWorkerPool
+from src.utils.cache import ALL_SUBSCRIPTION_TAGS, invalidate_cache
+from src.utils.idempotency import purge_expired_keys
+from src.utils.stats_counters import adjust_counters
+
+logger = logging.getLogger(__name__)
+
+
+def _expire_batch(now, batch_size):
+    """
+    Passe au plus batch_size abonnements actifs échus en 'expired' et met à jour
+    les compteurs, dans une seule transaction ; retourne le nombre de lignes modifiées
+    """
+    rows = db.session.query(Subscription.id, Subscription.plan_name).filter(
+        Subscription.status == 'active',
+        Subscription.expires_at < now
+    ).order_by(Subscription.expires_at).limit(batch_size).with_for_update(skip_locked=True).all()
+    if not rows:
+        db.session.rollback()
+        return 0
+
+    statement = update(Subscription).where(
+        Subscription.id.in_([row.id for row in rows]),
+        Subscription.status == 'active'
+    ).values(status='expired').execution_options(synchronize_session=False)
+
+    dialect = db.session.get_bind(mapper=inspect(Subscription)).dialect
+    if dialect.update_returning:
+        # Seules les lignes réellement modifiées (pas celles renouvelées entre-temps)
+        expired_plans = [plan_name for (plan_name,) in db.session.execute(
+            statement.returning(Subscription.plan_name)
+        )]
+    else:
+        db.session.execute(statement)
+        expired_plans = [row.plan_name for row in rows]
+
+    deltas = Counter()
+    for plan_name, count in Counter(expired_plans).items():
+        deltas[('active', plan_name)] -= count
+        deltas[('expired', plan_name)] += count
+    adjust_counters(db.session, deltas)
+    db.session.commit()
+    # UPDATE hors ORM : invisible pour le suivi automatique des écritures
+    invalidate_cache(*ALL_SUBSCRIPTION_TAGS)
+    return len(expired_plans)
+
+
+def sweep_expired(batch_size=1000, max_batches=None, now=None):
+    """
+    Expire tous les abonnements actifs dont expires_at est passé, par lots bornés
+
+    Chaque lot est un SELECT sur l'index (status, expires_at) suivi d'un UPDATE
+    ensembliste, validé dans sa propre transaction : les écritures concurrentes ne
+    sont jamais bloquées longtemps. Sur PostgreSQL, le SELECT ignore les lignes
+    verrouillées (renouvellement en cours, balayage d'un autre nœud) au lieu de les
+    attendre. Le déroulé est enregistré dans expiry_sweeps.
+    """
+    now = now or datetime.now()
+    sweep = ExpirySweep(status='running', started_at=datetime.utcnow())
+    db.session.add(sweep)
+    db.session.commit()
+
+    started = time.perf_counter()
+    expired_count = 0
+    batches = 0
+    error = None
+    try:
+        while max_batches is None or batches < max_batches:
+            count = _expire_batch(now, batch_size)
+            if not count:
+                break
+            expired_count += count
+            batches += 1
+    except Exception as e:
+        db.session.rollback()
+        error = str(e)
+
+    sweep.status = 'failed' if error else 'completed'
+    sweep.error = error
+    sweep.expired_count = expired_count
+    sweep.batches = batches
+    sweep.finished_at = datetime.utcnow()
+    sweep.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+    db.session.commit()
+
+    if error:
+        logger.error("Erreur lors de l'expiration des abonnements: %s", error)
+    elif expired_count:
+        logger.info('%s abonnements expirés en %s ms (%s lots)', expired_count, sweep.duration_ms, batches)
+    return sweep
+
+
+class ExpirySweeper(BackgroundWorkerPool):
+    """
+    Planificateur en processus : lance sweep_expired() toutes les interval secondes
+    """
+
+    def __init__(self, interval=300.0, batch_size=1000):
+        super().__init__('expiry-sweeper', workers=1 if interval > 0 else 0, poll_interval=interval)
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            interval=float(os.environ.get('EXPIRY_SWEEP_INTERVAL', '300')),
+            batch_size=int(os.environ.get('EXPIRY_SWEEP_BATCH_SIZE', '1000'))
+        )
+
+    def run_once(self):
+        sweep_expired(batch_size=self.batch_size)
+        # Même cadence pour la purge des Idempotency-Key expirées
+        purge_expired_keys(batch_size=self.batch_size)
+        # Toujours attendre l'intervalle avant le passage suivant
+        return False
+
+
+expiry_sweeper = ExpirySweeper.from_env()
+
+
+@click.command('sweep-expired')
+@click.option('--batch-size', default=expiry_sweeper.batch_size, show_default=True,
+              help='Abonnements expirés par transaction')
+def sweep_expired_command(batch_size):
+    """
+    Expire les abonnements actifs échus (à lancer par cron si le planificateur est désactivé)
+    """
+    sweep = sweep_expired(batch_size=batch_size)
+    click.echo(
+        f"{sweep.status}: {sweep.expired_count} abonnements expirés en "
+        f"{sweep.duration_ms} ms ({sweep.batches} lots)"
+    )
+    if sweep.status != 'completed':
+        raise SystemExit(1)
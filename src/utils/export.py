@@ -0,0 +1,55 @@
+import csv
+import io
+from datetime import datetime
+from src.utils.serialization import SUBSCRIPTION_FIELDS, dumps
+
+# Colonnes exportables, dans l'ordre par défaut
+EXPORT_FIELDS = SUBSCRIPTION_FIELDS
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+class InvalidExportParameter(ValueError):
+    pass
+
+
+def parse_datetime(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise InvalidExportParameter(f'Le paramètre {name} doit être une date ISO 8601')
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def iter_ndjson(rows, fields):
+    """
+    Génère une ligne JSON par tuple de rows
+    """
+    for row in rows:
+        yield dumps(dict(zip(fields, row))) + b'\n'
+
+
+def iter_csv(rows, fields):
+    """
+    Génère l'en-tête CSV puis une ligne par tuple de rows
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(fields)
+    yield flush()
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        yield flush()
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, jsonify, make_response, request
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from src.models.subscription import db
+from src.models.idempotency_key import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Durée de conservation des réponses (24 h par défaut)
+IDEMPOTENCY_TTL_SECONDS = float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400'))
+# Attente maximale d'une requête dupliquée pendant que l'originale s'exécute
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', '10'))
+# Au-delà, une requête restée 'in_progress' est considérée abandonnée (processus tué)
+IDEMPOTENCY_LOCK_SECONDS = float(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', '120'))
+
+MAX_KEY_LENGTH = 255
+
+# En-têtes de la réponse d'origine rejoués avec le corps
+REPLAYED_HEADERS = ('Content-Type', 'Location')
+
+# Refus temporaires (quota, conflit, surcharge) : non conservés, la même clé peut être réessayée
+TRANSIENT_STATUS_CODES = frozenset({409, 429, 503})
+
+# Réveille les requêtes dupliquées de ce processus dès qu'une requête se termine
+_finished = threading.Condition()
+
+
+def _digest(*parts):
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else part.encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def _claim(key_hash, request_hash, now):
+    """
+    Enregistre la clé 'in_progress' ; retourne False si elle existe déjà
+    """
+    # INSERT Core : la session peut déjà contenir la clé lue lors d'un tour précédent
+    try:
+        db.session.execute(insert(IdempotencyKey).values(
+            key_hash=key_hash,
+            request_hash=request_hash,
+            status='in_progress',
+            locked_at=now,
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+        ))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def _take_over(record, request_hash, now):
+    """
+    Reprend une clé expirée ou abandonnée ; un UPDATE conditionnel garantit qu'une
+    seule requête concurrente y parvient
+    """
+    same_lock = (
+        IdempotencyKey.locked_at == record.locked_at if record.locked_at is not None
+        else IdempotencyKey.locked_at.is_(None)
+    )
+    result = db.session.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.key_hash == record.key_hash,
+            IdempotencyKey.expires_at == record.expires_at,
+            same_lock
+        )
+        .values(
+            request_hash=request_hash,
+            status='in_progress',
+            response_status=None,
+            response_body=None,
+            response_headers=None,
+            locked_at=now,
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _store(key_hash, response):
+    headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+    db.session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key_hash == key_hash)
+        .values(
+            status='completed',
+            response_status=response.status_code,
+            response_body=response.get_data(),
+            response_headers=json.dumps(headers),
+            locked_at=None
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def _release(key_hash):
+    # Réponse non conservée (erreur serveur ou refus temporaire) : la même clé pourra être rejouée
+    db.session.rollback()
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key_hash == key_hash))
+    db.session.commit()
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status,
+                        headers=json.loads(record.response_headers or '{}'))
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _notify_finished():
+    with _finished:
+        _finished.notify_all()
+
+
+def idempotent(view):
+    """
+    Décorateur de vue POST : prise en charge de l'en-tête Idempotency-Key
+
+    La première requête portant une clé s'exécute normalement et sa réponse (hors
+    erreur 5xx) est conservée IDEMPOTENCY_TTL_SECONDS. Une requête répétée avec la
+    même clé et le même corps reçoit la réponse conservée, sans rien réexécuter ;
+    si l'originale est encore en cours, elle l'attend (IDEMPOTENCY_WAIT_SECONDS,
+    puis 409). La même clé avec un corps différent est refusée (422). Sans
+    en-tête, la vue s'exécute comme avant.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f"L'en-tête Idempotency-Key doit faire de 1 à {MAX_KEY_LENGTH} caractères"}), 400
+
+        key_hash = _digest(request.method, request.path, key)
+        request_hash = _digest(request.get_data())
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+
+        while True:
+            now = datetime.utcnow()
+            if _claim(key_hash, request_hash, now):
+                break
+            record = db.session.get(IdempotencyKey, key_hash, populate_existing=True)
+            if record is None:
+                continue
+            if record.expires_at <= now:
+                if _take_over(record, request_hash, now):
+                    break
+                continue
+            if record.request_hash != request_hash:
+                return jsonify({'error': 'Idempotency-Key déjà utilisée pour une requête différente'}), 422
+            if record.status == 'completed':
+                return _replay(record)
+            if record.locked_at and record.locked_at <= now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS):
+                if _take_over(record, request_hash, now):
+                    break
+                continue
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return jsonify({'error': 'Une requête avec la même Idempotency-Key est en cours'}), 409, {'Retry-After': '1'}
+            # Libère la connexion pendant l'attente (réveil immédiat dans ce processus,
+            # relecture périodique pour une requête traitée par un autre processus)
+            db.session.rollback()
+            with _finished:
+                _finished.wait(min(remaining, 0.25))
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            _release(key_hash)
+            _notify_finished()
+            raise
+
+        try:
+            if response.status_code >= 500 or response.status_code in TRANSIENT_STATUS_CODES:
+                _release(key_hash)
+            else:
+                _store(key_hash, response)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Erreur lors de l'enregistrement de l'Idempotency-Key: %s", e)
+        _notify_finished()
+        return response
+    return wrapper
+
+
+def purge_expired_keys(batch_size=1000):
+    """
+    Supprime les clés expirées par lots ; retourne le nombre de clés supprimées
+    """
+    purged = 0
+    while True:
+        expired = db.session.query(IdempotencyKey.key_hash).filter(
+            IdempotencyKey.expires_at < datetime.utcnow()
+        ).limit(batch_size).subquery()
+        result = db.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key_hash.in_(db.session.query(expired.c.key_hash)))
+        )
+        db.session.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
@@ -0,0 +1,279 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from flask import g, request
+
+# Requête HTTP en cours (request_id, method, endpoint), ajoutée à chaque ligne de log
+_request_context = contextvars.ContextVar('log_request_context', default=None)
+
+# Valeurs masquées dans les messages : mots de passe, clés, jetons, en-têtes Authorization
+_SECRET_PATTERNS = (
+    re.compile(
+        r'''(?i)(['"]?\b(?:\w*password|passwd|pwd|secret|api_?key|token|authorization)['"]?\s*[:=]\s*)'''
+        r'''((?:bearer\s+|basic\s+)?(?:"[^"]*"|'[^']*'|[^\s,;}&]+))'''
+    ),
+    re.compile(r'(?i)(\bbearer\s+)[\w.~+/=-]+'),
+)
+
+_REQUEST_ID = re.compile(r'^[\w.-]{1,64}$')
+
+# Attributs standard d'un LogRecord (le reste vient de extra={...})
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def redact(text):
+    """
+    Masque les secrets d'un texte de log
+    """
+    for pattern in _SECRET_PATTERNS:
+        text = pattern.sub(r'\1***', text)
+    return text
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Ajoute request_id, method et endpoint de la requête en cours (thread appelant)
+    """
+
+    def filter(self, record):
+        context = _request_context.get()
+        if context:
+            for key, value in context.items():
+                setattr(record, key, value)
+        return True
+
+
+class RepeatedErrorFilter(logging.Filter):
+    """
+    Limite les avertissements et erreurs répétés d'un même endroit du code
+
+    Par emplacement (fichier, ligne, type d'exception), les burst premiers
+    messages de chaque fenêtre de window secondes passent ; au-delà, seul un
+    message sur 1/sample_rate est gardé. Le message suivant porte le nombre de
+    messages écartés (champ suppressed).
+    """
+
+    def __init__(self, burst=5, window=60.0, sample_rate=0.01, max_keys=10000):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.sample_rate = sample_rate
+        self.max_keys = max_keys
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            burst=int(os.environ.get('LOG_ERROR_BURST', '5')),
+            window=float(os.environ.get('LOG_ERROR_WINDOW_SECONDS', '60')),
+            sample_rate=float(os.environ.get('LOG_ERROR_SAMPLE_RATE', '0.01'))
+        )
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        exception_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        key = (record.pathname, record.lineno, exception_type)
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None or now - state[0] >= self.window:
+                if len(self._seen) >= self.max_keys:
+                    self._seen.clear()
+                # [début de fenêtre, messages vus, messages écartés non encore signalés]
+                state = self._seen[key] = [now, 0, state[2] if state else 0]
+            state[1] += 1
+            if state[1] > self.burst and random.random() >= self.sample_rate:
+                state[2] += 1
+                return False
+            if state[2]:
+                record.suppressed = state[2]
+                state[2] = 0
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Une ligne JSON par message : horodatage, niveau, logger, message, contexte de requête et extra
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = '-'
+        return super().format(record)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Met les messages en file sans jamais bloquer le thread appelant
+
+    Le message est calculé et masqué ici (les arguments et la trace de l'exception
+    peuvent référencer des objets de la requête) ; la sérialisation JSON et
+    l'écriture ont lieu dans le thread du QueueListener. Si la file est pleine, le
+    message est abandonné et compté.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = redact(logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+_listener = None
+_listener_pid = None
+
+
+def configure_logging():
+    """
+    Envoie tous les logs du processus vers stdout via une file et un thread dédié
+
+    LOG_LEVEL (INFO), LOG_FORMAT (json ou text), LOG_QUEUE_SIZE (10000 messages).
+    Appelez-la de nouveau dans un processus forké (les threads ne survivent pas au fork).
+    """
+    global _listener, _listener_pid
+    # Dans un processus forké, le thread du listener hérité n'existe plus : rien à arrêter
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if os.environ.get('LOG_FORMAT', 'json') == 'text' else JSONFormatter())
+
+    log_queue = queue.Queue(maxsize=int(os.environ.get('LOG_QUEUE_SIZE', '10000')))
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(RepeatedErrorFilter.from_env())
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if isinstance(h, NonBlockingQueueHandler)]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+
+def _stop_listener():
+    # Vide la file avant la sortie du processus
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
+
+access_logger = logging.getLogger('src.access')
+
+# Part des requêtes réussies journalisées (les erreurs le sont toujours)
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get('LOG_ACCESS_SAMPLE_RATE', '1'))
+
+
+def request_id_from(header_value):
+    """
+    Identifiant de requête : celui du client (X-Request-ID) s'il est valide, sinon un nouveau
+    """
+    return header_value if header_value and _REQUEST_ID.match(header_value) else uuid.uuid4().hex
+
+
+def bind_request_context(request_id, method, endpoint):
+    """
+    Ajoute request_id, method et endpoint aux logs du contexte courant ; retourne le jeton
+    à passer à unbind_request_context()
+    """
+    return _request_context.set({'request_id': request_id, 'method': method, 'endpoint': endpoint})
+
+
+def unbind_request_context(token):
+    _request_context.reset(token)
+
+
+def log_access(method, path, status, duration):
+    """
+    Journalise une requête terminée (toujours si erreur serveur, sinon selon LOG_ACCESS_SAMPLE_RATE)
+    """
+    if status >= 500 or random.random() < ACCESS_LOG_SAMPLE_RATE:
+        access_logger.log(
+            logging.ERROR if status >= 500 else logging.INFO,
+            '%s %s %s', method, path, status,
+            extra={
+                'path': path,
+                'status': status,
+                'latency_ms': round(duration * 1000, 2)
+            }
+        )
+
+
+def init_request_logging(app):
+    """
+    Associe un identifiant à chaque requête (en-tête X-Request-ID, repris s'il est
+    fourni) et journalise la requête à la fin : méthode, chemin, statut, latence
+    """
+
+    @app.before_request
+    def _bind_request_context():
+        g.request_id = request_id_from(request.headers.get('X-Request-ID'))
+        g.log_started = time.perf_counter()
+        g.log_context_token = bind_request_context(
+            g.request_id,
+            request.method,
+            request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        )
+
+    @app.after_request
+    def _log_request(response):
+        started = g.pop('log_started', None)
+        if started is None:
+            return response
+        response.headers['X-Request-ID'] = g.request_id
+        log_access(request.method, request.path, response.status_code, time.perf_counter() - started)
+        return response
+
+    @app.teardown_request
+    def _unbind_request_context(exception=None):
+        token = g.pop('log_context_token', None)
+        if token is not None:
+            unbind_request_context(token)
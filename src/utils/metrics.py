@@ -0,0 +1,229 @@
+import contextvars
+import os
+import random
+import threading
+import time
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.utils.profiling import SamplingProfiler
+
+# Bornes des histogrammes (secondes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    """
+    Histogramme cumulatif au format Prometheus, avec étiquettes
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(series):
+            base = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(base, bound)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(base, '+Inf')} {count}")
+            lines.append(f"{self.name}_sum{_labels(base)} {total}")
+            lines.append(f"{self.name}_count{_labels(base)} {count}")
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(base, bound=None):
+    pairs = base + ([f'le="{bound}"'] if bound is not None else [])
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+REQUEST_DURATION = Histogram(
+    'flixstream_http_request_duration_seconds', 'Durée totale des requêtes HTTP',
+    ('method', 'endpoint', 'status')
+)
+REQUEST_DB_TIME = Histogram(
+    'flixstream_request_db_seconds', 'Temps passé en base de données par requête HTTP', ('endpoint',)
+)
+REQUEST_DB_QUERIES = Histogram(
+    'flixstream_request_db_queries', 'Nombre de requêtes SQL par requête HTTP', ('endpoint',),
+    buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_UPSTREAM_TIME = Histogram(
+    'flixstream_request_upstream_seconds', 'Temps passé dans les appels sortants (dino, smtp) par requête HTTP',
+    ('endpoint', 'upstream')
+)
+DB_QUERY_DURATION = Histogram(
+    'flixstream_db_query_duration_seconds', 'Durée des requêtes SQL (requêtes HTTP et workers de fond)'
+)
+UPSTREAM_CALL_DURATION = Histogram(
+    'flixstream_upstream_call_duration_seconds', 'Durée des appels sortants (requêtes HTTP et workers de fond)',
+    ('upstream',)
+)
+
+HISTOGRAMS = (
+    REQUEST_DURATION, REQUEST_DB_TIME, REQUEST_DB_QUERIES, REQUEST_UPSTREAM_TIME,
+    DB_QUERY_DURATION, UPSTREAM_CALL_DURATION
+)
+
+UPSTREAMS = ('dino', 'smtp')
+
+
+class RequestTimings:
+    """
+    Décomposition du temps de la requête HTTP en cours
+    """
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.upstream = dict.fromkeys(UPSTREAMS, 0.0)
+
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+def record_upstream(upstream, duration):
+    """
+    Enregistre la durée d'un appel sortant (panel Dino, envoi SMTP)
+    """
+    UPSTREAM_CALL_DURATION.observe(duration, upstream)
+    timings = _current.get()
+    if timings is not None:
+        timings.upstream[upstream] += duration
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_started'].pop()
+    DB_QUERY_DURATION.observe(duration)
+    timings = _current.get()
+    if timings is not None:
+        timings.db_time += duration
+        timings.db_queries += 1
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get('query_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+profiler = SamplingProfiler.from_env()
+
+
+def begin_request_timings():
+    """
+    Commence à mesurer le temps SQL et les appels sortants du contexte courant ;
+    retourne le jeton à passer à end_request_timings()
+    """
+    return _current.set(RequestTimings())
+
+
+def end_request_timings(token):
+    timings = _current.get()
+    _current.reset(token)
+    return timings
+
+
+def record_request(method, endpoint, status, duration, timings):
+    """
+    Enregistre une requête terminée dans les histogrammes et retourne l'en-tête Server-Timing
+    """
+    REQUEST_DURATION.observe(duration, method, endpoint, str(status))
+    REQUEST_DB_TIME.observe(timings.db_time, endpoint)
+    REQUEST_DB_QUERIES.observe(timings.db_queries, endpoint)
+    server_timing = [f'db;dur={timings.db_time * 1000:.2f};desc="{timings.db_queries} SQL"']
+    for upstream, upstream_time in timings.upstream.items():
+        if upstream_time:
+            REQUEST_UPSTREAM_TIME.observe(upstream_time, endpoint, upstream)
+            server_timing.append(f'{upstream};dur={upstream_time * 1000:.2f}')
+    server_timing.append(f'total;dur={duration * 1000:.2f}')
+    return ', '.join(server_timing)
+
+
+def _endpoint_label():
+    # Le motif de route (et non le chemin) garde un nombre de séries borné
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def init_metrics(app):
+    """
+    Mesure chaque requête : durée totale, temps et nombre de requêtes SQL, temps des
+    appels sortants. Ajoute un en-tête Server-Timing et, si le profileur est activé,
+    écrit les piles des requêtes lentes échantillonnées.
+    """
+    if os.environ.get('METRICS_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+        return
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+        g.request_timings_token = begin_request_timings()
+        g.profiled = profiler.enabled and random.random() < profiler.sample_rate
+        if g.profiled:
+            profiler.begin(threading.get_ident())
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('request_started', None)
+        timings = _current.get()
+        if started is None or timings is None:
+            return response
+        duration = time.perf_counter() - started
+        response.headers['Server-Timing'] = record_request(
+            request.method, _endpoint_label(), response.status_code, duration, timings
+        )
+
+        if g.pop('profiled', False):
+            stacks = profiler.end(threading.get_ident())
+            if duration * 1000 >= profiler.slow_ms:
+                profiler.dump(stacks, f'{request.method} {request.path}', duration)
+        return response
+
+    @app.teardown_request
+    def _reset_request_timer(exception=None):
+        if g.pop('profiled', False):
+            profiler.end(threading.get_ident())
+        token = g.pop('request_timings_token', None)
+        if token is not None:
+            end_request_timings(token)
+
+
+def render_metrics():
+    """
+    Tous les histogrammes au format texte Prometheus
+    """
+    return '\n'.join(histogram.render() for histogram in HISTOGRAMS) + '\n'
@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidPaginationParameter(ValueError):
+    pass
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """
+    Valide le paramètre limit (entier entre 1 et maximum)
+    """
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise InvalidPaginationParameter('Le paramètre limit doit être un entier')
+    if limit < 1:
+        raise InvalidPaginationParameter('Le paramètre limit doit être positif')
+    return min(limit, maximum)
+
+
+def encode_cursor(created_at, record_id):
+    """
+    Encode la position (created_at, id) du dernier élément d'une page en jeton opaque
+    """
+    raw = json.dumps([created_at.isoformat() if created_at else None, record_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Décode un jeton produit par encode_cursor() en (created_at, id)
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None, int(record_id))
+    except (ValueError, TypeError):
+        raise InvalidPaginationParameter('Curseur invalide')
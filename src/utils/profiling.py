@@ -0,0 +1,99 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def _collapse(frame):
+    """
+    Pile d'appels au format "replié" (racine;...;feuille) lu par flamegraph.pl et speedscope
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Profileur par échantillonnage des requêtes lentes
+
+    Un thread relève toutes les interval secondes la pile des threads qui traitent
+    une requête échantillonnée (sample_rate). Si la requête dure plus de slow_ms,
+    ses piles sont écrites dans output_dir, une ligne "pile nombre" par pile
+    distincte : flamegraph.pl <fichier>.folded > flamegraph.svg.
+    """
+
+    def __init__(self, enabled=False, interval=0.005, sample_rate=1.0, slow_ms=500.0,
+                 output_dir='profiles'):
+        self.enabled = enabled
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.output_dir = output_dir
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.environ.get('PROFILER_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+            interval=float(os.environ.get('PROFILER_INTERVAL_MS', '5')) / 1000,
+            sample_rate=float(os.environ.get('PROFILER_SAMPLE_RATE', '1')),
+            slow_ms=float(os.environ.get('PROFILER_SLOW_MS', '500')),
+            output_dir=os.environ.get('PROFILER_OUTPUT_DIR', 'profiles')
+        )
+
+    def start(self):
+        # Après un fork, le thread hérité du processus parent n'existe plus
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def begin(self, thread_id):
+        with self._lock:
+            self._active[thread_id] = Counter()
+
+    def end(self, thread_id):
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[_collapse(frame)] += 1
+
+    def dump(self, stacks, label, duration):
+        """
+        Écrit les piles d'une requête lente et retourne le chemin du fichier
+        """
+        if not stacks:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')[:80]
+        path = os.path.join(
+            self.output_dir,
+            f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{slug}-{duration * 1000:.0f}ms.folded"
+        )
+        with open(path, 'w') as output:
+            for stack, count in stacks.most_common():
+                output.write(f'{stack} {count}\n')
+        logger.info('Requête lente %s (%.0f ms) : profil écrit dans %s', label, duration * 1000, path)
+        return path
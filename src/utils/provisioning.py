@@ -0,0 +1,195 @@
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from src.models.subscription import db, Subscription
+from src.models.provisioning_job import ProvisioningJob
+from src.utils.background import BackgroundWorkerPool, claim_due_rows
+from src.utils.email_queue import email_queue, enqueue_email
+
+logger = logging.getLogger(__name__)
+
+
+def apply_iptv_account(subscription, iptv_account):
+    """
+    Enregistre un compte IPTV créé sur l'abonnement et l'active
+    """
+    subscription.iptv_username = iptv_account['username']
+    subscription.iptv_password = iptv_account['password']
+    subscription.iptv_url = iptv_account['url']
+    subscription.expires_at = iptv_account['expires_at']
+    subscription.status = 'active'
+
+
+def lock_subscription(subscription_id):
+    """
+    Relit l'abonnement en le verrouillant (SELECT ... FOR UPDATE) jusqu'au commit
+
+    À appeler avant de l'activer après un appel au panel : le statut relu est celui
+    de la base (compteurs justes) et aucun renouvellement ou balayage concurrent ne
+    le modifie avant le commit. Retourne None s'il a été supprimé entre-temps.
+    """
+    return db.session.get(Subscription, subscription_id, with_for_update=True, populate_existing=True)
+
+
+def provisioning_job_values(subscription_id):
+    """
+    Colonnes d'un nouveau job de provisionnement (insertions en masse hors ORM)
+    """
+    return {
+        'id': uuid.uuid4().hex,
+        'subscription_id': subscription_id,
+        'status': 'queued',
+        'attempts': 0,
+        'next_attempt_at': datetime.utcnow()
+    }
+
+
+def enqueue_provisioning(subscription, session=None):
+    """
+    Ajoute un job de création du compte IPTV dans la session courante (ou session)
+
+    L'abonnement doit avoir un id (flush préalable). Appelez
+    provisioning_queue.notify() après le commit pour un traitement immédiat.
+    """
+    job = ProvisioningJob(**provisioning_job_values(subscription.id))
+    (session or db.session).add(job)
+    return job
+
+
+class ProvisioningQueue(BackgroundWorkerPool):
+    """
+    Workers qui créent les comptes IPTV des abonnements en attente
+
+    Pour chaque job réservé : appel au panel Dino, activation de l'abonnement et mise
+    en file de l'email de bienvenue, dans une seule transaction. Un échec est
+    retenté avec un backoff exponentiel jusqu'à max_attempts, puis le job passe en
+    'failed' (l'abonnement reste 'pending'). Les requêtes en long-polling du même
+    processus sont réveillées dès qu'un job se termine.
+    """
+
+    def __init__(self, workers=4, poll_interval=1.0, batch_size=5, max_attempts=5,
+                 retry_base_seconds=5, retry_max_seconds=600, lease_seconds=300):
+        super().__init__('provisioning', workers=workers, poll_interval=poll_interval)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.lease_seconds = lease_seconds
+        self._finished = threading.Condition()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            workers=int(os.environ.get('PROVISIONING_WORKERS', '4')),
+            poll_interval=float(os.environ.get('PROVISIONING_POLL_INTERVAL', '1')),
+            batch_size=int(os.environ.get('PROVISIONING_BATCH_SIZE', '5')),
+            max_attempts=int(os.environ.get('PROVISIONING_MAX_ATTEMPTS', '5')),
+            retry_base_seconds=float(os.environ.get('PROVISIONING_RETRY_BASE_SECONDS', '5')),
+            retry_max_seconds=float(os.environ.get('PROVISIONING_RETRY_MAX_SECONDS', '600'))
+        )
+
+    def retry_delay(self, attempts):
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def claim_batch(self):
+        return claim_due_rows(ProvisioningJob, self.batch_size, self.lease_seconds, 'queued', 'running')
+
+    def process(self, job):
+        """
+        Crée le compte IPTV d'un job réservé et enregistre le résultat
+        """
+        # Import tardif : create_iptv_account est défini (et adaptable) dans les routes
+        from src.routes.subscription import create_iptv_account
+
+        subscription = db.session.get(Subscription, job.subscription_id)
+        iptv_account = None
+        error = None
+        if subscription is None:
+            error = 'Abonnement introuvable'
+        else:
+            plan_id, full_name, email = subscription.plan_id, subscription.full_name, subscription.email
+            # Aucune transaction ouverte pendant l'appel au panel (connexion PgBouncer,
+            # instantané de lecture SQLite) : la ligne est relue et verrouillée ensuite
+            db.session.rollback()
+            try:
+                iptv_account = create_iptv_account(plan_id, full_name, email)
+                if not iptv_account:
+                    error = 'Erreur lors de la création du compte IPTV'
+            except Exception as e:
+                error = str(e)
+
+        if iptv_account:
+            subscription = lock_subscription(job.subscription_id)
+            if subscription is None:
+                iptv_account, error = None, 'Abonnement introuvable'
+
+        job.attempts += 1
+        job.locked_at = None
+        job.claim_token = None
+        if iptv_account:
+            apply_iptv_account(subscription, iptv_account)
+            enqueue_email(
+                'subscription',
+                subscription.email,
+                full_name=subscription.full_name,
+                plan_name=subscription.plan_name,
+                iptv_credentials={
+                    'username': iptv_account['username'],
+                    'password': iptv_account['password'],
+                    'url': iptv_account['url']
+                }
+            )
+            job.status = 'succeeded'
+            job.last_error = None
+            job.finished_at = datetime.utcnow()
+        elif subscription is None or job.attempts >= self.max_attempts:
+            job.status = 'failed'
+            job.last_error = error
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = 'queued'
+            job.last_error = error
+            job.next_attempt_at = datetime.utcnow() + timedelta(seconds=self.retry_delay(job.attempts))
+        db.session.commit()
+
+        if job.status == 'succeeded':
+            email_queue.notify()
+        else:
+            logger.warning('Provisioning %s non abouti (%s, tentative %s): %s', job.id, job.status, job.attempts, error)
+        if job.finished:
+            with self._finished:
+                self._finished.notify_all()
+        return job.status == 'succeeded'
+
+    def run_once(self):
+        jobs = self.claim_batch()
+        for job in jobs:
+            self.process(job)
+        return bool(jobs)
+
+    def wait_for(self, job_id, timeout):
+        """
+        Attend au plus timeout secondes qu'un job se termine et le retourne (None s'il n'existe pas)
+
+        Réveillé immédiatement par les workers de ce processus ; relit la base chaque
+        seconde pour les jobs traités par un autre processus.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            db.session.expire_all()
+            job = db.session.get(ProvisioningJob, job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job.finished or remaining <= 0:
+                return job
+            # Libère la connexion pendant l'attente
+            db.session.rollback()
+            with self._finished:
+                self._finished.wait(min(remaining, 1.0))
+
+
+provisioning_queue = ProvisioningQueue.from_env()
@@ -0,0 +1,371 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import jsonify, request
+
+try:
+    import redis
+except ImportError:  # dépendance optionnelle (RATE_LIMIT_BACKEND=redis)
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Seau à jetons : rate jetons par seconde, au plus capacity jetons accumulés
+    """
+
+    def __init__(self, rate, capacity=None):
+        if not math.isfinite(rate) or rate <= 0:
+            raise ValueError(f'Débit invalide: {rate!r} (nombre de jetons par seconde > 0 attendu)')
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Prend tokens jetons s'ils sont disponibles ; sinon retourne le délai d'attente (secondes)
+
+        Retourne 0 en cas de succès.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """
+        Attend que tokens jetons soient disponibles puis les prend
+        """
+        if tokens > self.capacity:
+            raise ValueError('Demande supérieure à la capacité du seau')
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+# Périodes acceptées dans RATE_LIMIT_PER_IP / RATE_LIMIT_PER_EMAIL ("20/minute")
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Nombre de proxys de confiance devant l'application (X-Forwarded-For)
+TRUSTED_PROXIES = int(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', '0'))
+
+
+def parse_rate(value):
+    """
+    "20/minute" -> (jetons par seconde, capacité) ; None si la limite est désactivée
+    """
+    if not value or value.strip() in ('0', 'none', 'off'):
+        return None
+    count, _, period = value.strip().partition('/')
+    seconds = _PERIODS.get(period.strip().rstrip('s') or 'second')
+    if seconds is None or not count.strip().isdigit() or int(count) <= 0:
+        raise ValueError(f'Limite invalide: {value!r} (attendu: "<nombre>/<second|minute|hour|day>")')
+    return int(count) / seconds, float(count)
+
+
+class MemoryRateLimitBackend:
+    """
+    Seaux à jetons en mémoire du processus, bornés à max_keys clés (LRU)
+
+    Avec plusieurs workers Gunicorn, chaque processus applique la limite de son côté.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, rate, capacity, cost=1):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [capacity, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            return (cost - bucket[0]) / rate
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'keys': len(self._buckets), 'max_keys': self.max_keys}
+
+
+# Seau à jetons atomique côté Redis (horloge du serveur, commune à tous les workers) ;
+# retourne le délai d'attente en millisecondes (0 si accepté)
+_REDIS_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = math.ceil((cost - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Seaux à jetons partagés par tous les workers (un aller-retour Redis par contrôle)
+    """
+
+    def __init__(self, url, prefix='flixstream:ratelimit:'):
+        if redis is None:
+            raise RuntimeError('RATE_LIMIT_BACKEND=redis nécessite le paquet redis (pip install redis)')
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.prefix = prefix
+        self._script = self.client.register_script(_REDIS_TOKEN_BUCKET)
+
+    def hit(self, key, rate, capacity, cost=1):
+        return int(self._script(keys=[self.prefix + key], args=[rate, capacity, cost])) / 1000
+
+    def stats(self):
+        return {'backend': 'redis'}
+
+
+class RateLimitRule:
+    """
+    Limite appliquée par client : key reçoit la requête et retourne l'identifiant du
+    client (adresse IP, email...) ou None pour ne pas limiter cette requête
+    """
+
+    def __init__(self, name, key, rate):
+        self.name = name
+        self.key = key
+        self.rate = rate
+
+
+class RateLimiter:
+    """
+    Limiteur de débit par client, sur un backend mémoire ou Redis
+
+    En cas d'erreur du backend (Redis indisponible), la requête est acceptée.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.rejected = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls):
+        name = os.environ.get('RATE_LIMIT_BACKEND', 'memory').lower()
+        if name in ('none', 'off', 'false', '0'):
+            return cls(None)
+        if name == 'redis':
+            return cls(RedisRateLimitBackend(os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')))
+        return cls(MemoryRateLimitBackend(max_keys=int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))))
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def check(self, req, rules):
+        """
+        Retourne 0 si la requête req est acceptée, sinon le délai (secondes) avant de réessayer
+        """
+        for rule in rules:
+            if rule.rate is None:
+                continue
+            client = rule.key(req)
+            if client is None:
+                continue
+            try:
+                wait = self.backend.hit(f'{rule.name}:{client}', *rule.rate)
+            except Exception as e:
+                self.errors += 1
+                logger.warning('Erreur du limiteur de débit: %s', e)
+                return 0.0
+            if wait:
+                self.rejected += 1
+                return wait
+        return 0.0
+
+    def stats(self):
+        if not self.enabled:
+            return {'backend': None}
+        return {**self.backend.stats(), 'rejected': self.rejected, 'errors': self.errors}
+
+
+rate_limiter = RateLimiter.from_env()
+
+
+def client_ip(req):
+    """
+    Adresse du client ; derrière RATE_LIMIT_TRUSTED_PROXIES proxys, lue dans X-Forwarded-For
+    """
+    if TRUSTED_PROXIES:
+        forwarded = [part.strip() for part in req.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+        if len(forwarded) >= TRUSTED_PROXIES:
+            return forwarded[-TRUSTED_PROXIES]
+    return req.remote_addr
+
+
+def request_email(req):
+    data = req.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+IP_RATE_LIMIT = RateLimitRule('ip', client_ip, parse_rate(os.environ.get('RATE_LIMIT_PER_IP', '30/minute')))
+EMAIL_RATE_LIMIT = RateLimitRule('email', request_email, parse_rate(os.environ.get('RATE_LIMIT_PER_EMAIL', '5/hour')))
+
+
+def too_many_requests(wait):
+    """
+    Corps et en-têtes de la réponse 429 pour un délai d'attente wait (secondes)
+    """
+    retry_after = max(1, math.ceil(wait))
+    return {'error': f'Trop de requêtes, réessayez dans {retry_after} s'}, {'Retry-After': str(retry_after)}
+
+
+def check_rate_limits(*rules):
+    """
+    Applique les limites à la requête courante : réponse 429 si l'une est dépassée, sinon None
+
+    À appeler dans la vue pour une limite qui ne doit compter que les requêtes
+    valides (EMAIL_RATE_LIMIT : une requête refusée en 400 ne consomme pas le quota).
+    """
+    if not rate_limiter.enabled:
+        return None
+    wait = rate_limiter.check(request, rules)
+    if not wait:
+        return None
+    payload, headers = too_many_requests(wait)
+    return jsonify(payload), 429, headers
+
+
+def rate_limited(*rules):
+    """
+    Décorateur de vue : 429 avec Retry-After quand un client dépasse l'une des limites
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            response = check_rate_limits(*rules)
+            if response is not None:
+                return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ConcurrencyLimiter:
+    """
+    Contrôle d'admission : au plus limit requêtes exécutées en même temps par processus
+
+    Les requêtes suivantes attendent une place, au plus queue_size à la fois et
+    pendant queue_timeout secondes ; au-delà elles sont refusées aussitôt (503)
+    plutôt que d'occuper un worker et d'allonger la latence de toutes les autres.
+    """
+
+    def __init__(self, limit=8, queue_size=16, queue_timeout=2.0):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.shed = 0
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            limit=int(os.environ.get('ADMISSION_MAX_CONCURRENT', '8')),
+            queue_size=int(os.environ.get('ADMISSION_QUEUE_SIZE', '16')),
+            queue_timeout=float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '2'))
+        )
+
+    def acquire(self):
+        """
+        Réserve une place ; retourne False si la requête doit être refusée
+        """
+        with self._condition:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue_size:
+                self.shed += 1
+                return False
+            self.waiting += 1
+            try:
+                admitted = self._condition.wait_for(lambda: self.active < self.limit, self.queue_timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                self.shed += 1
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'limit': self.limit,
+                'active': self.active,
+                'waiting': self.waiting,
+                'shed': self.shed
+            }
+
+
+# Endpoints qui créent des comptes IPTV (panel Dino) : inscription, renouvellements
+provisioning_limiter = ConcurrencyLimiter.from_env()
+
+
+def limit_concurrency(limiter):
+    """
+    Décorateur de vue : 503 avec Retry-After quand le limiteur refuse la requête
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if limiter.limit <= 0:
+                return view(*args, **kwargs)
+            if not limiter.acquire():
+                return jsonify({
+                    'error': 'Service surchargé, réessayez dans quelques instants'
+                }), 503, {'Retry-After': '1'}
+            try:
+                return view(*args, **kwargs)
+            finally:
+                limiter.release()
+        return wrapper
+    return decorator
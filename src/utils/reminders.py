@@ -0,0 +1,300 @@
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import Date, String, cast, func, inspect, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from src.models.subscription import db, Subscription
+from src.models.reminder import ReminderCampaign, ReminderLedger
+from src.utils.background import BackgroundWorkerPool, advisory_xact_lock
+from src.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class CampaignAlreadyRunning(Exception):
+    def __init__(self, campaign):
+        super().__init__(f'La campagne {campaign.id} est déjà en cours')
+        self.campaign = campaign
+
+
+def window_key(expires_at):
+    """
+    Clé de déduplication : une relance par date d'expiration (un renouvellement ouvre une nouvelle période)
+    """
+    return expires_at.date().isoformat()
+
+
+def _send_reminders(reminders, connections):
+    # MIME et smtplib ne sont chargés qu'au premier envoi (démarrage plus rapide)
+    from src.utils.email_sender import send_renewal_reminder_emails
+    return send_renewal_reminder_emails(reminders, connections=connections)
+
+
+def _window_key_column():
+    # Équivalent SQL de window_key(Subscription.expires_at) : date d'expiration AAAA-MM-JJ
+    dialect = db.session.get_bind(mapper=inspect(Subscription)).dialect.name
+    if dialect == 'sqlite':
+        return func.date(Subscription.expires_at)
+    return cast(cast(Subscription.expires_at, Date), String)
+
+
+def _insert_ignore_duplicates(table):
+    dialect = db.session.get_bind(mapper=inspect(ReminderLedger)).dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table).on_conflict_do_nothing()
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+        return postgresql_insert(table).on_conflict_do_nothing()
+    return insert(table)
+
+
+class ReminderEngine:
+    """
+    Campagne de relance des abonnements qui expirent dans les window_days prochains jours
+
+    Les abonnements dus sont lus par lots de chunk_size dans l'ordre des id. Pour
+    chaque lot, ceux déjà présents dans le registre reminder_ledger pour leur
+    période sont ignorés, les autres sont envoyés via le pool SMTP (connections
+    sessions en parallèle, au plus rate_per_second emails par seconde), puis les
+    envois réussis sont inscrits au registre et le point de reprise (checkpoint_id)
+    avancé dans la même transaction. Une campagne interrompue (processus tué) est
+    reprise à son point de reprise au lancement suivant.
+    """
+
+    def __init__(self, window_days=7, chunk_size=200, rate_per_second=5.0, connections=3,
+                 stale_after_seconds=600):
+        if not math.isfinite(rate_per_second) or rate_per_second <= 0:
+            raise ValueError(f'REMINDER_RATE_PER_SECOND invalide: {rate_per_second!r} (nombre > 0 attendu)')
+        self.window_days = window_days
+        self.chunk_size = chunk_size
+        self.rate_per_second = rate_per_second
+        self.connections = connections
+        self.stale_after_seconds = stale_after_seconds
+        # Envoi d'un lot (reminders, connections) -> [bool] ; remplacé en mode ASGI (SMTP asynchrone)
+        self.send_batch = _send_reminders
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            window_days=int(os.environ.get('REMINDER_WINDOW_DAYS', '7')),
+            chunk_size=int(os.environ.get('REMINDER_CHUNK_SIZE', '200')),
+            rate_per_second=float(os.environ.get('REMINDER_RATE_PER_SECOND', '5')),
+            connections=int(os.environ.get('REMINDER_SMTP_CONNECTIONS', '3'))
+        )
+
+    def _due_query(self, campaign):
+        return Subscription.query.filter(
+            Subscription.status == 'active',
+            Subscription.expires_at >= campaign.window_start,
+            Subscription.expires_at <= campaign.window_end
+        )
+
+    def _count_backlog(self, campaign):
+        # Compté en base : abonnements dus sans relance au registre pour leur date d'expiration
+        already_sent = select(ReminderLedger.id).where(
+            ReminderLedger.subscription_id == Subscription.id,
+            ReminderLedger.window_key == _window_key_column()
+        ).exists()
+        return db.session.execute(
+            self._due_query(campaign).filter(~already_sent)
+            .with_entities(func.count()).order_by(None).statement
+        ).scalar_one()
+
+    def start_campaign(self, resume=True):
+        """
+        Reprend la campagne interrompue la plus récente, ou en crée une nouvelle
+
+        Deux processus ne peuvent pas lancer de campagne en même temps : sur PostgreSQL
+        un verrou consultatif sérialise cette étape entre les nœuds ; sur toutes les
+        bases, l'index unique uq_reminder_campaigns_running refuse une deuxième
+        campagne en cours et la reprise est réservée par un UPDATE conditionnel.
+        """
+        advisory_xact_lock(db.session.connection(), 'reminder-campaign')
+        running = ReminderCampaign.query.filter_by(status='running').order_by(ReminderCampaign.id.desc()).first()
+        if running:
+            stale_before = datetime.utcnow() - timedelta(seconds=self.stale_after_seconds)
+            if running.updated_at and running.updated_at > stale_before:
+                error = CampaignAlreadyRunning(running)
+                db.session.rollback()
+                raise error
+            if resume:
+                # Seul le processus dont l'UPDATE modifie la ligne reprend la campagne
+                claimed = db.session.execute(
+                    update(ReminderCampaign)
+                    .where(
+                        ReminderCampaign.id == running.id,
+                        ReminderCampaign.status == 'running',
+                        ReminderCampaign.updated_at == running.updated_at
+                    )
+                    .values(updated_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if not claimed:
+                    error = CampaignAlreadyRunning(running)
+                    db.session.rollback()
+                    raise error
+                logger.info("Reprise de la campagne de relance %s après l'abonnement %s", running.id, running.checkpoint_id)
+                db.session.commit()
+                return running
+            running.status = 'failed'
+            running.error = 'Abandonnée'
+            running.finished_at = datetime.utcnow()
+
+        now = datetime.now()
+        campaign = ReminderCampaign(
+            status='running',
+            window_start=now,
+            window_end=now + timedelta(days=self.window_days),
+            checkpoint_id=0
+        )
+        campaign.backlog = self._count_backlog(campaign)
+        db.session.add(campaign)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Un autre processus vient de créer la sienne (index uq_reminder_campaigns_running)
+            db.session.rollback()
+            running = ReminderCampaign.query.filter_by(status='running').first()
+            if running is None:
+                raise
+            error = CampaignAlreadyRunning(running)
+            db.session.rollback()
+            raise error
+        return campaign
+
+    def _process_chunk(self, campaign, subscriptions, bucket):
+        keys = {sub.id: window_key(sub.expires_at) for sub in subscriptions}
+        already_sent = set(
+            db.session.query(ReminderLedger.subscription_id, ReminderLedger.window_key)
+            .filter(ReminderLedger.subscription_id.in_(list(keys)))
+            .all()
+        )
+        due = [sub for sub in subscriptions if (sub.id, keys[sub.id]) not in already_sent]
+        skipped = len(subscriptions) - len(due)
+
+        reminders = [{
+            'subscription_id': sub.id,
+            'recipient_email': sub.email,
+            'full_name': sub.full_name,
+            'plan_name': sub.plan_name,
+            'expires_at': sub.expires_at
+        } for sub in due]
+
+        sent_ids = []
+        # Envois par tranches de la taille du seau : le débit reste sous rate_per_second
+        step = max(1, int(bucket.capacity))
+        for start in range(0, len(reminders), step):
+            batch = reminders[start:start + step]
+            bucket.acquire(len(batch))
+            outcomes = self.send_batch(batch, self.connections)
+            sent_ids.extend(reminder['subscription_id'] for reminder, ok in zip(batch, outcomes) if ok)
+
+        if sent_ids:
+            db.session.execute(
+                _insert_ignore_duplicates(ReminderLedger.__table__),
+                [{
+                    'subscription_id': subscription_id,
+                    'window_key': keys[subscription_id],
+                    'campaign_id': campaign.id,
+                    'sent_at': datetime.utcnow()
+                } for subscription_id in sent_ids]
+            )
+        campaign.sent += len(sent_ids)
+        campaign.failed += len(due) - len(sent_ids)
+        campaign.skipped += skipped
+        campaign.checkpoint_id = subscriptions[-1].id
+        campaign.updated_at = datetime.utcnow()
+        db.session.commit()
+
+    def run(self, resume=True):
+        """
+        Exécute (ou reprend) une campagne jusqu'au bout et la retourne
+        """
+        return self.execute(self.start_campaign(resume=resume))
+
+    def execute(self, campaign):
+        """
+        Traite une campagne démarrée par start_campaign() à partir de son point de reprise
+        """
+        bucket = TokenBucket(self.rate_per_second, capacity=max(self.rate_per_second, 1))
+        started = time.perf_counter()
+        try:
+            while True:
+                subscriptions = self._due_query(campaign).filter(
+                    Subscription.id > campaign.checkpoint_id
+                ).order_by(Subscription.id).limit(self.chunk_size).all()
+                if not subscriptions:
+                    break
+                self._process_chunk(campaign, subscriptions, bucket)
+            campaign.status = 'completed'
+        except Exception as e:
+            db.session.rollback()
+            campaign.status = 'failed'
+            campaign.error = str(e)
+            logger.exception('Erreur lors de la campagne de relance %s: %s', campaign.id, e)
+        campaign.finished_at = datetime.utcnow()
+        campaign.updated_at = campaign.finished_at
+        db.session.commit()
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            'Campagne de relance %s %s: %s envoyées, %s échecs, %s déjà relancées en %.1f s',
+            campaign.id, campaign.status, campaign.sent, campaign.failed, campaign.skipped, elapsed,
+            extra={'campaign_id': campaign.id, 'emails_per_second': campaign.to_dict()['emails_per_second']}
+        )
+        return campaign
+
+
+reminder_engine = ReminderEngine.from_env()
+
+
+class ReminderScheduler(BackgroundWorkerPool):
+    """
+    Lance une campagne de relance toutes les interval secondes (désactivé si interval vaut 0)
+    """
+
+    def __init__(self, engine, interval=0.0):
+        super().__init__('reminders', workers=1 if interval > 0 else 0, poll_interval=interval)
+        self.engine = engine
+
+    def run_once(self):
+        try:
+            self.engine.run()
+        except CampaignAlreadyRunning:
+            pass
+        return False
+
+
+reminder_scheduler = ReminderScheduler(
+    reminder_engine,
+    interval=float(os.environ.get('REMINDER_CAMPAIGN_INTERVAL', '0'))
+)
+
+
+@click.command('send-reminders')
+@click.option('--window-days', type=int, default=None, help='Relancer les abonnements expirant dans N jours')
+@click.option('--no-resume', is_flag=True, help='Abandonner une campagne interrompue au lieu de la reprendre')
+def send_reminders_command(window_days, no_resume):
+    """
+    Envoie les emails de relance des abonnements qui expirent bientôt
+    """
+    engine = reminder_engine
+    if window_days is not None:
+        engine = ReminderEngine(
+            window_days=window_days,
+            chunk_size=engine.chunk_size,
+            rate_per_second=engine.rate_per_second,
+            connections=engine.connections
+        )
+    try:
+        campaign = engine.run(resume=not no_resume)
+    except CampaignAlreadyRunning as e:
+        click.echo(str(e))
+        raise SystemExit(1)
+    click.echo(campaign.to_dict())
+    if campaign.status != 'completed':
+        raise SystemExit(1)
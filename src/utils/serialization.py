@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+from datetime import datetime
+from flask import Response
+from src.models.subscription import Subscription
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle : repli sur le module json standard
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Colonnes publiées pour un abonnement, dans l'ordre de Subscription.to_dict()
+SUBSCRIPTION_FIELDS = (
+    'id', 'full_name', 'email', 'phone', 'contact_method',
+    'plan_id', 'plan_name', 'plan_price', 'plan_duration', 'status',
+    'created_at', 'expires_at', 'iptv_username', 'iptv_password', 'iptv_url'
+)
+
+
+class InvalidFieldsParameter(ValueError):
+    pass
+
+
+def parse_fields(value, allowed=SUBSCRIPTION_FIELDS):
+    """
+    Valide une liste de colonnes séparées par des virgules (toutes si vide)
+    """
+    if not value:
+        return list(allowed)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise InvalidFieldsParameter(f"Champs inconnus: {', '.join(unknown)}")
+    return list(dict.fromkeys(fields))
+
+
+def subscription_columns(fields):
+    """
+    Colonnes SQLAlchemy à sélectionner pour ces champs (pas d'objets ORM à hydrater)
+    """
+    return [getattr(Subscription, field) for field in fields]
+
+
+def rows_to_dicts(rows, fields):
+    """
+    Tuples -> dictionnaires (les colonnes en trop en fin de tuple sont ignorées)
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Type non sérialisable: {type(value).__name__}')
+
+
+def _stdlib_dumps(payload):
+    return json.dumps(payload, default=_json_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _orjson_dumps(payload):
+    # Les datetime naïfs sont écrits comme datetime.isoformat()
+    return orjson.dumps(payload)
+
+
+JSON_ENCODERS = {'json': _stdlib_dumps}
+if orjson is not None:
+    JSON_ENCODERS['orjson'] = _orjson_dumps
+
+# JSON_ENCODER=json force le module standard ; orjson par défaut s'il est installé
+JSON_ENCODER = os.environ.get('JSON_ENCODER', 'orjson' if orjson is not None else 'json')
+if JSON_ENCODER not in JSON_ENCODERS:
+    logger.warning('Encodeur JSON %s indisponible, utilisation du module json', JSON_ENCODER)
+    JSON_ENCODER = 'json'
+
+dumps = JSON_ENCODERS[JSON_ENCODER]
+
+
+def json_response(payload, status=200, headers=None):
+    """
+    Réponse JSON encodée par l'encodeur rapide (les datetime sont acceptés tels quels)
+    """
+    return Response(dumps(payload), status=status, headers=headers, mimetype='application/json')
@@ -0,0 +1,377 @@
+import os
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from src.utils.metrics import record_upstream
+
+
+class SMTPSettings:
+    """
+    Configuration SMTP lue une seule fois depuis l'environnement
+    """
+
+    def __init__(self, server, port, username, password, sender_email, use_tls=True, timeout=30.0):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender_email = sender_email
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls):
+        username = os.environ.get('SMTP_USERNAME', '')
+        return cls(
+            server=os.environ.get('SMTP_SERVER', 'smtp.gmail.com'),
+            port=int(os.environ.get('SMTP_PORT', '587')),
+            username=username,
+            password=os.environ.get('SMTP_PASSWORD', ''),
+            sender_email=os.environ.get('SENDER_EMAIL', username),
+            use_tls=os.environ.get('SMTP_USE_TLS', 'true').lower() not in ('0', 'false', 'no'),
+            timeout=float(os.environ.get('SMTP_TIMEOUT', '30'))
+        )
+
+    @property
+    def configured(self):
+        # Sans identifiants, l'envoi est simulé (comportement historique)
+        return bool(self.username and self.password)
+
+
+class _PooledConnection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+# Erreurs propres à un message : la session SMTP reste utilisable
+_MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+
+class SMTPConnectionPool:
+    """
+    Pool de sessions SMTP authentifiées réutilisées d'un message à l'autre
+
+    Au plus max_connections sessions sont ouvertes simultanément. Une session est
+    fermée puis recréée après max_messages_per_connection messages (limite imposée
+    par la plupart des fournisseurs) ou après max_idle_seconds d'inactivité. Une
+    session coupée par le serveur (SMTPServerDisconnected) est rouverte et le
+    message renvoyé une fois.
+    """
+
+    def __init__(self, settings, max_connections=3, max_messages_per_connection=100,
+                 max_idle_seconds=60.0):
+        self.settings = settings
+        self.max_connections = max_connections
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_idle_seconds = max_idle_seconds
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._idle = []
+        self.connections_opened = 0
+
+    @classmethod
+    def from_env(cls, settings=None):
+        return cls(
+            settings or SMTPSettings.from_env(),
+            max_connections=int(os.environ.get('SMTP_POOL_SIZE', '3')),
+            max_messages_per_connection=int(os.environ.get('SMTP_MAX_MESSAGES_PER_CONNECTION', '100')),
+            max_idle_seconds=float(os.environ.get('SMTP_MAX_IDLE_SECONDS', '60'))
+        )
+
+    def _connect(self):
+        settings = self.settings
+        smtp = smtplib.SMTP(settings.server, settings.port, timeout=settings.timeout)
+        try:
+            if settings.use_tls:
+                smtp.starttls()
+            if settings.username:
+                smtp.login(settings.username, settings.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._connect()
+                if time.monotonic() - conn.last_used <= self.max_idle_seconds:
+                    return conn
+                self._close(conn.smtp)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn, broken=False):
+        try:
+            if broken or conn.messages_sent >= self.max_messages_per_connection:
+                self._close(conn.smtp)
+            else:
+                conn.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Prête une session du pool (rendue au pool en sortie, fermée en cas d'erreur)
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        except _MESSAGE_ERRORS:
+            self._release(conn)
+            raise
+        except BaseException:
+            self._release(conn, broken=True)
+            raise
+        else:
+            self._release(conn)
+
+    def _send_on(self, conn, message):
+        conn.smtp.sendmail(message['From'], [message['To']], message.as_string())
+        conn.messages_sent += 1
+
+    def send(self, message):
+        """
+        Envoie un message MIME (en-têtes From et To requis) via une session du pool
+        """
+        started = time.perf_counter()
+        try:
+            with self.connection() as conn:
+                self._send_on(conn, message)
+        except smtplib.SMTPServerDisconnected:
+            # Session expirée côté serveur : on la remplace et on renvoie une fois
+            with self.connection() as conn:
+                self._send_on(conn, message)
+        finally:
+            record_upstream('smtp', time.perf_counter() - started)
+
+    def send_many(self, messages, connections=None):
+        """
+        Envoie une liste de messages en les répartissant sur plusieurs sessions
+
+        Retourne une liste alignée sur messages : None si le message est parti,
+        sinon l'exception levée pour ce message.
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+        connections = min(connections or self.max_connections, self.max_connections, len(messages))
+        results = [None] * len(messages)
+
+        def worker(indexes):
+            for index in indexes:
+                try:
+                    self.send(messages[index])
+                except Exception as e:
+                    results[index] = e
+
+        shares = [range(start, len(messages), connections) for start in range(connections)]
+        if connections == 1:
+            worker(shares[0])
+        else:
+            with ThreadPoolExecutor(max_workers=connections, thread_name_prefix='smtp-send') as executor:
+                list(executor.map(worker, shares))
+        return results
+
+    def close(self):
+        """
+        Ferme les sessions inactives
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn.smtp)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool():
+    """
+    Pool SMTP partagé par le processus, créé au premier appel
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SMTPConnectionPool.from_env()
+    return _pool
+
+
+def reset_smtp_pool(pool=None):
+    """
+    Ferme le pool courant et le remplace (par défaut, relu depuis l'environnement au prochain appel)
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = pool
+
+
+class AsyncSMTPConnectionPool:
+    """
+    Pool de sessions SMTP asynchrones (aiosmtplib) pour le mode ASGI
+
+    Même politique que SMTPConnectionPool (max_connections sessions, renouvelées
+    après max_messages_per_connection messages ou max_idle_seconds d'inactivité),
+    mais un envoi en attente du serveur n'occupe aucun thread. Le pool appartient
+    à la boucle d'événements qui l'a créé.
+    """
+
+    def __init__(self, settings, max_connections=3, max_messages_per_connection=100,
+                 max_idle_seconds=60.0):
+        import asyncio
+        # Dépendance du mode asynchrone uniquement (requirements-async.txt)
+        import aiosmtplib
+
+        self.settings = settings
+        self.max_connections = max_connections
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_idle_seconds = max_idle_seconds
+        self._aiosmtplib = aiosmtplib
+        self._message_errors = (
+            aiosmtplib.SMTPRecipientsRefused,
+            aiosmtplib.SMTPSenderRefused,
+            aiosmtplib.SMTPDataError,
+        )
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle = []
+        self.connections_opened = 0
+
+    @classmethod
+    def from_env(cls, settings=None):
+        return cls(
+            settings or SMTPSettings.from_env(),
+            max_connections=int(os.environ.get('SMTP_POOL_SIZE', '3')),
+            max_messages_per_connection=int(os.environ.get('SMTP_MAX_MESSAGES_PER_CONNECTION', '100')),
+            max_idle_seconds=float(os.environ.get('SMTP_MAX_IDLE_SECONDS', '60'))
+        )
+
+    async def _connect(self):
+        settings = self.settings
+        smtp = self._aiosmtplib.SMTP(
+            hostname=settings.server,
+            port=settings.port,
+            timeout=settings.timeout,
+            start_tls=settings.use_tls
+        )
+        await smtp.connect()
+        try:
+            if settings.username:
+                await smtp.login(settings.username, settings.password)
+        except Exception:
+            await self._close(smtp)
+            raise
+        self.connections_opened += 1
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    async def _close(smtp):
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _acquire(self):
+        while self._idle:
+            conn = self._idle.pop()
+            if time.monotonic() - conn.last_used <= self.max_idle_seconds and conn.smtp.is_connected:
+                return conn
+            await self._close(conn.smtp)
+        return await self._connect()
+
+    async def _release(self, conn, broken=False):
+        if broken or conn.messages_sent >= self.max_messages_per_connection:
+            await self._close(conn.smtp)
+        else:
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+
+    async def _send_once(self, message):
+        async with self._slots:
+            conn = await self._acquire()
+            try:
+                await conn.smtp.sendmail(message['From'], [message['To']], message.as_string())
+                conn.messages_sent += 1
+            except self._message_errors:
+                await self._release(conn)
+                raise
+            except BaseException:
+                await self._release(conn, broken=True)
+                raise
+            else:
+                await self._release(conn)
+
+    async def send(self, message):
+        """
+        Envoie un message MIME (en-têtes From et To requis) via une session du pool
+        """
+        started = time.perf_counter()
+        try:
+            try:
+                await self._send_once(message)
+            except self._aiosmtplib.SMTPServerDisconnected:
+                # Session expirée côté serveur : on la remplace et on renvoie une fois
+                await self._send_once(message)
+        finally:
+            record_upstream('smtp', time.perf_counter() - started)
+
+    async def send_many(self, messages, connections=None):
+        """
+        Envoie des messages en parallèle sur au plus connections sessions
+
+        Retourne une liste alignée sur messages : None si le message est parti,
+        sinon l'exception levée pour ce message.
+        """
+        import asyncio
+
+        messages = list(messages)
+        limit = asyncio.Semaphore(min(connections or self.max_connections, self.max_connections) or 1)
+
+        async def send(message):
+            async with limit:
+                try:
+                    await self.send(message)
+                except Exception as e:
+                    return e
+            return None
+
+        return list(await asyncio.gather(*(send(message) for message in messages)))
+
+    async def close(self):
+        """
+        Ferme les sessions inactives
+        """
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._close(conn.smtp)
@@ -0,0 +1,182 @@
+import gzip
+import logging
+import mimetypes
+import os
+import re
+import threading
+import click
+from flask import Response, request, send_file
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle : pas de variante br sans le paquet brotli
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Fichiers produits par le build du frontend avec un hash de contenu (assets/index-B7fxpMJX.js) :
+# Vite ne les écrit que dans assets/, un nom semblable ailleurs (logo-original.png) n'est pas haché
+HASHED_ASSETS_DIR = 'assets/'
+HASHED_NAME = re.compile(r'-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+
+# Types qui gagnent à être compressés (les images PNG/JPEG le sont déjà)
+COMPRESSIBLE_EXTENSIONS = {'.js', '.mjs', '.css', '.html', '.svg', '.json', '.txt', '.xml', '.ico', '.map', '.wasm'}
+
+# Extension des variantes précompressées, par ordre de préférence
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def accepted_encodings(header):
+    """
+    Encodages acceptés par le client (en-tête Accept-Encoding, q=0 exclu)
+    """
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if name and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _compress(encoding, data, best=False):
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+    return brotli.compress(data, quality=11 if best else 5)
+
+
+class StaticAsset:
+    """
+    Fichier du frontend : chemin, taille, ETag, politique de cache et variantes compressées
+    """
+
+    def __init__(self, path, relative_path, stat):
+        self.path = path
+        self.relative_path = relative_path
+        self.size = stat.st_size
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.etag = f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+        self.hashed = (
+            relative_path.startswith(HASHED_ASSETS_DIR)
+            and bool(HASHED_NAME.search(os.path.basename(path)))
+        )
+        self.compressible = os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+        # Variantes précompressées présentes sur disque (<fichier>.br, <fichier>.gz) : servies par sendfile
+        self.files = {
+            encoding: path + suffix
+            for encoding, suffix in ENCODINGS
+            if self.compressible and os.path.isfile(path + suffix)
+        }
+        # Variantes compressées en mémoire à la première demande, faute de fichier
+        self._compressed = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache_control(self):
+        # Nom haché : le contenu ne change jamais sous ce nom ; sinon revalidation par ETag
+        return IMMUTABLE_CACHE_CONTROL if self.hashed else 'no-cache'
+
+    def encoding_for(self, accepted):
+        if not self.compressible:
+            return None
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and (encoding in self.files or encoding == 'gzip' or brotli is not None):
+                return encoding
+        return None
+
+    def compressed(self, encoding):
+        data = self._compressed.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._compressed.get(encoding)
+                if data is None:
+                    with open(self.path, 'rb') as source:
+                        data = self._compressed[encoding] = _compress(encoding, source.read())
+        return data
+
+
+class StaticFiles:
+    """
+    Manifeste en mémoire des fichiers du frontend, construit une fois au démarrage
+
+    Une requête ne fait ni stat ni recherche sur disque : le chemin est cherché
+    dans le manifeste, les chemins inconnus reçoivent index.html (routage côté
+    client). Reconstruire le frontend demande de redémarrer l'application.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+
+    def build(self):
+        assets = {}
+        if self.root and os.path.isdir(self.root):
+            for directory, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    if filename.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                        continue
+                    path = os.path.join(directory, filename)
+                    relative_path = os.path.relpath(path, self.root).replace(os.sep, '/')
+                    assets[relative_path] = StaticAsset(path, relative_path, os.stat(path))
+        self.assets = assets
+        return self
+
+    def lookup(self, path):
+        return self.assets.get(path) or self.assets.get('index.html')
+
+    def response(self, asset):
+        """
+        Réponse pour asset selon Accept-Encoding, avec ETag, 304 et Cache-Control
+        """
+        encoding = asset.encoding_for(accepted_encodings(request.headers.get('Accept-Encoding', '')))
+        etag = f'{asset.etag}-{encoding}' if encoding else asset.etag
+
+        if encoding is None or encoding in asset.files:
+            # Fichier sur disque : sendfile (wsgi.file_wrapper) sans copie en mémoire
+            response = send_file(
+                asset.files[encoding] if encoding else asset.path,
+                mimetype=asset.mimetype,
+                etag=etag,
+                conditional=True,
+                max_age=None
+            )
+        else:
+            response = Response(asset.compressed(encoding), mimetype=asset.mimetype)
+            response.set_etag(etag)
+            response = response.make_conditional(request)
+
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.compressible:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = asset.cache_control
+        return response
+
+
+def serve_static(static_files, path):
+    asset = static_files.lookup(path)
+    if asset is None:
+        return "index.html not found", 404
+    return static_files.response(asset)
+
+
+@click.command('compress-static')
+@click.option('--static-dir', default=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static'),
+              show_default=True, help='Dossier du frontend compilé')
+def compress_static_command(static_dir):
+    """
+    Écrit les variantes .gz (et .br si le paquet brotli est installé) des fichiers compressibles
+    """
+    encodings = [(encoding, suffix) for encoding, suffix in ENCODINGS if encoding == 'gzip' or brotli is not None]
+    for asset in StaticFiles(static_dir).build().assets.values():
+        if not asset.compressible:
+            continue
+        with open(asset.path, 'rb') as source:
+            data = source.read()
+        for encoding, suffix in encodings:
+            compressed = _compress(encoding, data, best=True)
+            with open(asset.path + suffix, 'wb') as output:
+                output.write(compressed)
+            click.echo(f'{asset.relative_path}{suffix}: {len(data)} -> {len(compressed)} octets')
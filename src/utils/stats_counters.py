@@ -0,0 +1,154 @@
+import os
+import random
+from collections import Counter
+from sqlalchemy import event, insert, inspect, literal, update
+from sqlalchemy.orm import Session
+from src.models.subscription import db, Subscription
+from src.models.subscription_counter import SubscriptionCounter
+
+# Statuts toujours présents dans /api/stats
+TRACKED_STATUSES = ('active', 'pending', 'expired')
+
+# Lignes par compteur : autant d'écritures concurrentes sans attente sur PostgreSQL
+COUNTER_SHARDS = max(1, int(os.environ.get('STATS_COUNTER_SHARDS', '8')))
+
+
+def _upsert_for(dialect):
+    # Dialectes importés à la demande : sqlalchemy.dialects.postgresql coûte ~35 ms au démarrage
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+        return postgresql_insert
+    return None
+
+
+def adjust_counters(session, deltas):
+    """
+    Applique des variations {(status, plan_name): delta} à la table des compteurs
+
+    Les écritures passent par la session fournie : elles sont validées ou annulées
+    avec la transaction qui modifie les abonnements. Elles vont sur un shard tiré
+    au hasard, dans un ordre fixe (deux transactions ne peuvent pas s'interbloquer).
+    """
+    table = SubscriptionCounter.__table__
+    dialect = session.get_bind(mapper=inspect(SubscriptionCounter)).dialect.name
+    upsert = _upsert_for(dialect)
+    shard = random.randrange(COUNTER_SHARDS)
+
+    for (status, plan_name), delta in sorted(deltas.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+        if not delta:
+            continue
+        if upsert is not None:
+            session.execute(
+                upsert(table)
+                .values(status=status, plan_name=plan_name, shard=shard, count=delta)
+                .on_conflict_do_update(
+                    index_elements=[table.c.status, table.c.plan_name, table.c.shard],
+                    set_={'count': table.c.count + delta}
+                )
+            )
+        else:
+            result = session.execute(
+                update(table)
+                .where(table.c.status == status, table.c.plan_name == plan_name, table.c.shard == shard)
+                .values(count=table.c.count + delta)
+            )
+            if result.rowcount == 0:
+                session.execute(insert(table).values(status=status, plan_name=plan_name, shard=shard, count=delta))
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+# active_history : l'ancienne valeur est chargée avant modification, même si l'objet
+# a été expiré par un commit, pour décrémenter le bon compteur
+event.listen(Subscription.status, 'set', _keep_previous_value, active_history=True, retval=True)
+event.listen(Subscription.plan_name, 'set', _keep_previous_value, active_history=True, retval=True)
+
+
+def _history_before(state, attribute):
+    history = state.attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.obj(), attribute)
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_subscription_changes(session, flush_context, instances):
+    """
+    Maintient les compteurs à chaque flush qui crée, modifie le statut/plan ou supprime un abonnement
+
+    Les UPDATE/INSERT en masse (sans passer par l'ORM) doivent appeler adjust_counters() eux-mêmes.
+    """
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Subscription):
+            deltas[(obj.status or 'pending', obj.plan_name)] += 1
+    for obj in session.dirty:
+        if not isinstance(obj, Subscription):
+            continue
+        state = inspect(obj)
+        if not (state.attrs.status.history.has_changes() or state.attrs.plan_name.history.has_changes()):
+            continue
+        deltas[(_history_before(state, 'status') or 'pending', _history_before(state, 'plan_name'))] -= 1
+        deltas[(obj.status or 'pending', obj.plan_name)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Subscription):
+            deltas[(_history_before(inspect(obj), 'status') or 'pending', _history_before(inspect(obj), 'plan_name'))] -= 1
+
+    if deltas:
+        adjust_counters(session, deltas)
+
+
+def rebuild_counters():
+    """
+    Recalcule tous les compteurs en une seule passe GROUP BY status, plan_name
+    """
+    table = SubscriptionCounter.__table__
+    db.session.execute(table.delete())
+    db.session.execute(
+        insert(table).from_select(
+            ['status', 'plan_name', 'shard', 'count'],
+            db.session.query(
+                db.func.coalesce(Subscription.status, 'pending'),
+                Subscription.plan_name,
+                literal(0),
+                db.func.count(Subscription.id)
+            ).group_by(db.func.coalesce(Subscription.status, 'pending'), Subscription.plan_name)
+        )
+    )
+    db.session.commit()
+
+
+def ensure_counters():
+    """
+    Construit les compteurs s'ils sont vides alors que des abonnements existent
+    (base antérieure à la table des compteurs)
+    """
+    has_counters = db.session.query(SubscriptionCounter.status).first() is not None
+    if not has_counters and db.session.query(Subscription.id).first() is not None:
+        rebuild_counters()
+
+
+def read_stats():
+    """
+    Statistiques des abonnements lues depuis la table des compteurs (quelques lignes)
+    """
+    by_status = Counter({status: 0 for status in TRACKED_STATUSES})
+    by_plan = Counter()
+    for status, plan_name, count in db.session.query(
+        SubscriptionCounter.status,
+        SubscriptionCounter.plan_name,
+        SubscriptionCounter.count
+    ):
+        by_status[status] += count
+        by_plan[plan_name] += count
+
+    return {
+        'total': sum(by_status.values()),
+        **{status: by_status[status] for status in TRACKED_STATUSES},
+        'by_plan': {plan: count for plan, count in by_plan.items() if count}
+    }